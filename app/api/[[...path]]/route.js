@@ -1,323 +1,544 @@
 import { NextResponse } from 'next/server'
-import { MongoClient } from 'mongodb'
-import { v4 as uuidv4 } from 'uuid'
+import { getDb, getPoolStats, pingDB } from '@/lib/mongodb'
+import { forTenant } from '@/lib/tenancy'
+import { createPost, createPosts, findPostTenants, listPosts, parseBatchBody } from '@/lib/posts'
+import { getProfile, saveProfile } from '@/lib/profiles'
+import { getPostCalendar } from '@/lib/calendar'
+import { exportResponse, getExportStats } from '@/lib/export'
+import { cancelPostJob, enqueuePost, enqueuePosts, getQueueDepth } from '@/lib/scheduler'
+import { getAnalytics, recordEngagement, recordPostPublished, recordPostsPublished } from '@/lib/analytics'
+import { cachedJson, getCacheStats, invalidate } from '@/lib/cache'
+import { getRequestSession, hasWebhookSecret } from '@/lib/session'
+import {
+  appendChunk,
+  createUploadSession,
+  dedupByHash,
+  getUploadSession,
+  objectResponse,
+  storeMultipart,
+  storeStream,
+  uploadContentType,
+  uploadSessionView
+} from '@/lib/uploads'
+import { enqueueDerivatives, getDerivativeQueueDepth, variantResponse } from '@/lib/derivatives'
+import { createLinkedImage, deleteImages, listImages } from '@/lib/images'
+import { getPublisherStats, publishInBackground } from '@/lib/publisher'
+import { getTokenStats, getTokenStatus } from '@/lib/tokens'
+import { getGoogleClientStats } from '@/lib/google'
+import { getEngagementIngestor, getIngestStats, ingestNdjson } from '@/lib/ingest'
+import { emitEvent, getEventHub, getEventStats } from '@/lib/events'
+import { getCaptureStats, withCapture } from '@/lib/capture'
+import { renderMetrics, withMetrics } from '@/lib/metrics'
+import { createRouter } from '@/lib/router'
+import {
+  engagementEvents,
+  linkedImageInput,
+  postInput,
+  postUpdate,
+  profileInput,
+  uploadSessionInput
+} from '@/lib/schemas'
 
-const client = new MongoClient(process.env.MONGO_URL)
+// Batch bodies carry up to MAX_BATCH_SIZE posts, so they get a larger limit
+const BATCH_MAX_BODY_BYTES = parseInt(process.env.API_MAX_BATCH_BODY_BYTES || String(16 * 1024 * 1024), 10)
 
-async function connectDB() {
-  try {
-    await client.connect()
-    return client.db(process.env.DB_NAME || 'socialflow_pro')
-  } catch (error) {
-    console.error('Database connection error:', error)
-    throw error
+// Middleware
+
+// Resolve the signed-in user and their tenant once per request
+async function auth(ctx, next) {
+  const session = await getRequestSession(ctx.request)
+  if (!session) {
+    return NextResponse.json({ error: 'Sign in required' }, { status: 401 })
   }
+  ctx.user = session.user
+  ctx.tenantId = session.tenantId
+  return next()
 }
 
-// GET handler
-export async function GET(request, { params }) {
-  const path = params?.path || []
-  const endpoint = path.join('/')
+// Platform webhooks carry no session; they must send the shared secret
+function webhook(ctx, next) {
+  if (!hasWebhookSecret(ctx.request)) {
+    return NextResponse.json({ error: 'Invalid webhook secret' }, { status: 401 })
+  }
+  return next()
+}
 
-  try {
-    // Root endpoint
-    if (!endpoint) {
-      return NextResponse.json({ 
-        message: 'SocialFlow Pro API is running!',
-        version: '1.0.0',
-        timestamp: new Date().toISOString()
-      })
-    }
+// Serve the handler's payload through the response cache for this tenant
+function cached(tag) {
+  return (ctx, next) => cachedJson(ctx.request, { tenantId: ctx.tenantId, tag }, next)
+}
 
-    // Get user profile
-    if (endpoint === 'profile') {
-      const db = await connectDB()
-      // Mock response for now - will be replaced with real user data
-      return NextResponse.json({
-        success: true,
-        profile: {
-          id: uuidv4(),
-          businessName: 'Sample Business',
-          businessType: 'restaurant',
-          address: '123 Main St, City, State',
-          phone: '(555) 123-4567',
-          email: 'contact@samplebusiness.com',
-          connectedAccounts: {
-            instagram: { connected: true, username: '@samplebusiness' },
-            facebook: { connected: false, username: null },
-            googleBusiness: { connected: false, username: null }
-          }
-        }
-      })
-    }
+// The database as seen by the request's tenant; routes using it need `auth`
+async function tenantDb(tenantId) {
+  return forTenant(await getDb(), tenantId)
+}
 
-    // Get posts
-    if (endpoint === 'posts') {
-      const url = new URL(request.url)
-      const status = url.searchParams.get('status') || 'all'
-      
-      // Mock posts data
-      const mockPosts = [
-        {
-          id: uuidv4(),
-          content: 'Check out our delicious new summer menu! 🌞🍽️',
-          platforms: ['instagram', 'facebook'],
-          status: 'published',
-          scheduledAt: new Date('2024-06-15T10:00:00Z').toISOString(),
-          publishedAt: new Date('2024-06-15T10:00:00Z').toISOString(),
-          images: ['https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400&h=400&fit=crop'],
-          engagement: { likes: 45, comments: 12, shares: 8 }
-        },
-        {
-          id: uuidv4(),
-          content: 'Happy Friday everyone! What are your weekend plans? 🎉',
-          platforms: ['instagram'],
-          status: 'scheduled',
-          scheduledAt: new Date(Date.now() + 86400000).toISOString(),
-          publishedAt: null,
-          images: [],
-          engagement: { likes: 0, comments: 0, shares: 0 }
-        }
-      ]
-
-      const filteredPosts = status === 'all' ? mockPosts : mockPosts.filter(post => post.status === status)
-      
-      return NextResponse.json({
-        success: true,
-        posts: filteredPosts,
-        total: filteredPosts.length
-      })
-    }
+const contentType = request => request.headers.get('content-type') || ''
+const isJson = request => contentType(request).includes('json')
+const isNdjson = request => contentType(request).includes('ndjson')
 
-    // Get analytics
-    if (endpoint === 'analytics') {
-      const url = new URL(request.url)
-      const timeframe = url.searchParams.get('timeframe') || '30'
-      
-      // Mock analytics data
-      return NextResponse.json({
-        success: true,
-        analytics: {
-          overview: {
-            totalPosts: 247,
-            totalReach: 15624,
-            totalEngagement: 1934,
-            followerGrowth: 12.5
-          },
-          engagement: {
-            likes: 1245,
-            comments: 456,
-            shares: 233,
-            avgEngagementRate: 12.5
-          },
-          platforms: {
-            instagram: { posts: 89, reach: 8924, engagement: 1124 },
-            facebook: { posts: 67, reach: 4567, engagement: 567 },
-            googleBusiness: { posts: 23, reach: 2133, engagement: 243 }
-          },
-          topPosts: [
-            {
-              id: uuidv4(),
-              content: 'Summer special menu launch! 🌞',
-              platform: 'instagram',
-              engagement: 234,
-              reach: 1890
-            }
-          ]
-        }
-      })
-    }
+// GET routes
+
+function apiInfo() {
+  return {
+    message: 'SocialFlow Pro API is running!',
+    version: '1.0.0',
+    timestamp: new Date().toISOString()
+  }
+}
 
-    // Image library
-    if (endpoint === 'images') {
-      // Mock image library
-      return NextResponse.json({
-        success: true,
-        images: [
-          {
-            id: uuidv4(),
-            filename: 'summer-menu.jpg',
-            url: 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=800&h=600&fit=crop',
-            thumbnail: 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=200&h=200&fit=crop',
-            category: 'Food',
-            uploadedAt: new Date().toISOString(),
-            size: '2.3MB'
-          },
-          {
-            id: uuidv4(),
-            filename: 'restaurant-interior.jpg',
-            url: 'https://images.unsplash.com/photo-1517248135467-4c7edcad34c4?w=800&h=600&fit=crop',
-            thumbnail: 'https://images.unsplash.com/photo-1517248135467-4c7edcad34c4?w=200&h=200&fit=crop',
-            category: 'Interior',
-            uploadedAt: new Date().toISOString(),
-            size: '1.8MB'
-          }
-        ]
-      })
+// Database health and connection pool counters
+async function health() {
+  const database = await pingDB()
+  return NextResponse.json({
+    success: database.ok,
+    database,
+    pool: getPoolStats(),
+    cache: getCacheStats(),
+    publisher: getPublisherStats(),
+    google: { ...getTokenStats(), ...getGoogleClientStats() },
+    ingest: getIngestStats(),
+    events: getEventStats(),
+    capture: getCaptureStats(),
+    export: getExportStats(),
+    process: {
+      rssBytes: process.memoryUsage().rss,
+      maxRssBytes: process.resourceUsage().maxRSS * 1024
     }
+  }, { status: database.ok ? 200 : 503 })
+}
+
+// Prometheus scrape target: request histograms plus cache, pool and queue counters
+async function metrics() {
+  const db = await getDb()
+  const [jobs, derivatives] = await Promise.all([getQueueDepth(db), getDerivativeQueueDepth(db)])
+  const publisher = getPublisherStats()
+
+  const body = renderMetrics([
+    {
+      subsystem: 'cache',
+      stats: getCacheStats(),
+      counters: ['hits', 'misses', 'notModified', 'invalidations', 'evictions', 'discarded']
+    },
+    {
+      subsystem: 'mongo_pool',
+      stats: getPoolStats(),
+      counters: ['clientsCreated', 'connectionsCreated', 'connectionsClosed', 'checkouts', 'checkoutFailures']
+    },
+    {
+      subsystem: 'ingest',
+      stats: getIngestStats() || {},
+      counters: ['accepted', 'flushes', 'flushErrors', 'keysWritten', 'keysRetried', 'unattributed', 'waits']
+    },
+    {
+      subsystem: 'events',
+      stats: getEventStats() || {},
+      counters: ['published', 'dropped', 'connected', 'rejected', 'resumed', 'resets', 'feedRestarts']
+    },
+    {
+      subsystem: 'export',
+      stats: getExportStats(),
+      counters: ['started', 'completed', 'cancelled', 'failed', 'rows']
+    },
+    {
+      subsystem: 'capture',
+      stats: getCaptureStats() || {},
+      counters: ['captured', 'dropped', 'writeErrors']
+    },
+    {
+      subsystem: 'google_tokens',
+      stats: getTokenStats(),
+      counters: ['hits', 'misses', 'refreshes', 'refreshFailures', 'coalesced', 'backgroundRefreshes']
+    },
+    { subsystem: 'queue', stats: jobs, labels: { queue: 'jobs' } },
+    { subsystem: 'queue', stats: derivatives, labels: { queue: 'derivative_jobs' } },
+    ...Object.entries(publisher.platforms).map(([platform, stats]) => ({
+      subsystem: 'publisher',
+      stats: { ...stats, breakerOpen: stats.breaker.state === 'open', waiting: stats.bucket?.waiting || 0 },
+      counters: ['published', 'failed', 'skipped', 'deferred', 'retries'],
+      labels: { platform }
+    })),
+    { subsystem: 'process', stats: { residentMemoryBytes: process.memoryUsage().rss, uptimeSeconds: process.uptime() } }
+  ])
 
-    return NextResponse.json({ error: 'Endpoint not found' }, { status: 404 })
+  return new Response(body, {
+    headers: { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8', 'Cache-Control': 'no-store' }
+  })
+}
+
+// Server-Sent Events: the tenant's post status, delivery and engagement
+// updates as they happen. Reconnects resume from Last-Event-ID; ?types=
+// narrows the stream.
+function events({ request, url, tenantId }) {
+  const types = url.searchParams.get('types')
+  return getEventHub(getDb).connect(request, {
+    tenantId,
+    lastEventId: request.headers.get('last-event-id') || url.searchParams.get('lastEventId'),
+    types: types ? types.split(',').map(type => type.trim()).filter(Boolean) : null
+  })
+}
 
-  } catch (error) {
-    console.error('API Error:', error)
-    return NextResponse.json({ 
-      error: 'Internal server error',
-      message: error.message 
-    }, { status: 500 })
+// Google connection for the signed-in user; refreshes the token if needed
+async function googleAccount({ user }) {
+  const db = await getDb()
+  return {
+    success: true,
+    google: await getTokenStatus(db, user)
   }
 }
 
-// POST handler
-export async function POST(request, { params }) {
-  const path = params?.path || []
-  const endpoint = path.join('/')
+// The tenant's business profile
+async function profile({ tenantId }) {
+  return {
+    success: true,
+    profile: await getProfile(await tenantDb(tenantId))
+  }
+}
+
+// Posts, keyset paginated, newest scheduledAt first
+async function getPosts({ url, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const { posts, nextCursor } = await listPosts(db, {
+    status: url.searchParams.get('status') || 'all',
+    limit: url.searchParams.get('limit'),
+    after: url.searchParams.get('after'),
+    fields: url.searchParams.get('fields')
+  })
+
+  return {
+    success: true,
+    posts,
+    nextCursor
+  }
+}
 
+// Per-day counts and summaries for the scheduler's visible calendar window
+async function postCalendar({ url, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const calendar = await getPostCalendar(db, {
+    from: url.searchParams.get('from'),
+    to: url.searchParams.get('to'),
+    tz: url.searchParams.get('tz')
+  })
+
+  return {
+    success: true,
+    ...calendar
+  }
+}
+
+// Analytics from the daily rollups
+async function analytics({ url, tenantId }) {
+  const db = await tenantDb(tenantId)
+  return {
+    success: true,
+    analytics: await getAnalytics(db, url.searchParams.get('timeframe') || '30')
+  }
+}
+
+// Full post or analytics history as a CSV/NDJSON download, streamed from the cursor
+async function exportData({ request, url, tenantId }) {
+  const db = await tenantDb(tenantId)
+  return exportResponse(db, {
+    type: url.searchParams.get('type'),
+    format: url.searchParams.get('format'),
+    from: url.searchParams.get('from'),
+    to: url.searchParams.get('to'),
+    tz: url.searchParams.get('tz'),
+    gzip: url.searchParams.get('gzip')
+  }, request)
+}
+
+// Image library: one page of thumbnails, filtered in the database
+async function getImages({ url, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const { images, nextCursor } = await listImages(db, {
+    category: url.searchParams.get('category'),
+    q: url.searchParams.get('q'),
+    limit: url.searchParams.get('limit'),
+    after: url.searchParams.get('after')
+  })
+
+  return {
+    success: true,
+    images,
+    nextCursor
+  }
+}
+
+// Stored image bytes, addressed by content hash
+async function imageFile({ request, params }) {
+  const db = await getDb()
+  return params.variant
+    ? variantResponse(db, params.sha256, params.variant, request)
+    : objectResponse(db, params.sha256, request)
+}
+
+// Resumable upload progress
+async function uploadProgress({ params, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const session = await getUploadSession(db, params.id)
+  return { success: true, upload: uploadSessionView(session) }
+}
+
+// POST routes
+
+// Bulk post creation: JSON array or NDJSON, so the raw text is parsed here
+async function createPostBatch({ request, body, user, tenantId }) {
+  let items
   try {
-    const body = await request.json()
-
-    // Create new post
-    if (endpoint === 'posts') {
-      const db = await connectDB()
-      
-      const newPost = {
-        id: uuidv4(),
-        content: body.content,
-        platforms: body.platforms || [],
-        status: body.action === 'publish' ? 'published' : 'scheduled',
-        scheduledAt: body.scheduledAt || new Date().toISOString(),
-        publishedAt: body.action === 'publish' ? new Date().toISOString() : null,
-        images: body.images || [],
-        createdAt: new Date().toISOString(),
-        engagement: { likes: 0, comments: 0, shares: 0 }
-      }
-
-      // In a real app, you would:
-      // 1. Save to database
-      // 2. If publishing now, call social media APIs
-      // 3. If scheduling, add to job queue
-      
-      console.log('Creating post:', newPost)
-      
-      return NextResponse.json({
-        success: true,
-        post: newPost,
-        message: body.action === 'publish' ? 'Post published successfully!' : 'Post scheduled successfully!'
-      })
-    }
+    items = parseBatchBody(body, contentType(request))
+  } catch {
+    return NextResponse.json({ error: 'Invalid JSON body' }, { status: 400 })
+  }
+
+  const db = await tenantDb(tenantId)
+  const { results, created } = await createPosts(db, items)
+  const scheduled = created.filter(post => post.status === 'scheduled')
+  const published = created.filter(post => post.status === 'published')
+
+  await Promise.all([
+    enqueuePosts(db, scheduled),
+    recordPostsPublished(db, published)
+  ])
+  publishInBackground(db, published, { account: user })
+  invalidate(tenantId, 'posts', 'analytics')
+  for (const post of created) {
+    emitEvent(tenantId, 'post.created', { id: post.id, status: post.status, scheduledAt: post.scheduledAt })
+  }
 
-    // Save business profile
-    if (endpoint === 'profile') {
-      const db = await connectDB()
-      
-      const updatedProfile = {
-        ...body,
-        id: body.id || uuidv4(),
-        updatedAt: new Date().toISOString()
-      }
-
-      console.log('Updating profile:', updatedProfile)
-      
-      return NextResponse.json({
-        success: true,
-        profile: updatedProfile,
-        message: 'Profile updated successfully!'
-      })
+  return {
+    success: created.length === results.length,
+    created: created.length,
+    failed: results.length - created.length,
+    results
+  }
+}
+
+// Bulk engagement ingestion: NDJSON events are buffered and written in
+// coalesced batches; ?wait=true holds the response until they are stored
+async function ingestEvents({ request, url }) {
+  const ingestor = getEngagementIngestor(getDb)
+  const result = await ingestNdjson(ingestor, request.body)
+
+  if (url.searchParams.get('wait') === 'true') {
+    await ingestor.drain()
+  }
+
+  return NextResponse.json({ success: result.rejected === 0, ...result }, { status: 202 })
+}
+
+// Engagement events: a single event or an array of them. They come from
+// platforms, not a session, so each is recorded for its post's tenant.
+async function recordEvents({ body: events }) {
+  const db = await getDb()
+  const tenants = await findPostTenants(db, events.map(event => event.postId))
+  let recorded = 0
+  for (const event of events) {
+    const tenantId = tenants.get(event.postId)
+    if (tenantId) {
+      await recordEngagement(forTenant(db, tenantId), event)
+      recorded++
     }
+  }
+  for (const tenantId of new Set(tenants.values())) {
+    invalidate(tenantId, 'posts', 'analytics')
+  }
+
+  return {
+    success: true,
+    recorded,
+    unattributed: events.length - recorded
+  }
+}
+
+// Streaming image upload: the body is the raw image or a multipart form
+async function uploadImage({ request, url, tenantId }) {
+  const db = await tenantDb(tenantId)
+  let uploaded
 
-    // Upload image
-    if (endpoint === 'images/upload') {
-      // Mock image upload - in real app, you'd handle file upload to Google Drive
-      const newImage = {
-        id: uuidv4(),
-        filename: body.filename || 'uploaded-image.jpg',
-        url: body.url || 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=800&h=600&fit=crop',
-        thumbnail: body.thumbnail || 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=200&h=200&fit=crop',
-        category: body.category || 'Uncategorized',
-        uploadedAt: new Date().toISOString(),
-        size: '2.1MB'
-      }
-
-      return NextResponse.json({
-        success: true,
-        image: newImage,
-        message: 'Image uploaded successfully!'
-      })
+  if (contentType(request).startsWith('multipart/form-data')) {
+    uploaded = await storeMultipart(db, request)
+  } else {
+    const options = {
+      filename: url.searchParams.get('filename'),
+      category: url.searchParams.get('category'),
+      tags: url.searchParams.get('tags'),
+      contentType: uploadContentType(contentType(request)),
+      sha256: request.headers.get('x-content-sha256')
     }
+    // Known content is linked without reading the body at all
+    const existing = await dedupByHash(db, options)
+    uploaded = [existing ? { image: existing, deduplicated: true } : await storeStream(db, request.body, options)]
+  }
+  await enqueueDerivatives(db, uploaded.map(({ image }) => image))
+  invalidate(tenantId, 'images')
 
-    return NextResponse.json({ error: 'Endpoint not found' }, { status: 404 })
+  return {
+    success: true,
+    image: uploaded[0]?.image,
+    images: uploaded.map(({ image }) => image),
+    deduplicated: uploaded.every(({ deduplicated }) => deduplicated),
+    message: 'Image uploaded successfully!'
+  }
+}
+
+// Upload image by URL (metadata only, the file is hosted elsewhere)
+async function linkImage({ body, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const image = await createLinkedImage(db, body)
+  invalidate(tenantId, 'images')
 
-  } catch (error) {
-    console.error('API Error:', error)
-    return NextResponse.json({ 
-      error: 'Internal server error',
-      message: error.message 
-    }, { status: 500 })
+  return {
+    success: true,
+    image,
+    message: 'Image uploaded successfully!'
   }
 }
 
-// PUT handler
-export async function PUT(request, { params }) {
-  const path = params?.path || []
-  const endpoint = path.join('/')
+// Start a resumable upload
+async function startUpload({ body, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const upload = await createUploadSession(db, body)
+  if (upload.image) {
+    invalidate(tenantId, 'images')
+  }
 
-  try {
-    const body = await request.json()
-
-    // Update post
-    if (endpoint.startsWith('posts/')) {
-      const postId = endpoint.split('/')[1]
-      
-      const updatedPost = {
-        id: postId,
-        ...body,
-        updatedAt: new Date().toISOString()
-      }
-
-      console.log('Updating post:', updatedPost)
-      
-      return NextResponse.json({
-        success: true,
-        post: updatedPost,
-        message: 'Post updated successfully!'
-      })
-    }
+  return { success: true, upload }
+}
+
+// Create a post, published now or scheduled
+async function newPost({ body, user, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const post = await createPost(db, body)
 
-    return NextResponse.json({ error: 'Endpoint not found' }, { status: 404 })
+  if (post.status === 'scheduled') {
+    await enqueuePost(db, post)
+  } else {
+    await recordPostPublished(db, post)
+    // Platforms are called after the response; outcomes land in post.delivery
+    publishInBackground(db, [post], { account: user })
+  }
+  invalidate(tenantId, 'posts', 'analytics')
+  emitEvent(tenantId, 'post.created', { id: post.id, status: post.status, scheduledAt: post.scheduledAt })
 
-  } catch (error) {
-    console.error('API Error:', error)
-    return NextResponse.json({ 
-      error: 'Internal server error',
-      message: error.message 
-    }, { status: 500 })
+  return {
+    success: true,
+    post,
+    message: body.action === 'publish' ? 'Post published successfully!' : 'Post scheduled successfully!'
   }
 }
 
-// DELETE handler
-export async function DELETE(request, { params }) {
-  const path = params?.path || []
-  const endpoint = path.join('/')
+// Save business profile
+async function updateProfile({ body, tenantId }) {
+  const profile = await saveProfile(await tenantDb(tenantId), body)
+  invalidate(tenantId, 'profile')
 
-  try {
-    // Delete post
-    if (endpoint.startsWith('posts/')) {
-      const postId = endpoint.split('/')[1]
-      
-      console.log('Deleting post:', postId)
-      
-      return NextResponse.json({
-        success: true,
-        message: 'Post deleted successfully!'
-      })
-    }
+  return {
+    success: true,
+    profile,
+    message: 'Profile updated successfully!'
+  }
+}
 
-    return NextResponse.json({ error: 'Endpoint not found' }, { status: 404 })
+// PUT routes
 
-  } catch (error) {
-    console.error('API Error:', error)
-    return NextResponse.json({ 
-      error: 'Internal server error',
-      message: error.message 
-    }, { status: 500 })
+// Next chunk of a resumable upload, positioned by Content-Range
+async function uploadChunk({ request, params, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const upload = await appendChunk(db, params.id, request.body, request.headers.get('content-range'))
+  if (upload.complete) {
+    await enqueueDerivatives(db, [upload.image])
+    invalidate(tenantId, 'images')
   }
-}
\ No newline at end of file
+
+  return { success: true, upload }
+}
+
+async function updatePost({ body, params, tenantId }) {
+  const updatedPost = {
+    id: params.id,
+    ...body,
+    updatedAt: new Date().toISOString()
+  }
+
+  console.log('Updating post:', updatedPost)
+  invalidate(tenantId, 'posts', 'analytics')
+
+  return {
+    success: true,
+    post: updatedPost,
+    message: 'Post updated successfully!'
+  }
+}
+
+// DELETE routes
+
+async function deletePost({ params, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const { deletedCount } = await db.collection('posts').deleteOne({ id: params.id })
+  if (deletedCount > 0) {
+    await cancelPostJob(db, params.id)
+    invalidate(tenantId, 'posts', 'analytics')
+    emitEvent(tenantId, 'post.deleted', { id: params.id })
+  }
+
+  return {
+    success: true,
+    message: 'Post deleted successfully!'
+  }
+}
+
+// Delete image from the library
+async function deleteImage({ params, tenantId }) {
+  const db = await tenantDb(tenantId)
+  const deleted = await deleteImages(db, [params.id])
+  invalidate(tenantId, 'images')
+
+  if (!deleted) {
+    return NextResponse.json({ error: 'Image not found' }, { status: 404 })
+  }
+  return {
+    success: true,
+    message: 'Image deleted successfully!'
+  }
+}
+
+// Routes sharing a path are tried in order; `accepts` picks by content type
+const router = createRouter([
+  { method: 'GET', path: '', handler: apiInfo },
+  { method: 'GET', path: 'health', handler: health },
+  { method: 'GET', path: 'metrics', handler: metrics },
+  { method: 'GET', path: 'events', middleware: [auth], handler: events },
+  { method: 'GET', path: 'accounts/google', middleware: [auth], handler: googleAccount },
+  { method: 'GET', path: 'profile', middleware: [auth, cached('profile')], handler: profile },
+  { method: 'GET', path: 'posts', middleware: [auth, cached('posts')], handler: getPosts },
+  { method: 'GET', path: 'posts/calendar', middleware: [auth, cached('posts')], handler: postCalendar },
+  { method: 'GET', path: 'analytics', middleware: [auth, cached('analytics')], handler: analytics },
+  { method: 'GET', path: 'images', middleware: [auth, cached('images')], handler: getImages },
+  { method: 'GET', path: 'export', middleware: [auth], handler: exportData },
+  { method: 'GET', path: 'images/files/:sha256', handler: imageFile },
+  { method: 'GET', path: 'images/files/:sha256/:variant', handler: imageFile },
+  { method: 'GET', path: 'images/uploads/:id', middleware: [auth], handler: uploadProgress },
+
+  { method: 'POST', path: 'posts', middleware: [auth], body: postInput, handler: newPost },
+  { method: 'POST', path: 'posts/batch', middleware: [auth], body: 'text', maxBodyBytes: BATCH_MAX_BODY_BYTES, handler: createPostBatch },
+  { method: 'POST', path: 'analytics/events', middleware: [webhook], accepts: isNdjson, handler: ingestEvents },
+  { method: 'POST', path: 'analytics/events', middleware: [webhook], body: engagementEvents, handler: recordEvents },
+  { method: 'POST', path: 'images/upload', accepts: isJson, middleware: [auth], body: linkedImageInput, handler: linkImage },
+  { method: 'POST', path: 'images/upload', middleware: [auth], handler: uploadImage },
+  { method: 'POST', path: 'images/uploads', middleware: [auth], body: uploadSessionInput, handler: startUpload },
+  { method: 'POST', path: 'profile', middleware: [auth], body: profileInput, handler: updateProfile },
+
+  { method: 'PUT', path: 'images/uploads/:id', middleware: [auth], handler: uploadChunk },
+  { method: 'PUT', path: 'posts/:id', middleware: [auth], body: postUpdate, handler: updatePost },
+
+  { method: 'DELETE', path: 'posts/:id', middleware: [auth], handler: deletePost },
+  { method: 'DELETE', path: 'images/:id', middleware: [auth], handler: deleteImage }
+])
+
+// Every method is timed per route and answers with a Server-Timing header
+export const GET = withMetrics('GET', withCapture('GET', router.handler('GET')))
+export const POST = withMetrics('POST', withCapture('POST', router.handler('POST')))
+export const PUT = withMetrics('PUT', withCapture('PUT', router.handler('PUT')))
+export const DELETE = withMetrics('DELETE', withCapture('DELETE', router.handler('DELETE')))
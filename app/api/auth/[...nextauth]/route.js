@@ -1,5 +1,7 @@
 import NextAuth from 'next-auth'
 import GoogleProvider from 'next-auth/providers/google'
+import { getDb } from '@/lib/mongodb'
+import { getAccessToken, saveTokens } from '@/lib/tokens'
 
 const handler = NextAuth({
   providers: [
@@ -19,14 +21,32 @@ const handler = NextAuth({
   callbacks: {
     async jwt({ token, account }) {
       if (account) {
+        // Each account is its own business until accounts can join one
+        token.tenantId = token.tenantId || token.sub
         token.accessToken = account.access_token
         token.refreshToken = account.refresh_token
         token.expiresAt = account.expires_at
+        // Server-side Google calls get their tokens from the shared token manager
+        await saveTokens(await getDb(), token.sub, {
+          accessToken: account.access_token,
+          refreshToken: account.refresh_token,
+          expiresAt: account.expires_at * 1000
+        })
+      } else if (token.expiresAt && Date.now() >= token.expiresAt * 1000) {
+        try {
+          const { accessToken, expiresAt } = await getAccessToken(await getDb(), token.sub)
+          token.accessToken = accessToken
+          token.expiresAt = Math.floor(expiresAt / 1000)
+          delete token.error
+        } catch (error) {
+          token.error = 'RefreshAccessTokenError'
+        }
       }
       return token
     },
     async session({ session, token }) {
       session.accessToken = token.accessToken
+      session.error = token.error
       return session
     },
   },
@@ -5,17 +5,317 @@ Tests all backend API endpoints for functionality and proper responses
 """
 
 import requests
+import argparse
+import asyncio
+import csv
 import json
+import hashlib
+import math
+import os
+import random
 import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import uuid
 
-# Get base URL from environment
-BASE_URL = "https://social-manager-8.preview.emergentagent.com/api"
+# Get base URL from environment (API_BASE_URL=http://localhost:3000/api for a local server)
+BASE_URL = os.environ.get("API_BASE_URL", "https://social-manager-8.preview.emergentagent.com/api")
+
+# Requests without a NextAuth session act for this tenant when the server runs
+# with ALLOW_ANONYMOUS_API=true (otherwise they get 401), so documents the
+# benchmarks seed straight into MongoDB are written under it
+TEST_TENANT = "anonymous"
+
+# Engagement webhooks authenticate with the secret the server is configured with
+WEBHOOK_HEADERS = {"X-Webhook-Secret": os.environ.get("ENGAGEMENT_WEBHOOK_SECRET", "")}
+
+
+def sample_profile():
+    """Business profile payload used by the profile POST checks"""
+    return {
+        "businessName": "Test Restaurant API",
+        "businessType": "restaurant",
+        "address": "123 Test Street, Test City",
+        "phone": "(555) 999-8888",
+        "email": "test@testrestaurant.com",
+        "connectedAccounts": {
+            "instagram": {"connected": True, "username": "@testrestaurant"},
+            "facebook": {"connected": False, "username": None}
+        }
+    }
+
+
+def sample_publish_post():
+    """Post payload that is published immediately"""
+    return {
+        "content": "🚀 Testing our amazing API! This post was created via automated testing. #APITesting #SocialFlow",
+        "platforms": ["instagram", "facebook"],
+        "action": "publish",
+        "images": ["https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=400&h=400&fit=crop"]
+    }
+
+
+def sample_scheduled_post():
+    """Post payload scheduled for tomorrow"""
+    future_date = (datetime.now() + timedelta(days=1)).isoformat()
+    return {
+        "content": "📅 This is a scheduled post created by our API testing suite! Will be published tomorrow. #Scheduled #Testing",
+        "platforms": ["instagram"],
+        "action": "schedule",
+        "scheduledAt": future_date,
+        "images": []
+    }
+
+
+def sample_image():
+    """Image metadata payload used by the upload checks"""
+    return {
+        "filename": "test-api-upload.jpg",
+        "url": "https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=800&h=600&fit=crop",
+        "thumbnail": "https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=200&h=200&fit=crop",
+        "category": "API Testing"
+    }
+
+
+def generated_chunks(seed, total_bytes, chunk_size=1 << 20):
+    """Deterministic pseudo-random bytes, produced a chunk at a time"""
+    rng = random.Random(seed)
+    sent = 0
+    while sent < total_bytes:
+        size = min(chunk_size, total_bytes - sent)
+        yield rng.randbytes(size)
+        sent += size
+
+
+def generated_sha256(seed, total_bytes):
+    """sha256 of generated_chunks(seed, total_bytes) without holding it in memory"""
+    digest = hashlib.sha256()
+    for chunk in generated_chunks(seed, total_bytes):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def mongo_db():
+    """Database handle for benchmarks that seed or inspect MongoDB directly.
+
+    Uses the same MONGO_URL / DB_NAME variables as the Next.js server. pymongo
+    is only needed for the benchmarks, so it is imported on demand.
+    """
+    try:
+        from pymongo import MongoClient
+    except ImportError:
+        raise RuntimeError("MongoDB benchmarks require pymongo (pip install pymongo)")
+
+    client = MongoClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    return client[os.environ.get("DB_NAME", "socialflow_pro")]
+
+
+def write_report(report, path):
+    """Write a benchmark or load report as stable, diffable JSON"""
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True, default=str)
+        f.write("\n")
+    print(f"\n📝 Results written to {path}")
+
+
+def latency_summary(latencies_ms):
+    """p50/p95/p99/max of a list of millisecond latencies"""
+    ordered = sorted(latencies_ms)
+    if not ordered:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    return {
+        "p50": round(percentile(ordered, 50), 2),
+        "p95": round(percentile(ordered, 95), 2),
+        "p99": round(percentile(ordered, 99), 2),
+        "max": round(ordered[-1], 2)
+    }
+
+
+def parse_prometheus(text):
+    """Samples of a Prometheus text exposition as {"name{labels}": value}"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        key, _, value = line.rpartition(" ")
+        try:
+            samples[key] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+# Request shapes driven by load mode, keyed by the test_* method they mirror.
+# Each entry is (method, path, payload factory or None).
+LOAD_SCENARIOS = {
+    "root_api": ("GET", "/", None),
+    "user_profile_get": ("GET", "/profile", None),
+    "user_profile_post": ("POST", "/profile", sample_profile),
+    "posts_get_all": ("GET", "/posts", None),
+    "posts_get_filtered": ("GET", "/posts?status=scheduled", None),
+    "posts_create_publish": ("POST", "/posts", sample_publish_post),
+    "posts_create_schedule": ("POST", "/posts", sample_scheduled_post),
+    "analytics_default": ("GET", "/analytics", None),
+    "analytics_timeframes": ("GET", "/analytics?timeframe=90", None),
+    "image_library": ("GET", "/images", None),
+    "image_upload": ("POST", "/images/upload", sample_image),
+}
+
+DEFAULT_LOAD_SCENARIOS = ["posts_get_all", "analytics_default", "image_library"]
+
+class StubPlatformServer:
+    """Local stand-in for the social platform APIs.
+
+    Accepts POST /<platform>/posts like the publisher's HTTP adapter sends and
+    answers with a fake external id after `latency_ms`. `fail_rate` makes a
+    share of requests return 503 to exercise retries and circuit breakers.
+    Point the server at it with PUBLISH_ADAPTER_URL=http://<host>:<port>.
+    """
+
+    def __init__(self, port=4010, latency_ms=20, fail_rate=0.0):
+        self.port = port
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.received = {}
+        self.failed = {}
+        self.first_at = {}
+        self.last_at = {}
+        self.httpd = None
+
+    def handle(self, platform):
+        """Record one publish call; returns the HTTP status to answer with"""
+        time.sleep(self.latency_ms / 1000)
+        now = time.time()
+        fail = random.random() < self.fail_rate
+        with self.lock:
+            counts = self.failed if fail else self.received
+            counts[platform] = counts.get(platform, 0) + 1
+            self.first_at.setdefault(platform, now)
+            self.last_at[platform] = now
+        return 503 if fail else 200
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                parts = self.path.strip("/").split("/")
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if len(parts) != 2 or parts[1] != "posts":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                status = stub.handle(parts[0])
+                body = json.dumps({"id": f"{parts[0]}-{uuid.uuid4().hex[:12]}"}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def total(self):
+        with self.lock:
+            return sum(self.received.values())
+
+    def throughput(self):
+        """Accepted requests per second per platform over its active window"""
+        with self.lock:
+            return {
+                platform: round(count / (self.last_at[platform] - self.first_at[platform]), 1)
+                if self.last_at[platform] > self.first_at[platform] else None
+                for platform, count in self.received.items()
+            }
+
+
+class FakeTokenServer:
+    """Local stand-in for Google's OAuth token endpoint.
+
+    Answers refresh_token grants at POST /token with a new access token that
+    expires after `expires_in` seconds, slowly enough (`latency_ms`) that
+    concurrent refreshes would pile up if they were not coalesced. The refresh
+    token "revoked" gets invalid_grant. Point the server at it with
+    GOOGLE_TOKEN_URL=http://<host>:<port>/token.
+    """
+
+    def __init__(self, port=4020, expires_in=3600, latency_ms=200):
+        self.port = port
+        self.expires_in = expires_in
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.grants = []
+        self.httpd = None
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = dict(pair.split("=", 1) for pair in
+                            self.rfile.read(length).decode().split("&") if "=" in pair)
+                time.sleep(fake.latency_ms / 1000)
+                with fake.lock:
+                    fake.grants.append((time.time(), form.get("refresh_token")))
+                    issued = len(fake.grants)
+                if form.get("refresh_token") == "revoked":
+                    status, body = 400, {"error": "invalid_grant"}
+                else:
+                    status, body = 200, {"access_token": f"fake-access-{issued}",
+                                         "expires_in": fake.expires_in, "token_type": "Bearer"}
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def count(self):
+        with self.lock:
+            return len(self.grants)
+
 
 class SocialFlowAPITester:
-    def __init__(self):
-        self.base_url = BASE_URL
+    def __init__(self, base_url=None):
+        self.base_url = (base_url or BASE_URL).rstrip("/")
+        self.upload_test_mb = int(os.environ.get("UPLOAD_TEST_MB", "50"))
         self.test_results = []
         self.failed_tests = []
         
@@ -96,17 +396,7 @@ class SocialFlowAPITester:
     def test_user_profile_post(self):
         """Test POST /api/profile endpoint"""
         try:
-            test_profile = {
-                "businessName": "Test Restaurant API",
-                "businessType": "restaurant",
-                "address": "123 Test Street, Test City",
-                "phone": "(555) 999-8888",
-                "email": "test@testrestaurant.com",
-                "connectedAccounts": {
-                    "instagram": {"connected": True, "username": "@testrestaurant"},
-                    "facebook": {"connected": False, "username": None}
-                }
-            }
+            test_profile = sample_profile()
             
             response = requests.post(f"{self.base_url}/profile", 
                                    json=test_profile, timeout=10)
@@ -166,39 +456,78 @@ class SocialFlowAPITester:
             self.log_test("Posts GET All", False, f"Request error: {str(e)}")
             return False
     
+    def walk_posts(self, status, limit=25, fields=None, max_pages=10000):
+        """Follow nextCursor through every page of GET /api/posts.
+
+        Returns (posts, pages) and raises ValueError if a page is malformed,
+        out of order, or repeats a post already seen.
+        """
+        posts = []
+        seen = set()
+        pages = 0
+        after = None
+
+        while pages < max_pages:
+            params = {"status": status, "limit": limit}
+            if after:
+                params["after"] = after
+            if fields:
+                params["fields"] = fields
+
+            response = requests.get(f"{self.base_url}/posts", params=params, timeout=10)
+            if response.status_code != 200:
+                raise ValueError(f"page {pages + 1}: HTTP {response.status_code}: {response.text}")
+
+            data = response.json()
+            if not data.get("success") or "posts" not in data or "nextCursor" not in data:
+                raise ValueError(f"page {pages + 1}: invalid response structure: {data}")
+
+            page = data["posts"]
+            pages += 1
+            if len(page) > limit:
+                raise ValueError(f"page {pages}: {len(page)} posts exceeds limit {limit}")
+
+            for post in page:
+                if status != "all" and "status" in post and post["status"] != status:
+                    raise ValueError(f"page {pages}: post {post['id']} has status {post['status']}")
+                if post["id"] in seen:
+                    raise ValueError(f"page {pages}: post {post['id']} returned twice")
+                if posts and post["scheduledAt"] > posts[-1]["scheduledAt"]:
+                    raise ValueError(f"page {pages}: posts not ordered by scheduledAt")
+                seen.add(post["id"])
+                posts.append(post)
+
+            after = data["nextCursor"]
+            if not after:
+                return posts, pages
+
+        raise ValueError(f"gave up after {max_pages} pages")
+
     def test_posts_get_filtered(self):
-        """Test GET /api/posts with status filter"""
+        """Test GET /api/posts with status filter, walking every page"""
         try:
-            # Test published posts
-            response = requests.get(f"{self.base_url}/posts?status=published", timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and "posts" in data:
-                    published_posts = data["posts"]
-                    
-                    # Test scheduled posts
-                    response2 = requests.get(f"{self.base_url}/posts?status=scheduled", timeout=10)
-                    if response2.status_code == 200:
-                        data2 = response2.json()
-                        scheduled_posts = data2["posts"]
-                        
-                        self.log_test("Posts GET Filtered", True, 
-                                    f"Published: {len(published_posts)}, Scheduled: {len(scheduled_posts)}")
-                        return True
-                    else:
-                        self.log_test("Posts GET Filtered", False, 
-                                    f"Scheduled posts request failed: {response2.status_code}")
-                        return False
-                else:
-                    self.log_test("Posts GET Filtered", False, 
-                                f"Invalid response structure: {data}")
-                    return False
-            else:
-                self.log_test("Posts GET Filtered", False, 
-                            f"HTTP {response.status_code}: {response.text}")
+            counts = []
+            for status in ["published", "scheduled"]:
+                posts, pages = self.walk_posts(status)
+                counts.append(f"{status.capitalize()}: {len(posts)} in {pages} page(s)")
+
+            # Projection keeps the cursor fields and drops everything not asked for
+            response = requests.get(f"{self.base_url}/posts",
+                                    params={"limit": 50, "fields": "status"}, timeout=10)
+            projected = response.json().get("posts", [])
+            extra = [key for post in projected for key in post
+                     if key not in ("id", "scheduledAt", "status")]
+            if extra:
+                self.log_test("Posts GET Filtered", False,
+                            f"fields=status returned unrequested fields: {sorted(set(extra))}")
                 return False
-                
+
+            self.log_test("Posts GET Filtered", True, ", ".join(counts))
+            return True
+
+        except ValueError as e:
+            self.log_test("Posts GET Filtered", False, str(e))
+            return False
         except Exception as e:
             self.log_test("Posts GET Filtered", False, f"Request error: {str(e)}")
             return False
@@ -206,12 +535,7 @@ class SocialFlowAPITester:
     def test_posts_create_publish(self):
         """Test POST /api/posts - create and publish immediately"""
         try:
-            test_post = {
-                "content": "🚀 Testing our amazing API! This post was created via automated testing. #APITesting #SocialFlow",
-                "platforms": ["instagram", "facebook"],
-                "action": "publish",
-                "images": ["https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=400&h=400&fit=crop"]
-            }
+            test_post = sample_publish_post()
             
             response = requests.post(f"{self.base_url}/posts", 
                                    json=test_post, timeout=10)
@@ -245,16 +569,7 @@ class SocialFlowAPITester:
     def test_posts_create_schedule(self):
         """Test POST /api/posts - create and schedule for later"""
         try:
-            # Schedule for tomorrow
-            future_date = (datetime.now() + timedelta(days=1)).isoformat()
-            
-            test_post = {
-                "content": "📅 This is a scheduled post created by our API testing suite! Will be published tomorrow. #Scheduled #Testing",
-                "platforms": ["instagram"],
-                "action": "schedule",
-                "scheduledAt": future_date,
-                "images": []
-            }
+            test_post = sample_scheduled_post()
             
             response = requests.post(f"{self.base_url}/posts", 
                                    json=test_post, timeout=10)
@@ -285,6 +600,60 @@ class SocialFlowAPITester:
             self.log_test("Posts CREATE Schedule", False, f"Request error: {str(e)}")
             return False
     
+    def test_post_calendar(self):
+        """Test GET /api/posts/calendar bins posts by local day in the requested time zone"""
+        post_id = None
+        try:
+            post = sample_scheduled_post()
+            post["content"] = f"Calendar check {uuid.uuid4()}"
+            # 02:30 UTC on Jan 1st is still Dec 31st in Los Angeles
+            post["scheduledAt"] = "2031-01-01T02:30:00Z"
+            response = requests.post(f"{self.base_url}/posts", json=post, timeout=10)
+            if response.status_code != 200:
+                self.log_test("Post Calendar", False, f"Could not create post: HTTP {response.status_code}")
+                return False
+            post_id = response.json()["post"]["id"]
+
+            details = []
+            for tz, expected_day in [("UTC", "2031-01-01"), ("America/Los_Angeles", "2030-12-31")]:
+                response = requests.get(f"{self.base_url}/posts/calendar", timeout=10, params={
+                    "from": "2030-12-31", "to": "2031-01-02", "tz": tz
+                })
+                data = response.json()
+                if response.status_code != 200 or not data.get("success"):
+                    self.log_test("Post Calendar", False, f"{tz}: HTTP {response.status_code}: {response.text[:200]}")
+                    return False
+                days = {day["day"]: day for day in data["days"]}
+                day = days.get(expected_day)
+                if not day or post_id not in [p["id"] for p in day["posts"]] and day["count"] <= len(day["posts"]):
+                    self.log_test("Post Calendar", False, f"{tz}: post not binned on {expected_day}: {list(days)}")
+                    return False
+                if any(set(p) - {"id", "scheduledAt", "status", "platforms", "preview"} for p in day["posts"]):
+                    self.log_test("Post Calendar", False, f"{tz}: summaries carry extra fields")
+                    return False
+                details.append(f"{tz} → {expected_day}")
+
+            for params, reason in [
+                ({"from": "2031-01-01", "to": "2031-01-02", "tz": "Mars/Olympus_Mons"}, "unknown tz"),
+                ({"from": "2031-01-01", "to": "2032-01-01", "tz": "UTC"}, "oversized window"),
+                ({"from": "2031-01-02", "to": "2031-01-01", "tz": "UTC"}, "reversed window"),
+            ]:
+                response = requests.get(f"{self.base_url}/posts/calendar", params=params, timeout=10)
+                if response.status_code != 400:
+                    self.log_test("Post Calendar", False, f"{reason}: expected 400, got {response.status_code}")
+                    return False
+            details.append("bad windows rejected")
+
+            self.log_test("Post Calendar", True, ", ".join(details))
+            return True
+
+        except Exception as e:
+            self.log_test("Post Calendar", False, f"Request error: {str(e)}")
+            return False
+        finally:
+            if post_id:
+                requests.delete(f"{self.base_url}/posts/{post_id}", timeout=10)
+
     def test_analytics_default(self):
         """Test GET /api/analytics with default timeframe"""
         try:
@@ -356,55 +725,75 @@ class SocialFlowAPITester:
             return False
     
     def test_image_library(self):
-        """Test GET /api/images endpoint"""
+        """Test GET /api/images: projected, paginated and filterable listing"""
         try:
-            response = requests.get(f"{self.base_url}/images", timeout=10)
+            response = requests.get(f"{self.base_url}/images", params={"limit": 5}, timeout=10)
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and "images" in data:
-                    images = data["images"]
-                    if isinstance(images, list) and len(images) > 0:
-                        # Check first image structure
-                        first_image = images[0]
-                        required_fields = ["id", "filename", "url", "thumbnail", "category"]
-                        
-                        missing_fields = [field for field in required_fields 
-                                        if field not in first_image]
-                        if not missing_fields:
-                            self.log_test("Image Library", True, 
-                                        f"Retrieved {len(images)} images")
-                            return True
-                        else:
-                            self.log_test("Image Library", False, 
-                                        f"Image missing fields: {missing_fields}")
-                            return False
-                    else:
-                        self.log_test("Image Library", False, 
-                                    "No images returned or invalid format")
-                        return False
-                else:
+            if response.status_code != 200:
+                self.log_test("Image Library", False, 
+                            f"HTTP {response.status_code}: {response.text}")
+                return False
+
+            data = response.json()
+            if not data.get("success") or not isinstance(data.get("images"), list) \
+                    or "nextCursor" not in data:
+                self.log_test("Image Library", False, 
+                            f"Invalid response structure: {data}")
+                return False
+
+            images = data["images"]
+            if len(images) > 5:
+                self.log_test("Image Library", False, 
+                            f"limit=5 returned {len(images)} images")
+                return False
+
+            # Listing rows are projected down to what the grid renders
+            required_fields = ["id", "filename", "thumbnail", "category"]
+            for image in images:
+                missing_fields = [field for field in required_fields if field not in image]
+                if missing_fields:
                     self.log_test("Image Library", False, 
-                                f"Invalid response structure: {data}")
+                                f"Image missing fields: {missing_fields}")
                     return False
-            else:
+
+            if data["nextCursor"]:
+                second = requests.get(f"{self.base_url}/images",
+                                      params={"limit": 5, "after": data["nextCursor"]}, timeout=10)
+                overlap = {img["id"] for img in images} & \
+                    {img["id"] for img in second.json().get("images", [])}
+                if second.status_code != 200 or overlap:
+                    self.log_test("Image Library", False, 
+                                f"Second page invalid: HTTP {second.status_code}, {len(overlap)} repeated")
+                    return False
+
+            category = requests.get(f"{self.base_url}/images",
+                                    params={"category": "Food"}, timeout=10)
+            wrong = [img["id"] for img in category.json().get("images", [])
+                     if img.get("category") != "Food"]
+            if category.status_code != 200 or wrong:
                 self.log_test("Image Library", False, 
-                            f"HTTP {response.status_code}: {response.text}")
+                            f"Category filter returned other categories: {wrong}")
+                return False
+
+            search = requests.get(f"{self.base_url}/images", params={"q": "coffee"}, timeout=10)
+            bad_cursor = requests.get(f"{self.base_url}/images", params={"after": "nope"}, timeout=10)
+            if search.status_code != 200 or bad_cursor.status_code != 400:
+                self.log_test("Image Library", False, 
+                            f"Search HTTP {search.status_code}, bad cursor HTTP {bad_cursor.status_code}")
                 return False
+
+            self.log_test("Image Library", True, 
+                        f"Retrieved {len(images)} images, filters and cursor OK")
+            return True
                 
         except Exception as e:
             self.log_test("Image Library", False, f"Request error: {str(e)}")
             return False
-    
+
     def test_image_upload(self):
         """Test POST /api/images/upload endpoint"""
         try:
-            test_image = {
-                "filename": "test-api-upload.jpg",
-                "url": "https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=800&h=600&fit=crop",
-                "thumbnail": "https://images.unsplash.com/photo-1611224923853-80b023f02d71?w=200&h=200&fit=crop",
-                "category": "API Testing"
-            }
+            test_image = sample_image()
             
             response = requests.post(f"{self.base_url}/images/upload", 
                                    json=test_image, timeout=10)
@@ -414,9 +803,10 @@ class SocialFlowAPITester:
                 if data.get("success") and "image" in data:
                     uploaded_image = data["image"]
                     if uploaded_image.get("filename") == test_image["filename"]:
-                        self.log_test("Image Upload", True, 
-                                    f"Image uploaded with ID: {uploaded_image.get('id')}")
-                        return True
+                        ok, details = self.check_streaming_uploads()
+                        self.log_test("Image Upload", ok, 
+                                    f"Image uploaded with ID: {uploaded_image.get('id')}; {details}")
+                        return ok
                     else:
                         self.log_test("Image Upload", False, 
                                     "Uploaded image data doesn't match")
@@ -434,6 +824,127 @@ class SocialFlowAPITester:
             self.log_test("Image Upload", False, f"Request error: {str(e)}")
             return False
     
+    def fetch_server_health(self):
+        """GET /api/health as a dict, or {} if the server does not expose it"""
+        try:
+            return requests.get(f"{self.base_url}/health", timeout=10).json()
+        except (requests.RequestException, ValueError):
+            return {}
+
+    def check_streaming_uploads(self):
+        """Push large files through the streaming and resumable upload paths.
+
+        Uploads one file as a raw streamed body, re-uploads the same bytes to
+        check content dedup, sends a second file in resumable chunks, and
+        reports how much the server's peak RSS grew meanwhile.
+        """
+        total = self.upload_test_mb * 1024 * 1024
+        seed = uuid.uuid4().int
+        chunk_size = 8 * 1024 * 1024
+        details = []
+
+        rss_before = self.fetch_server_health().get("process", {}).get("maxRssBytes")
+
+        # Raw streamed body, sent with chunked transfer encoding
+        params = {"filename": f"stream-{self.upload_test_mb}mb.jpg", "category": "API Testing"}
+        headers = {"Content-Type": "image/jpeg"}
+        started = time.perf_counter()
+        first = requests.post(f"{self.base_url}/images/upload", params=params, headers=headers,
+                              data=generated_chunks(seed, total), timeout=600)
+        elapsed = time.perf_counter() - started
+        if first.status_code != 200 or first.json().get("deduplicated"):
+            return False, f"streamed upload failed: HTTP {first.status_code}: {first.text[:200]}"
+        details.append(f"streamed {self.upload_test_mb}MB in {elapsed:.1f}s")
+
+        sha256 = generated_sha256(seed, total)
+        if first.json()["image"].get("sha256") != sha256:
+            return False, "server hash does not match uploaded content"
+
+        # Same bytes again: stored once, linked to a second record
+        second = requests.post(f"{self.base_url}/images/upload", params=params, headers=headers,
+                               data=generated_chunks(seed, total), timeout=600)
+        if second.status_code != 200 or not second.json().get("deduplicated"):
+            return False, f"re-upload was not deduplicated: {second.text[:200]}"
+        details.append("re-upload deduplicated")
+
+        # Declared hash of known content: deduplicated without sending bytes
+        instant = requests.post(f"{self.base_url}/images/uploads", timeout=10, json={
+            "filename": "instant.bin", "bytes": total, "sha256": sha256
+        })
+        if not instant.json().get("upload", {}).get("deduplicated"):
+            return False, f"declared-hash upload was not deduplicated: {instant.text[:200]}"
+        details.append("declared-hash dedup")
+
+        # Only raster images are accepted; markup could run script from our origin
+        rejected = requests.post(f"{self.base_url}/images/upload", params={"filename": "page.html"},
+                                 headers={"Content-Type": "text/html"}, data=b"<script></script>", timeout=10)
+        if rejected.status_code != 415:
+            return False, f"text/html upload was not rejected: HTTP {rejected.status_code}"
+        details.append("non-image rejected")
+
+        # Resumable upload of fresh content in fixed-size chunks
+        resumable_seed = seed + 1
+        session = requests.post(f"{self.base_url}/images/uploads", timeout=10, json={
+            "filename": f"resumable-{self.upload_test_mb}mb.jpg", "bytes": total,
+            "contentType": "image/jpeg", "category": "API Testing"
+        }).json().get("upload", {})
+        upload_id = session.get("uploadId")
+        if not upload_id:
+            return False, f"could not start resumable upload: {session}"
+
+        offset = 0
+        upload = {}
+        for chunk in generated_chunks(resumable_seed, total, chunk_size):
+            end = offset + len(chunk) - 1
+            response = requests.put(f"{self.base_url}/images/uploads/{upload_id}", data=chunk,
+                                    headers={"Content-Range": f"bytes {offset}-{end}/{total}"},
+                                    timeout=120)
+            if response.status_code != 200:
+                return False, f"chunk at {offset} failed: HTTP {response.status_code}: {response.text[:200]}"
+            upload = response.json()["upload"]
+            offset = upload["offset"]
+
+        status = requests.get(f"{self.base_url}/images/uploads/{upload_id}", timeout=10).json()
+        if not upload.get("complete") or not status.get("upload", {}).get("complete"):
+            return False, f"resumable upload did not complete: {upload}"
+        details.append(f"resumable in {math.ceil(total / chunk_size)} chunks")
+
+        rss_after = self.fetch_server_health().get("process", {}).get("maxRssBytes")
+        if rss_before and rss_after:
+            details.append(f"server peak RSS {rss_before / 1048576:.0f}MB -> {rss_after / 1048576:.0f}MB")
+
+        return True, ", ".join(details)
+
+    def test_conditional_requests(self):
+        """Test that cached GET endpoints answer If-None-Match with 304"""
+        try:
+            details = []
+            all_working = True
+
+            for endpoint in ["/profile", "/posts", "/analytics", "/images"]:
+                first = requests.get(f"{self.base_url}{endpoint}", timeout=10)
+                etag = first.headers.get("ETag")
+                if first.status_code != 200 or not etag:
+                    details.append(f"{endpoint}: ✗ (HTTP {first.status_code}, ETag {etag!r})")
+                    all_working = False
+                    continue
+
+                second = requests.get(f"{self.base_url}{endpoint}",
+                                      headers={"If-None-Match": etag}, timeout=10)
+                if second.status_code == 304 and not second.content:
+                    details.append(f"{endpoint}: ✓")
+                else:
+                    details.append(f"{endpoint}: ✗ (HTTP {second.status_code}, "
+                                   f"{len(second.content)} byte body)")
+                    all_working = False
+
+            self.log_test("Conditional Requests", all_working, ", ".join(details))
+            return all_working
+
+        except Exception as e:
+            self.log_test("Conditional Requests", False, f"Request error: {str(e)}")
+            return False
+    
     def test_database_connection(self):
         """Test database connectivity through API calls"""
         try:
@@ -487,21 +998,112 @@ class SocialFlowAPITester:
                 details.append(f"404 for invalid endpoint: ✗ (got {response1.status_code})")
                 error_handling_working = False
             
-            # Check that invalid POST still returns proper JSON error
-            if response2.status_code in [400, 500] and response2.headers.get('content-type', '').startswith('application/json'):
-                details.append("JSON error response: ✓")
+            # Invalid bodies are rejected by schema validation before any DB work
+            if response2.status_code == 400 and response2.headers.get('content-type', '').startswith('application/json'):
+                details.append("400 for invalid body: ✓")
             else:
-                details.append(f"JSON error response: ✗ (got {response2.status_code})")
-                # This is minor, don't fail the test
-            
-            self.log_test("Error Handling", True, 
+                details.append(f"400 for invalid body: ✗ (got {response2.status_code})")
+                error_handling_working = False
+
+            # Bodies over the size limit are refused from Content-Length alone
+            response3 = requests.post(f"{self.base_url}/profile", data=b"{" + b" " * (2 << 20) + b"}",
+                                      headers={"Content-Type": "application/json"}, timeout=30)
+            if response3.status_code == 413:
+                details.append("413 for oversized body: ✓")
+            else:
+                details.append(f"413 for oversized body: ✗ (got {response3.status_code})")
+                error_handling_working = False
+
+            # Known path, wrong method
+            response4 = requests.patch(f"{self.base_url}/posts", json={}, timeout=10)
+            if response4.status_code in [404, 405]:
+                details.append(f"{response4.status_code} for unsupported method: ✓")
+            else:
+                details.append(f"unsupported method: ✗ (got {response4.status_code})")
+                error_handling_working = False
+
+            self.log_test("Error Handling", error_handling_working,
                         f"Error handling verified: {', '.join(details)}")
-            return True
+            return error_handling_working
                 
         except Exception as e:
             self.log_test("Error Handling", False, f"Error handling test failed: {str(e)}")
             return False
     
+    def scrape_metrics(self):
+        """GET /api/metrics parsed into samples, or None if the server has no metrics"""
+        try:
+            response = requests.get(f"{self.base_url}/metrics", timeout=10)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        return parse_prometheus(response.text)
+
+    def print_metric_deltas(self, before, after):
+        """Print what a run did according to the server: per-route request
+        counts and mean total/db time and size, then other counters that moved"""
+        if not before or not after:
+            print("\n⚠️  /api/metrics not available; skipping server-side deltas")
+            return {}
+
+        def delta(key):
+            return after.get(key, 0) - before.get(key, 0)
+
+        routes = {}
+        for key in after:
+            if key.startswith("socialflow_http_request_duration_seconds_count{"):
+                labels = key[key.index("{"):]
+                count = delta(key)
+                if count > 0:
+                    routes[labels] = {
+                        "requests": int(count),
+                        "mean_ms": round(delta(f"socialflow_http_request_duration_seconds_sum{labels}") / count * 1000, 2),
+                        "mean_db_ms": round(delta(f"socialflow_http_db_duration_seconds_sum{labels}") / count * 1000, 2),
+                        "mean_bytes": round(delta(f"socialflow_http_response_size_bytes_sum{labels}") / count)
+                    }
+
+        print("\n📡 Server metrics for this run")
+        print(f"{'route':<44}{'reqs':>7}{'mean ms':>10}{'db ms':>9}{'bytes':>10}")
+        for labels, stats in sorted(routes.items(), key=lambda item: -item[1]["requests"]):
+            print(f"{labels:<44}{stats['requests']:>7}{stats['mean_ms']:>10}"
+                  f"{stats['mean_db_ms']:>9}{stats['mean_bytes']:>10}")
+
+        counters = {key: delta(key) for key in after
+                    if not key.startswith("socialflow_http_") and key.split("{")[0].endswith("_total")
+                    and delta(key)}
+        for key, value in sorted(counters.items()):
+            print(f"  {key}: +{value:g}")
+        return {"routes": routes, "counters": counters}
+
+    def test_metrics_endpoint(self):
+        """Test GET /api/metrics exposition and Server-Timing on API responses"""
+        try:
+            response = requests.get(f"{self.base_url}/posts", params={"limit": 1}, timeout=10)
+            timing = response.headers.get("Server-Timing", "")
+            if "total;dur=" not in timing:
+                self.log_test("Metrics Endpoint", False, f"No Server-Timing header on /posts: {timing!r}")
+                return False
+
+            samples = self.scrape_metrics()
+            if not samples:
+                self.log_test("Metrics Endpoint", False, "GET /metrics did not return Prometheus text")
+                return False
+
+            expected = ["socialflow_http_requests_total", "socialflow_http_request_duration_seconds_bucket",
+                        "socialflow_cache_hits_total", "socialflow_mongo_pool_checkouts_total",
+                        "socialflow_queue_pending"]
+            missing = [name for name in expected if not any(key.startswith(name) for key in samples)]
+            if missing:
+                self.log_test("Metrics Endpoint", False, f"Missing metrics: {missing}")
+                return False
+
+            self.log_test("Metrics Endpoint", True, f"{len(samples)} samples, Server-Timing: {timing}")
+            return True
+        except Exception as e:
+            self.log_test("Metrics Endpoint", False, f"Request error: {str(e)}")
+            return False
+
     def run_all_tests(self):
         """Run all backend API tests"""
         print(f"\n🚀 Starting SocialFlow Pro Backend API Tests")
@@ -519,13 +1121,17 @@ class SocialFlowAPITester:
             ("Posts GET Filtered", self.test_posts_get_filtered),
             ("Posts CREATE Publish", self.test_posts_create_publish),
             ("Posts CREATE Schedule", self.test_posts_create_schedule),
+            ("Post Calendar", self.test_post_calendar),
             ("Analytics Default", self.test_analytics_default),
             ("Analytics Timeframes", self.test_analytics_timeframes),
             ("Image Library", self.test_image_library),
             ("Image Upload", self.test_image_upload),
+            ("Conditional Requests", self.test_conditional_requests),
+            ("Metrics Endpoint", self.test_metrics_endpoint),
             ("Error Handling", self.test_error_handling)
         ]
         
+        metrics_before = self.scrape_metrics()
         passed = 0
         total = len(tests)
         
@@ -536,6 +1142,8 @@ class SocialFlowAPITester:
             except Exception as e:
                 self.log_test(test_name, False, f"Test execution error: {str(e)}")
         
+        self.print_metric_deltas(metrics_before, self.scrape_metrics())
+
         print("\n" + "=" * 60)
         print(f"📊 TEST SUMMARY")
         print(f"Total Tests: {total}")
@@ -552,9 +1160,1187 @@ class SocialFlowAPITester:
         
         return passed == total
 
+    def _load_schedule(self, scenario_names, start, duration, rps):
+        """Return a callable handing out (scenario, send_at) tickets until the run ends.
+
+        With a target RPS the send times are fixed up front (open loop), so a
+        slow server shows up as latency instead of silently lowering the rate.
+        Without one every worker fires back to back (closed loop).
+        """
+        lock = threading.Lock()
+        counter = iter(range(sys.maxsize))
+        deadline = start + duration
+
+        def next_ticket():
+            with lock:
+                n = next(counter)
+            name = scenario_names[n % len(scenario_names)]
+            if rps:
+                send_at = start + n / rps
+                return (name, send_at) if send_at < deadline else None
+            now = time.perf_counter()
+            return (name, now) if now < deadline else None
+
+        return next_ticket
+
+    def _run_load_threads(self, scenario_names, workers, duration, rps):
+        """Drive the scenarios from a thread pool with one session per worker"""
+        start = time.perf_counter()
+        next_ticket = self._load_schedule(scenario_names, start, duration, rps)
+
+        def worker():
+            session = requests.Session()
+            samples = []
+            while True:
+                ticket = next_ticket()
+                if ticket is None:
+                    break
+                name, send_at = ticket
+                delay = send_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                method, path, payload = LOAD_SCENARIOS[name]
+                ok = True
+                try:
+                    response = session.request(method, f"{self.base_url}{path}",
+                                               json=payload() if payload else None,
+                                               timeout=10)
+                    ok = response.status_code < 400
+                except requests.RequestException:
+                    ok = False
+                samples.append((name, time.perf_counter() - send_at, ok))
+            session.close()
+            return samples
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(worker) for _ in range(workers)]
+            samples = [sample for future in futures for sample in future.result()]
+
+        return samples, time.perf_counter() - start
+
+    async def _run_load_asyncio(self, scenario_names, workers, duration, rps):
+        """Drive the scenarios from asyncio tasks sharing one aiohttp session"""
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("asyncio load mode requires aiohttp (pip install aiohttp)")
+
+        start = time.perf_counter()
+        next_ticket = self._load_schedule(scenario_names, start, duration, rps)
+        samples = []
+
+        async def worker(session):
+            while True:
+                ticket = next_ticket()
+                if ticket is None:
+                    break
+                name, send_at = ticket
+                delay = send_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                method, path, payload = LOAD_SCENARIOS[name]
+                ok = True
+                try:
+                    async with session.request(method, f"{self.base_url}{path}",
+                                               json=payload() if payload else None) as response:
+                        await response.read()
+                        ok = response.status < 400
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    ok = False
+                samples.append((name, time.perf_counter() - send_at, ok))
+
+        connector = aiohttp.TCPConnector(limit=workers)
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await asyncio.gather(*(worker(session) for _ in range(workers)))
+
+        return samples, time.perf_counter() - start
+
+    def summarize_load(self, samples, elapsed):
+        """Aggregate raw (scenario, seconds, ok) samples into per-endpoint stats"""
+        grouped = {}
+        for name, latency, ok in samples:
+            latencies, errors = grouped.setdefault(name, ([], [0]))
+            latencies.append(latency * 1000)
+            if not ok:
+                errors[0] += 1
+
+        summary = {}
+        for name, (latencies, errors) in sorted(grouped.items()):
+            count = len(latencies)
+            summary[name] = {
+                "endpoint": f"{LOAD_SCENARIOS[name][0]} {LOAD_SCENARIOS[name][1]}",
+                "requests": count,
+                "errors": errors[0],
+                "error_rate": round(errors[0] / count, 4),
+                "throughput_rps": round(count / elapsed, 2) if elapsed else 0,
+                "latency_ms": latency_summary(latencies)
+            }
+        return summary
+
+    def fetch_pool_stats(self):
+        """Read MongoDB pool counters from GET /api/health, or None if unavailable"""
+        return self.fetch_server_health().get("pool")
+
+    def run_load(self, scenarios=None, workers=10, duration=30, rps=None,
+                 mode="thread", output="load_results.json"):
+        """Run the endpoint checks concurrently and report latency percentiles"""
+        scenario_names = scenarios or DEFAULT_LOAD_SCENARIOS
+        unknown = [name for name in scenario_names if name not in LOAD_SCENARIOS]
+        if unknown:
+            raise ValueError(f"Unknown load scenarios: {unknown}")
+
+        print(f"\n🔥 Starting SocialFlow Pro Load Test")
+        print(f"Base URL: {self.base_url}")
+        print(f"Mode: {mode}, workers: {workers}, duration: {duration}s, "
+              f"target RPS: {rps or 'unbounded'}")
+        print(f"Scenarios: {', '.join(scenario_names)}")
+        print("=" * 60)
+
+        started_at = datetime.now().isoformat()
+        pool_before = self.fetch_pool_stats()
+        metrics_before = self.scrape_metrics()
+        if mode == "asyncio":
+            samples, elapsed = asyncio.run(
+                self._run_load_asyncio(scenario_names, workers, duration, rps))
+        else:
+            samples, elapsed = self._run_load_threads(scenario_names, workers, duration, rps)
+
+        summary = self.summarize_load(samples, elapsed)
+        pool_after = self.fetch_pool_stats()
+        metrics_after = self.scrape_metrics()
+
+        print(f"{'scenario':<24}{'reqs':>8}{'rps':>9}{'err%':>7}"
+              f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        for name, stats in summary.items():
+            latency = stats["latency_ms"]
+            print(f"{name:<24}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}"
+                  f"{stats['error_rate'] * 100:>7.1f}{latency['p50']:>9.1f}"
+                  f"{latency['p95']:>9.1f}{latency['p99']:>9.1f}{latency['max']:>9.1f}")
+
+        if pool_before and pool_after:
+            print(f"\nMongo pool: open connections {pool_before.get('openConnections')} -> "
+                  f"{pool_after.get('openConnections')}, clients created "
+                  f"{pool_before.get('clientsCreated')} -> {pool_after.get('clientsCreated')}, "
+                  f"checkouts +{pool_after.get('checkouts', 0) - pool_before.get('checkouts', 0)}")
+
+        report = {
+            "base_url": self.base_url,
+            "mode": mode,
+            "workers": workers,
+            "target_rps": rps,
+            "duration_s": duration,
+            "elapsed_s": round(elapsed, 2),
+            "started_at": started_at,
+            "total_requests": len(samples),
+            "endpoints": summary,
+            "pool": {"before": pool_before, "after": pool_after},
+            "server_metrics": self.print_metric_deltas(metrics_before, metrics_after)
+        }
+        if output:
+            write_report(report, output)
+
+        return report
+
+    def bench_scheduler(self, count=100000, spread=60, lead=10, timeout=900):
+        """Enqueue scheduled posts straight into MongoDB and time their dispatch.
+
+        Posts become due evenly over `spread` seconds starting `lead` seconds
+        from now. Requires at least one dispatcher running against the same
+        database (npm run dispatcher, or SCHEDULER_ENABLED=true on the server).
+        """
+        db = mongo_db()
+        run_id = f"bench-{uuid.uuid4()}"
+        first_due = datetime.utcnow() + timedelta(seconds=lead)
+
+        print(f"\n⏱️  Scheduler benchmark: {count} posts due over {spread}s ({run_id})")
+
+        batch_size = 10000
+        for offset in range(0, count, batch_size):
+            posts, jobs = [], []
+            for i in range(offset, min(offset + batch_size, count)):
+                post_id = str(uuid.uuid4())
+                due = first_due + timedelta(seconds=spread * i / count)
+                posts.append({
+                    "id": post_id, "tenantId": TEST_TENANT, "content": f"Benchmark post {i}", "platforms": ["instagram"],
+                    "status": "scheduled", "scheduledAt": due, "publishedAt": None,
+                    "images": [], "createdAt": datetime.utcnow(), "benchRun": run_id,
+                    "engagement": {"likes": 0, "comments": 0, "shares": 0}
+                })
+                jobs.append({
+                    "_id": str(uuid.uuid4()), "type": "publish_post", "tenantId": TEST_TENANT, "postId": post_id,
+                    "dueAt": due, "status": "pending", "attempts": 0, "leaseOwner": None,
+                    "leaseUntil": None, "lastError": None, "createdAt": datetime.utcnow(),
+                    "updatedAt": datetime.utcnow(), "benchRun": run_id
+                })
+            db.posts.insert_many(posts, ordered=False)
+            db.jobs.insert_many(jobs, ordered=False)
+
+        print(f"Enqueued {count} jobs, waiting for dispatch...")
+        deadline = time.time() + lead + spread + timeout
+        done = 0
+        while time.time() < deadline:
+            done = db.jobs.count_documents({"benchRun": run_id, "status": {"$in": ["done", "failed"]}})
+            print(f"  {done}/{count} dispatched", end="\r")
+            if done >= count:
+                break
+            time.sleep(1)
+        print()
+
+        finished = list(db.jobs.find({"benchRun": run_id, "status": "done"},
+                                     {"lagMs": 1, "completedAt": 1, "leaseOwner": 1}))
+        failed = db.jobs.count_documents({"benchRun": run_id, "status": "failed"})
+        unpublished = count - db.posts.count_documents({"benchRun": run_id, "status": "published"}) - failed
+        completed_at = [job["completedAt"] for job in finished]
+        window = (max(completed_at) - min(completed_at)).total_seconds() if len(completed_at) > 1 else 0
+
+        report = {
+            "benchmark": "scheduler",
+            "jobs": count,
+            "completed": len(finished),
+            "failed": failed,
+            "unpublished": unpublished,
+            "workers": len({job.get("leaseOwner") for job in finished}),
+            "jobs_per_second": round(len(finished) / window, 1) if window else None,
+            "dispatch_lag_ms": latency_summary([job["lagMs"] for job in finished])
+        }
+
+        lag = report["dispatch_lag_ms"]
+        print(f"Completed: {report['completed']}/{count}, failed: {failed}, "
+              f"workers: {report['workers']}, throughput: {report['jobs_per_second']} jobs/s")
+        print(f"Dispatch lag ms - p50: {lag['p50']}, p95: {lag['p95']}, "
+              f"p99: {lag['p99']}, max: {lag['max']}")
+
+        db.posts.delete_many({"benchRun": run_id})
+        db.jobs.delete_many({"benchRun": run_id})
+        return report
+
+    def bench_post_batch(self, count=500):
+        """Compare N single POST /api/posts calls with one POST /api/posts/batch of N"""
+        run_id = uuid.uuid4().hex[:8]
+
+        def payload(kind, i):
+            post = sample_scheduled_post()
+            post["content"] = f"Batch benchmark {run_id} {kind} #{i}"
+            return post
+
+        print(f"\n📦 Post creation benchmark: {count} posts ({run_id})")
+        session = requests.Session()
+
+        single_errors = 0
+        started = time.perf_counter()
+        for i in range(count):
+            response = session.post(f"{self.base_url}/posts", json=payload("single", i), timeout=30)
+            if response.status_code != 200:
+                single_errors += 1
+        single_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = session.post(f"{self.base_url}/posts/batch",
+                                json=[payload("batch", i) for i in range(count)], timeout=120)
+        batch_elapsed = time.perf_counter() - started
+        batch = response.json() if response.status_code == 200 else {}
+
+        report = {
+            "benchmark": "post_batch",
+            "posts": count,
+            "single": {
+                "seconds": round(single_elapsed, 3),
+                "posts_per_second": round(count / single_elapsed, 1),
+                "errors": single_errors
+            },
+            "batch": {
+                "seconds": round(batch_elapsed, 3),
+                "posts_per_second": round(count / batch_elapsed, 1),
+                "status": response.status_code,
+                "created": batch.get("created", 0),
+                "errors": batch.get("failed", count)
+            },
+            "speedup": round(single_elapsed / batch_elapsed, 1) if batch_elapsed else None
+        }
+
+        print(f"Single POSTs: {report['single']['seconds']}s "
+              f"({report['single']['posts_per_second']} posts/s, {single_errors} errors)")
+        print(f"One batch:    {report['batch']['seconds']}s "
+              f"({report['batch']['posts_per_second']} posts/s, {report['batch']['errors']} errors)")
+        print(f"Speedup: {report['speedup']}x")
+        return report
+
+    def bench_image_listing(self, count=50000, samples=30, tolerance=2.0):
+        """Seed image documents in steps up to `count` and time the listing at each size.
+
+        Measures the first page, a category filter, a text search and a page
+        deep into the cursor. Listing latency should stay flat as the library
+        grows; the run fails if any p95 at full size exceeds `tolerance` times
+        its p95 at the smallest size.
+        """
+        db = mongo_db()
+        run_id = f"bench-{uuid.uuid4()}"
+        categories = ["Food", "Interior", "Events", "Staff", "Promotions"]
+        words = ["coffee", "latte", "brunch", "terrace", "pastry", "menu", "team", "sale"]
+        steps = sorted({size for size in (count // 50, count // 5, count) if size})
+        session = requests.Session()
+
+        print(f"\n🖼️  Image listing benchmark: up to {count} images ({run_id})")
+
+        def timed(params):
+            latencies = []
+            for _ in range(samples):
+                # A unique query string keeps the response cache out of the measurement
+                query = {**params, "_": uuid.uuid4().hex}
+                started = time.perf_counter()
+                response = session.get(f"{self.base_url}/images", params=query, timeout=30)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"GET /images {params} -> HTTP {response.status_code}")
+            return latency_summary(latencies)
+
+        seeded = 0
+        results = {}
+        try:
+            base = datetime.utcnow()
+            for size in steps:
+                batch = []
+                for i in range(seeded, size):
+                    batch.append({
+                        "id": str(uuid.uuid4()), "tenantId": TEST_TENANT,
+                        "filename": f"{random.choice(words)}-{i}.jpg",
+                        "thumbnail": f"/api/images/files/bench/{i}", "url": f"/api/images/files/bench/{i}",
+                        "category": categories[i % len(categories)],
+                        "tags": random.sample(words, 2),
+                        "uploadedAt": base - timedelta(seconds=i), "size": "1.2MB", "benchRun": run_id
+                    })
+                    if len(batch) == 10000:
+                        db.images.insert_many(batch, ordered=False)
+                        batch = []
+                if batch:
+                    db.images.insert_many(batch, ordered=False)
+                seeded = size
+
+                # Walk a few pages to get a cursor from deep inside the library
+                cursor = None
+                for _ in range(10):
+                    page = session.get(f"{self.base_url}/images",
+                                       params={"limit": 100, "after": cursor} if cursor else {"limit": 100},
+                                       timeout=30).json()
+                    cursor = page.get("nextCursor") or cursor
+
+                results[size] = {
+                    "first_page": timed({}),
+                    "category": timed({"category": "Food"}),
+                    "search": timed({"q": "coffee"}),
+                    "deep_page": timed({"after": cursor} if cursor else {})
+                }
+                row = ", ".join(f"{name} p95 {stats['p95']}ms" for name, stats in results[size].items())
+                print(f"  {size:>7} images: {row}")
+        finally:
+            db.images.delete_many({"benchRun": run_id})
+
+        smallest, largest = results[steps[0]], results[steps[-1]]
+        ratios = {name: round(largest[name]["p95"] / smallest[name]["p95"], 2)
+                  for name in largest if smallest[name]["p95"]}
+        flat = all(ratio <= tolerance for ratio in ratios.values())
+
+        print(f"p95 growth {steps[0]} -> {steps[-1]} images: {ratios}")
+        print("✅ Listing latency is flat" if flat else f"❌ Listing p95 grew more than {tolerance}x")
+
+        report = {
+            "benchmark": "image_listing",
+            "images": count,
+            "samples": samples,
+            "latency_ms": {str(size): stats for size, stats in results.items()},
+            "p95_growth": ratios,
+            "flat": flat,
+            "passed": flat
+        }
+        return report
+
+    def bench_publish(self, count=10000, platforms=("instagram", "facebook", "googleBusiness"),
+                      stub_port=None, timeout=1800):
+        """Publish `count` posts to stub platforms and report fan-out throughput.
+
+        Starts a StubPlatformServer on STUB_PLATFORM_PORT (default 4010); the
+        Next.js server must run with PUBLISH_ADAPTER_URL pointing at it. Posts
+        go in through /api/posts/batch, so the measured rate is the
+        publisher's, bounded by the PUBLISH_*_RPS token buckets.
+        """
+        stub_port = stub_port or int(os.environ.get("STUB_PLATFORM_PORT", "4010"))
+        stub = StubPlatformServer(port=stub_port,
+                                  latency_ms=int(os.environ.get("STUB_PLATFORM_LATENCY_MS", "20")),
+                                  fail_rate=float(os.environ.get("STUB_PLATFORM_FAIL_RATE", "0"))).start()
+        run_id = uuid.uuid4().hex[:8]
+        expected = count * len(platforms)
+        session = requests.Session()
+
+        print(f"\n📣 Publish fan-out benchmark: {count} posts x {len(platforms)} platforms ({run_id})")
+        limits = (self.fetch_server_health() or {}).get("publisher", {}).get("platforms", {})
+        for platform in platforms:
+            info = limits.get(platform, {})
+            if info.get("adapter") != "http":
+                print(f"⚠️  {platform} has no HTTP adapter; start the server with "
+                      f"PUBLISH_ADAPTER_URL=http://<this host>:{stub_port}")
+
+        try:
+            started = time.perf_counter()
+            accepted = 0
+            for offset in range(0, count, 1000):
+                batch = [{
+                    "content": f"Publish benchmark {run_id} #{i}",
+                    "platforms": list(platforms),
+                    "action": "publish"
+                } for i in range(offset, min(offset + 1000, count))]
+                response = session.post(f"{self.base_url}/posts/batch", json=batch, timeout=120)
+                if response.status_code == 200:
+                    accepted += response.json().get("created", 0)
+            accept_seconds = time.perf_counter() - started
+            print(f"Accepted {accepted}/{count} posts in {accept_seconds:.1f}s; waiting for platforms...")
+
+            # Done when every delivery has landed or the stub has gone quiet
+            deadline = time.time() + timeout
+            last_total, last_change = -1, time.time()
+            while time.time() < deadline:
+                total = stub.total()
+                print(f"  {total}/{expected} platform calls", end="\r")
+                if total != last_total:
+                    last_total, last_change = total, time.time()
+                if total >= expected or time.time() - last_change > 30:
+                    break
+                time.sleep(1)
+            print()
+            elapsed = time.perf_counter() - started
+        finally:
+            stub.stop()
+
+        outcomes = {}
+        try:
+            db = mongo_db()
+            query = {"content": {"$regex": f"^Publish benchmark {run_id} "}}
+            for platform in platforms:
+                outcomes[platform] = {
+                    row["_id"]: row["n"] for row in db.posts.aggregate([
+                        {"$match": query},
+                        {"$group": {"_id": f"$delivery.{platform}.status", "n": {"$sum": 1}}}
+                    ])
+                }
+            db.posts.delete_many(query)
+        except Exception as e:
+            print(f"⚠️  Could not read delivery outcomes from MongoDB: {e}")
+
+        throughput = stub.throughput()
+        report = {
+            "benchmark": "publish",
+            "posts": count,
+            "platforms": list(platforms),
+            "accepted": accepted,
+            "accept_seconds": round(accept_seconds, 3),
+            "seconds": round(elapsed, 3),
+            "platform_calls": stub.total(),
+            "stub_failures": dict(stub.failed),
+            "calls_per_second": round(stub.total() / elapsed, 1) if elapsed else None,
+            "platform_rps": throughput,
+            "rate_limits": {platform: limits.get(platform, {}).get("rateLimit") for platform in platforms},
+            "delivery": outcomes
+        }
+
+        print(f"Platform calls: {report['platform_calls']}/{expected} in {report['seconds']}s "
+              f"({report['calls_per_second']} calls/s)")
+        for platform in platforms:
+            limit = (report["rate_limits"].get(platform) or {}).get("platformRps")
+            print(f"  {platform:<16} {throughput.get(platform)} req/s (limit {limit}), "
+                  f"outcomes {outcomes.get(platform, {})}")
+        return report
+
+    def bench_token_refresh(self, count=200, proactive_wait=None):
+        """Check single-flight and proactive refresh of Google access tokens.
+
+        Starts a FakeTokenServer on FAKE_TOKEN_PORT (default 4020); the
+        Next.js server must run with GOOGLE_TOKEN_URL pointing at its /token.
+        Seeds an expired token for the anonymous account, fires `count`
+        concurrent GET /api/accounts/google, and expects exactly one refresh.
+        Tokens are issued to expire just after the server's refresh margin, so
+        a background refresh should follow without any request waiting on it.
+        """
+        db = mongo_db()
+        margin_s = self.fetch_server_health().get("google", {}).get("refreshMarginMs", 300000) / 1000
+        fake = FakeTokenServer(port=int(os.environ.get("FAKE_TOKEN_PORT", "4020")),
+                               expires_in=int(margin_s) + 5).start()
+        proactive_wait = proactive_wait or 10
+        session = requests.Session()
+
+        print(f"\n🔑 Token refresh check: {count} concurrent requests, margin {margin_s:.0f}s")
+
+        def burst():
+            def one(_):
+                started = time.perf_counter()
+                response = session.get(f"{self.base_url}/accounts/google", timeout=30)
+                elapsed = (time.perf_counter() - started) * 1000
+                return elapsed, response.status_code == 200 and response.json()["google"]["connected"]
+            with ThreadPoolExecutor(max_workers=min(count, 64)) as pool:
+                results = list(pool.map(one, range(count)))
+            return latency_summary([r[0] for r in results]), sum(1 for r in results if r[1])
+
+        db.oauth_tokens.replace_one({"_id": "anonymous"}, {
+            "_id": "anonymous", "accessToken": "expired", "refreshToken": f"bench-{uuid.uuid4().hex}",
+            "expiresAt": datetime.utcnow() - timedelta(minutes=1)
+        }, upsert=True)
+
+        try:
+            cold, cold_ok = burst()
+            cold_grants = fake.count()
+            warm, warm_ok = burst()
+            warm_grants = fake.count()
+            time.sleep(proactive_wait)
+            proactive_grants = fake.count() - warm_grants
+        finally:
+            fake.stop()
+            db.oauth_tokens.delete_one({"_id": "anonymous"})
+
+        passed = cold_grants == 1 and warm_grants == 1 and proactive_grants >= 1 \
+            and cold_ok == count and warm_ok == count
+        report = {
+            "benchmark": "token_refresh",
+            "requests": count,
+            "cold": {"connected": cold_ok, "token_requests": cold_grants, "latency_ms": cold},
+            "warm": {"connected": warm_ok, "token_requests": warm_grants - cold_grants, "latency_ms": warm},
+            "background_refreshes": proactive_grants,
+            "passed": passed
+        }
+
+        print(f"Cold burst: {cold_grants} token request(s) for {count} calls, p95 {cold['p95']}ms")
+        print(f"Warm burst: {warm_grants - cold_grants} token request(s), p95 {warm['p95']}ms")
+        print(f"Background refreshes within {proactive_wait}s: {proactive_grants}")
+        print("✅ Refreshes were coalesced and proactive" if passed else "❌ Token refresh check failed")
+        return report
+
+    def bench_engagement_ingest(self, count=1000000, posts=1000, workers=4, per_request=50000):
+        """Stream `count` synthetic engagement events as NDJSON and report ingest rate.
+
+        Events spread over `posts` seeded posts and are sent by `workers`
+        threads, `per_request` events per chunked request body. Flush latency
+        and write coalescing come from the ingest counters in /api/health; the
+        seeded posts' like counts are checked against what was sent. Needs
+        ENGAGEMENT_WEBHOOK_SECRET set to the server's value.
+        """
+        db = mongo_db()
+        run_id = f"bench-{uuid.uuid4()}"
+        platform = f"bench_{uuid.uuid4().hex[:8]}"
+        post_ids = [str(uuid.uuid4()) for _ in range(posts)]
+
+        # No publishedAt, so the bench posts stay out of the top-post lists
+        db.posts.insert_many([{
+            "id": post_id, "tenantId": TEST_TENANT, "content": f"Ingest benchmark post {i}", "platforms": [platform],
+            "status": "scheduled", "scheduledAt": datetime.utcnow() + timedelta(days=365),
+            "publishedAt": None, "images": [], "createdAt": datetime.utcnow(), "benchRun": run_id,
+            "engagement": {"likes": 0, "comments": 0, "shares": 0}
+        } for i, post_id in enumerate(post_ids)], ordered=False)
+
+        print(f"\n📈 Engagement ingest benchmark: {count} events over {posts} posts ({run_id})")
+        before = self.fetch_server_health().get("ingest") or {}
+
+        def ndjson(seed, n):
+            rng = random.Random(seed)
+            lines = []
+            for i in range(n):
+                lines.append(json.dumps({
+                    "postId": post_ids[rng.randrange(posts)], "platform": platform,
+                    "likes": 1, "reach": rng.randint(1, 20)
+                }))
+                if len(lines) == 1000:
+                    yield ("\n".join(lines) + "\n").encode()
+                    lines = []
+            if lines:
+                yield ("\n".join(lines) + "\n").encode()
+
+        def send(request_index):
+            n = min(per_request, count - request_index * per_request)
+            started = time.perf_counter()
+            response = requests.post(f"{self.base_url}/analytics/events", data=ndjson(request_index, n),
+                                     headers={"Content-Type": "application/x-ndjson", **WEBHOOK_HEADERS}, timeout=600)
+            body = response.json() if response.status_code == 202 else {}
+            return body.get("accepted", 0), (time.perf_counter() - started) * 1000
+
+        requests_needed = math.ceil(count / per_request)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(send, range(requests_needed)))
+            send_seconds = time.perf_counter() - started
+
+            # Events are acknowledged once buffered; wait for the last flush
+            deadline = time.time() + 300
+            while True:
+                ingest = self.fetch_server_health().get("ingest") or {}
+                if time.time() > deadline or (not ingest.get("bufferedKeys") and not ingest.get("flushing")):
+                    break
+                time.sleep(0.1)
+            drained_seconds = time.perf_counter() - started
+
+            stored = next(db.posts.aggregate([
+                {"$match": {"benchRun": run_id}},
+                {"$group": {"_id": None, "likes": {"$sum": "$engagement.likes"}}}
+            ]), {}).get("likes", 0)
+        finally:
+            db.posts.delete_many({"benchRun": run_id})
+            db.analytics_daily.delete_many({"platform": platform})
+
+        accepted = sum(r[0] for r in results)
+        flushes = ingest.get("flushes", 0) - before.get("flushes", 0)
+        keys = ingest.get("keysWritten", 0) - before.get("keysWritten", 0)
+        report = {
+            "benchmark": "engagement_ingest",
+            "events": count,
+            "accepted": accepted,
+            "stored_likes": stored,
+            "send_seconds": round(send_seconds, 3),
+            "drained_seconds": round(drained_seconds, 3),
+            "events_per_second": round(accepted / drained_seconds, 1) if drained_seconds else None,
+            "request_latency_ms": latency_summary([r[1] for r in results]),
+            "flushes": flushes,
+            "keys_written": keys,
+            "events_per_write": round(accepted / keys, 1) if keys else None,
+            "backpressure_waits": ingest.get("waits", 0) - before.get("waits", 0),
+            "flush_latency_ms": ingest.get("flushLatencyMs"),
+            "passed": accepted == count and stored == count
+        }
+
+        print(f"Accepted {accepted}/{count} events in {report['send_seconds']}s, "
+              f"stored after {report['drained_seconds']}s ({report['events_per_second']} events/s)")
+        print(f"{flushes} flushes wrote {keys} coalesced keys ({report['events_per_write']} events per write), "
+              f"{report['backpressure_waits']} backpressure waits")
+        print(f"Flush latency ms: {report['flush_latency_ms']}")
+        print("✅ Every like was stored" if report["passed"]
+              else f"❌ Stored {stored} likes for {count} events")
+        return report
+
+    def bench_tenant_isolation(self, count=10000, per_tenant=20, samples=50, tolerance=1.5, min_delta_ms=5):
+        """Time one tenant's reads alone in the database, then beside `count` other tenants.
+
+        Seeds the test tenant's posts, images and analytics rollups and times
+        its tenant-scoped GET endpoints. Then seeds `count` other tenants with
+        `per_tenant` posts each (plus images and rollups over the same dates)
+        straight into MongoDB and times them again. The index keys MongoDB
+        examines for the tenant's post queries come from explain(): with
+        tenantId leading every index they must not change. The run fails if
+        they do, if a winning index is not led by tenantId, if the calendar
+        range examines more documents than it returns, or if an endpoint's
+        p95 grows past `tolerance` times its single-tenant p95 and by more
+        than `min_delta_ms`.
+        """
+        db = mongo_db()
+        run_id = f"bench-{uuid.uuid4()}"
+        platform = f"bench_{uuid.uuid4().hex[:8]}"
+        statuses = ["scheduled", "published", "failed", "paused"]
+        categories = ["Food", "Interior", "Events", "Staff", "Promotions"]
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        session = requests.Session()
+
+        print(f"\n🏢 Tenant isolation benchmark: 1 vs {count + 1} tenants ({run_id})")
+
+        def tenant_docs(tenant, posts, images, days, rng):
+            """Posts spread over +-45 days, images and daily rollups for one tenant"""
+            post_docs = []
+            for i in range(posts):
+                scheduled = today + timedelta(days=rng.uniform(-45, 45))
+                status = statuses[i % len(statuses)]
+                post_docs.append({
+                    "id": str(uuid.uuid4()), "tenantId": tenant, "content": f"Tenant {tenant} post {i}",
+                    "platforms": ["instagram"], "status": status, "scheduledAt": scheduled,
+                    "publishedAt": scheduled if status == "published" else None, "images": [],
+                    "createdAt": today, "engagement": {"likes": 0, "comments": 0, "shares": 0},
+                    "delivery": {}, "benchRun": run_id
+                })
+            image_docs = [{
+                "id": str(uuid.uuid4()), "tenantId": tenant, "filename": f"{tenant}-{i}.jpg",
+                "thumbnail": f"/api/images/files/bench/{i}", "url": f"/api/images/files/bench/{i}",
+                "category": categories[i % len(categories)], "tags": ["bench"],
+                "uploadedAt": today - timedelta(minutes=i), "size": "1.2MB", "benchRun": run_id
+            } for i in range(images)]
+            rollups = [{
+                "tenantId": tenant, "day": (today - timedelta(days=d)).strftime("%Y-%m-%d"), "platform": name,
+                "posts": rng.randint(0, 5), "reach": rng.randint(0, 500), "likes": rng.randint(0, 50),
+                "comments": rng.randint(0, 10), "shares": rng.randint(0, 5), "benchRun": run_id
+            } for d in range(days) for name in (platform, f"{platform}_b")]
+            return post_docs, image_docs, rollups
+
+        def insert(batches):
+            for collection, docs in zip(("posts", "images", "analytics_daily"), batches):
+                for offset in range(0, len(docs), 10000):
+                    db[collection].insert_many(docs[offset:offset + 10000], ordered=False)
+
+        endpoints = {
+            "posts": ("/posts", {"limit": 20}),
+            "posts_scheduled": ("/posts", {"status": "scheduled", "limit": 20}),
+            "calendar": ("/posts/calendar", {"from": (today - timedelta(days=14)).strftime("%Y-%m-%d"),
+                                              "to": (today + timedelta(days=28)).strftime("%Y-%m-%d"),
+                                              "tz": "UTC"}),
+            "analytics": ("/analytics", {"timeframe": 30}),
+            "images": ("/images", {})
+        }
+
+        def measure():
+            results = {}
+            for name, (path, params) in endpoints.items():
+                latencies = []
+                for i in range(samples + 1):
+                    # A unique query string keeps the response cache out of the measurement
+                    started = time.perf_counter()
+                    response = session.get(f"{self.base_url}{path}", params={**params, "_": uuid.uuid4().hex},
+                                           timeout=30)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if response.status_code != 200:
+                        raise RuntimeError(f"GET {path} -> HTTP {response.status_code}")
+                    if i:
+                        latencies.append(elapsed)
+                results[name] = latency_summary(latencies)
+            return results
+
+        def plan_indexes(plan):
+            """{index name: leading key} for every index scan in a plan"""
+            found = {}
+            if isinstance(plan, dict):
+                if "indexName" in plan:
+                    found[plan["indexName"]] = next(iter(plan.get("keyPattern") or {}), None)
+                for value in plan.values():
+                    found.update(plan_indexes(value))
+            elif isinstance(plan, list):
+                for value in plan:
+                    found.update(plan_indexes(value))
+            return found
+
+        def explain():
+            queries = {
+                "posts_scheduled": db.posts.find({"tenantId": TEST_TENANT, "status": "scheduled"})
+                                           .sort([("scheduledAt", -1), ("id", -1)]).limit(21),
+                "calendar_range": db.posts.find({"tenantId": TEST_TENANT,
+                                                 "scheduledAt": {"$gte": today - timedelta(days=14),
+                                                                 "$lt": today + timedelta(days=28)}})
+            }
+            result = {}
+            for name, cursor in queries.items():
+                plan = cursor.explain()
+                stats = plan["executionStats"]
+                indexes = plan_indexes(plan["queryPlanner"]["winningPlan"])
+                result[name] = {
+                    "keys_examined": stats["totalKeysExamined"],
+                    "docs_examined": stats["totalDocsExamined"],
+                    "returned": stats["nReturned"],
+                    "indexes": sorted(indexes),
+                    # A collection scan, or an index not led by tenantId, reads other tenants' posts
+                    "tenant_leading": bool(indexes) and all(key == "tenantId" for key in indexes.values())
+                }
+            return result
+
+        rng = random.Random(run_id)
+        try:
+            insert(tenant_docs(TEST_TENANT, 500, 100, 90, rng))
+            single = measure()
+            single_plan = explain()
+            for name, stats in single.items():
+                print(f"  1 tenant       {name:<16} p95 {stats['p95']}ms")
+
+            seeded_at = time.perf_counter()
+            pending = [[], [], []]
+            for i in range(count):
+                for bucket, docs in zip(pending, tenant_docs(f"bench-tenant-{run_id}-{i}", per_tenant,
+                                                             max(1, per_tenant // 4), 14, rng)):
+                    bucket.extend(docs)
+                if len(pending[0]) >= 20000 or i == count - 1:
+                    insert(pending)
+                    pending = [[], [], []]
+                    print(f"  seeded {i + 1}/{count} tenants", end="\r")
+            print()
+            seed_seconds = time.perf_counter() - seeded_at
+
+            crowded = measure()
+            crowded_plan = explain()
+        finally:
+            for collection in ("posts", "images", "analytics_daily"):
+                db[collection].delete_many({"benchRun": run_id})
+
+        comparison = {}
+        for name in endpoints:
+            before, after = single[name]["p95"], crowded[name]["p95"]
+            comparison[name] = {
+                "p95_1_tenant_ms": before,
+                "p95_many_tenants_ms": after,
+                "ratio": round(after / before, 2) if before else None,
+                "ok": after <= max(before * tolerance, before + min_delta_ms)
+            }
+        plans_stable = all(single_plan[name]["keys_examined"] == crowded_plan[name]["keys_examined"]
+                           for name in single_plan)
+        # keys_examined is capped by the page limit, so also check that the
+        # calendar range fetched only documents it returned, and that every
+        # winning index is led by tenantId
+        plans_scoped = (crowded_plan["calendar_range"]["docs_examined"] <= crowded_plan["calendar_range"]["returned"]
+                        and all(plan["tenant_leading"] for plan in [*single_plan.values(), *crowded_plan.values()]))
+
+        report = {
+            "benchmark": "tenant_isolation",
+            "tenants": count + 1,
+            "posts_per_tenant": per_tenant,
+            "seed_seconds": round(seed_seconds, 1),
+            "one_tenant": single,
+            "many_tenants": crowded,
+            "comparison": comparison,
+            "explain": {"one_tenant": single_plan, "many_tenants": crowded_plan},
+            "passed": plans_stable and plans_scoped and all(row["ok"] for row in comparison.values())
+        }
+
+        for name, row in comparison.items():
+            print(f"  {name:<16} p95 {row['p95_1_tenant_ms']}ms -> {row['p95_many_tenants_ms']}ms "
+                  f"({row['ratio']}x) {'✅' if row['ok'] else '❌'}")
+        for name in single_plan:
+            plan = crowded_plan[name]
+            print(f"  explain {name}: keys examined {single_plan[name]['keys_examined']} -> "
+                  f"{plan['keys_examined']}, docs examined {plan['docs_examined']} for {plan['returned']} returned "
+                  f"via {', '.join(plan['indexes']) or 'collection scan'} {'✅' if plan['tenant_leading'] else '❌'}")
+        print("✅ Tenant queries are independent of the tenant count" if report["passed"]
+              else "❌ Tenant query cost grew with the number of tenants")
+        return report
+
+    def bench_export(self, count=1000000, max_rss_growth_mb=150, sample_interval=0.2):
+        """Stream a `count`-row post export and check row counts and server memory.
+
+        Seeds `count` posts (and a year of daily rollups) for the test tenant
+        straight into MongoDB, dated in 2001 so a from/to window selects
+        exactly them. Downloads them from /api/export as gzipped CSV, as
+        uncompressed NDJSON and as analytics CSV, counting parsed rows against
+        MongoDB's own counts, while a sampler polls /api/health for the
+        server's RSS. Fails on any row mismatch, or if RSS grows by more than
+        `max_rss_growth_mb` over its level before the first export.
+        """
+        db = mongo_db()
+        run_id = f"bench-{uuid.uuid4()}"
+        platform = f"bench_{uuid.uuid4().hex[:8]}"
+        start = datetime(2001, 1, 1)
+        window = {"from": "2001-01-01", "to": "2002-01-01", "tz": "UTC"}
+        statuses = ["published", "scheduled", "failed", "paused"]
+
+        print(f"\n📤 Export benchmark: {count} posts ({run_id})")
+        seeded_at = time.perf_counter()
+        batch = []
+        try:
+            for i in range(count):
+                scheduled = start + timedelta(seconds=i * 365 * 86400 // max(count, 1))
+                batch.append({
+                    "id": str(uuid.uuid4()), "tenantId": TEST_TENANT, "benchRun": run_id,
+                    # Commas, quotes and a formula prefix exercise the CSV quoting
+                    "content": f"=Export post {i}, with \"quotes\"", "platforms": ["instagram", platform],
+                    "status": statuses[i % len(statuses)], "scheduledAt": scheduled,
+                    "publishedAt": scheduled if i % len(statuses) == 0 else None, "images": [],
+                    "createdAt": scheduled, "engagement": {"likes": i % 50, "comments": 0, "shares": 0},
+                    "delivery": {}
+                })
+                if len(batch) >= 10000 or i == count - 1:
+                    db.posts.insert_many(batch, ordered=False)
+                    batch = []
+            db.analytics_daily.insert_many([{
+                "tenantId": TEST_TENANT, "day": (start + timedelta(days=d)).strftime("%Y-%m-%d"),
+                "platform": platform, "posts": 1, "likes": d, "benchRun": run_id
+            } for d in range(365)], ordered=False)
+            seed_seconds = time.perf_counter() - seeded_at
+            print(f"  seeded in {seed_seconds:.1f}s")
+
+            expected = {
+                "posts": db.posts.count_documents({"tenantId": TEST_TENANT,
+                                                   "scheduledAt": {"$gte": start, "$lt": datetime(2002, 1, 1)}}),
+                "analytics": db.analytics_daily.count_documents({"tenantId": TEST_TENANT, "platform": {"$ne": "_top"},
+                                                                 "day": {"$gte": window["from"], "$lt": window["to"]}})
+            }
+
+            baseline_rss = self.fetch_server_health().get("process", {}).get("rssBytes")
+            rss_samples = []
+            sampling = threading.Event()
+
+            def sample_rss():
+                while not sampling.wait(sample_interval):
+                    rss = self.fetch_server_health().get("process", {}).get("rssBytes")
+                    if rss:
+                        rss_samples.append(rss)
+
+            def download(params, headers=None):
+                """Rows parsed from one streamed export, with its timing"""
+                started = time.perf_counter()
+                response = requests.get(f"{self.base_url}/export", params={**window, **params},
+                                        headers=headers, stream=True, timeout=600)
+                if response.status_code != 200:
+                    raise RuntimeError(f"export {params} -> HTTP {response.status_code}: {response.text[:200]}")
+                response.encoding = "utf-8"
+                lines = response.iter_lines(chunk_size=1 << 16, decode_unicode=True)
+                if params["format"] == "csv":
+                    rows = sum(1 for _ in csv.reader(lines)) - 1
+                else:
+                    rows = sum(1 for line in lines if line and json.loads(line))
+                seconds = time.perf_counter() - started
+                return {
+                    "rows": rows,
+                    "seconds": round(seconds, 2),
+                    "rows_per_second": round(rows / seconds) if seconds else None,
+                    "content_encoding": response.headers.get("Content-Encoding")
+                }
+
+            sampler = threading.Thread(target=sample_rss, daemon=True)
+            sampler.start()
+            try:
+                exports = {
+                    "posts_csv_gzip": (download({"type": "posts", "format": "csv"}, {"Accept-Encoding": "gzip"}),
+                                       expected["posts"]),
+                    "posts_ndjson": (download({"type": "posts", "format": "ndjson", "gzip": "0"}), expected["posts"]),
+                    "analytics_csv": (download({"type": "analytics", "format": "csv"}), expected["analytics"])
+                }
+            finally:
+                sampling.set()
+                sampler.join()
+        finally:
+            db.posts.delete_many({"benchRun": run_id})
+            db.analytics_daily.delete_many({"benchRun": run_id})
+
+        peak_rss = max(rss_samples, default=None)
+        growth_mb = round((peak_rss - baseline_rss) / 1048576, 1) if peak_rss and baseline_rss else None
+        results = {name: {**result, "expected_rows": rows, "ok": result["rows"] == rows}
+                   for name, (result, rows) in exports.items()}
+        report = {
+            "benchmark": "export",
+            "posts": count,
+            "seed_seconds": round(seed_seconds, 1),
+            "exports": results,
+            "server_rss_mb": {
+                "before": round(baseline_rss / 1048576, 1) if baseline_rss else None,
+                "peak": round(peak_rss / 1048576, 1) if peak_rss else None,
+                "growth": growth_mb,
+                "samples": len(rss_samples)
+            },
+            "passed": all(result["ok"] for result in results.values())
+                      and (growth_mb is None or growth_mb <= max_rss_growth_mb)
+        }
+
+        for name, result in results.items():
+            print(f"  {name:<16} {result['rows']}/{result['expected_rows']} rows in {result['seconds']}s "
+                  f"({result['rows_per_second']} rows/s, {result['content_encoding'] or 'identity'}) "
+                  f"{'✅' if result['ok'] else '❌'}")
+        print(f"  server RSS {report['server_rss_mb']['before']}MB -> peak {report['server_rss_mb']['peak']}MB "
+              f"(+{growth_mb}MB, limit {max_rss_growth_mb}MB)")
+        print("✅ Exports were complete with flat server memory" if report["passed"]
+              else "❌ Export rows were missing or server memory grew with the export")
+        return report
+
+    def bench_sse_fanout(self, count=2000, events=10, interval=0.2, timeout=60):
+        """Open `count` concurrent /api/events streams and time post.created fan-out.
+
+        Once every stream has connected, `events` scheduled posts are created
+        `interval` seconds apart. Delay is measured from the event's server
+        timestamp to its arrival on each connection. A last connection then
+        resumes from the first event's id and must get the rest replayed.
+        Needs aiohttp and a file descriptor limit above `count`.
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("the SSE benchmark requires aiohttp (pip install aiohttp)")
+        try:
+            import resource
+            soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            wanted = count + 256
+            if soft < wanted:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+        except (ImportError, ValueError, OSError):
+            pass
+
+        marker = f"sse-bench-{uuid.uuid4()}"
+        url = f"{self.base_url}/events"
+        print(f"\n📡 SSE fan-out benchmark: {count} connections, {events} events ({marker})")
+
+        async def read_events(response, on_event):
+            """Parse the text/event-stream body, calling on_event(id, type, data)"""
+            event = {}
+            async for raw in response.content:
+                line = raw.decode().rstrip("\r\n")
+                if not line:
+                    if "data" in event:
+                        on_event(event.get("id"), event.get("event", "message"), json.loads(event["data"]))
+                    event = {}
+                elif line.startswith(":"):
+                    on_event(None, "comment", line[1:].strip())
+                else:
+                    field, _, value = line.partition(":")
+                    event[field] = value[1:] if value.startswith(" ") else value
+
+        async def run():
+            ready = asyncio.Event()
+            connected = 0
+            # Every post.created arrival as (client, post id, event id, delay ms
+            # from the server timestamp); filtered to this run's posts afterwards
+            # since an event can arrive before its POST response does
+            arrivals = []
+            created = []
+            connect_ms = []
+
+            connector = aiohttp.TCPConnector(limit=0)
+            timeout_cfg = aiohttp.ClientTimeout(total=None, sock_read=None)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout_cfg) as session:
+                gate = asyncio.Semaphore(200)
+
+                async def client(index):
+                    def on_event(event_id, event_type, data):
+                        nonlocal connected
+                        if event_type == "comment" and data.startswith("connected"):
+                            connected += 1
+                            if connected == count:
+                                ready.set()
+                        elif event_type == "post.created":
+                            at = datetime.fromisoformat(data["at"].replace("Z", "+00:00")).timestamp()
+                            arrivals.append((index, data.get("id"), event_id, (time.time() - at) * 1000))
+
+                    async with gate:
+                        started = time.perf_counter()
+                        response = await session.get(url, params={"types": "post.created"})
+                        connect_ms.append((time.perf_counter() - started) * 1000)
+                    try:
+                        await read_events(response, on_event)
+                    except (aiohttp.ClientError, asyncio.CancelledError):
+                        pass
+                    finally:
+                        response.close()
+
+                opened = time.perf_counter()
+                tasks = [asyncio.create_task(client(i)) for i in range(count)]
+                try:
+                    await asyncio.wait_for(ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                open_seconds = time.perf_counter() - opened
+
+                for i in range(events):
+                    post = sample_scheduled_post()
+                    post["content"] = f"{marker} #{i}"
+                    post["scheduledAt"] = (datetime.now() + timedelta(days=365)).isoformat()
+                    async with session.post(f"{self.base_url}/posts", json=post) as response:
+                        body = await response.json()
+                    if body.get("post"):
+                        created.append(body["post"]["id"])
+                    await asyncio.sleep(interval)
+
+                ours = set(created)
+                deadline = time.time() + timeout
+                while time.time() < deadline:
+                    if sum(1 for arrival in arrivals if arrival[1] in ours) >= connected * len(created):
+                        break
+                    await asyncio.sleep(0.1)
+
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+                # Resume from the first post's event id: the rest must be replayed
+                replayed = []
+                first_event_id = next((event_id for _, post_id, event_id, _ in arrivals
+                                       if created and post_id == created[0]), None)
+                if first_event_id:
+                    def on_replay(event_id, event_type, data):
+                        if event_type == "post.created" and data.get("id") in ours:
+                            replayed.append(data["id"])
+
+                    async with session.get(url, headers={"Last-Event-ID": first_event_id},
+                                           params={"types": "post.created"}) as resumed:
+                        try:
+                            await asyncio.wait_for(read_events(resumed, on_replay), 2)
+                        except asyncio.TimeoutError:
+                            pass
+
+                for post_id in created:
+                    async with session.delete(f"{self.base_url}/posts/{post_id}") as response:
+                        await response.read()
+
+            ours = set(created)
+            return {
+                "connected": connected,
+                "open_seconds": open_seconds,
+                "connect_ms": connect_ms,
+                "arrivals": [arrival for arrival in arrivals if arrival[1] in ours],
+                "created": len(created),
+                "replayed": replayed
+            }
+
+        result = asyncio.run(run())
+        delays = [arrival[3] for arrival in result["arrivals"]]
+        per_client = defaultdict(set)
+        for index, post_id, _, _ in result["arrivals"]:
+            per_client[index].add(post_id)
+        complete = sum(1 for ids in per_client.values() if len(ids) == events)
+        resumed = len(set(result["replayed"]))
+        report = {
+            "benchmark": "sse_fanout",
+            "connections": count,
+            "connected": result["connected"],
+            "open_seconds": round(result["open_seconds"], 3),
+            "connect_ms": latency_summary(result["connect_ms"]),
+            "events": events,
+            "created": result["created"],
+            "deliveries": len(delays),
+            "clients_with_every_event": complete,
+            "fanout_delay_ms": latency_summary(delays),
+            "resume_replayed": resumed,
+            "server": self.fetch_server_health().get("events"),
+            "passed": result["created"] == events and result["connected"] == count
+                      and complete == count and resumed == events - 1
+        }
+
+        print(f"Connected {result['connected']}/{count} streams in {report['open_seconds']}s")
+        print(f"{len(delays)} deliveries; {complete}/{count} clients saw all {events} events")
+        print(f"Fan-out delay ms: {report['fanout_delay_ms']}")
+        print(f"Resume replayed {resumed}/{events - 1} events")
+        print("✅ Every connection received every event" if report["passed"]
+              else "❌ SSE fan-out check failed")
+        return report
+
+# Benchmarks selectable with --bench, each a bench_<name> method on the tester
+BENCHMARKS = ["scheduler", "post_batch", "image_listing", "publish", "token_refresh",
+              "engagement_ingest", "sse_fanout", "tenant_isolation", "export"]
+
+def parse_args(argv=None):
+    """Command line options for the test runner"""
+    parser = argparse.ArgumentParser(description="SocialFlow Pro backend API tests")
+    parser.add_argument("--base-url", default=None,
+                        help=f"API base URL (default: $API_BASE_URL or {BASE_URL})")
+    parser.add_argument("--load", action="store_true",
+                        help="run the concurrent load mode instead of the functional tests")
+    parser.add_argument("--mode", choices=["thread", "asyncio"], default="thread",
+                        help="worker implementation for load mode")
+    parser.add_argument("--workers", type=int, default=10,
+                        help="number of concurrent workers")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="target requests per second (default: as fast as workers allow)")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="load duration in seconds")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_LOAD_SCENARIOS),
+                        help=f"comma separated subset of: {', '.join(LOAD_SCENARIOS)}")
+    parser.add_argument("--bench", choices=BENCHMARKS,
+                        help="run a named benchmark instead of the functional tests")
+    parser.add_argument("--count", type=int, default=None,
+                        help="item count for --bench (default: per benchmark)")
+    parser.add_argument("--output", default=None,
+                        help="JSON file for load/benchmark results")
+    return parser.parse_args(argv)
+
 def main():
     """Main test execution"""
-    tester = SocialFlowAPITester()
+    args = parse_args()
+    tester = SocialFlowAPITester(base_url=args.base_url)
+
+    if args.load:
+        scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+        report = tester.run_load(scenarios=scenarios, workers=args.workers,
+                                 duration=args.duration, rps=args.rps,
+                                 mode=args.mode, output=args.output or "load_results.json")
+        sys.exit(0 if report["total_requests"] else 1)
+
+    if args.bench:
+        bench = getattr(tester, f"bench_{args.bench}")
+        report = bench(count=args.count) if args.count else bench()
+        write_report(report, args.output or f"bench_{args.bench}.json")
+        # Benchmarks with a pass criterion report it as "passed"
+        sys.exit(0 if report.get("passed", True) else 1)
+
     success = tester.run_all_tests()
     
     # Return appropriate exit code
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+SocialFlow Pro Benchmark Suite
+Times fixed API scenarios against a local server and local MongoDB, stores the
+results as a baseline and fails when a scenario's p95 regresses past it
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+
+from backend_test import SocialFlowAPITester, latency_summary, sample_scheduled_post, write_report
+
+LOCAL_BASE_URL = "http://localhost:3000/api"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_SERVER_CMD = "npm run start -- --port {port}"
+
+SCENARIOS = [
+    "dashboard_load",
+    "post_create",
+    "analytics_7",
+    "analytics_30",
+    "analytics_90",
+    "image_listing",
+    "image_search",
+]
+
+
+class BenchmarkSuite:
+    """Fixed scenarios built on SocialFlowAPITester's base URL and payloads.
+
+    Each scenario gets `warmup` untimed iterations followed by `iterations`
+    timed ones. GET requests carry a unique query parameter unless
+    `use_cache` is set, so the numbers reflect the database path rather than
+    the in-process response cache.
+    """
+
+    def __init__(self, tester, warmup=5, iterations=50, seed_posts=500, seed_images=200, use_cache=False):
+        self.tester = tester
+        self.warmup = warmup
+        self.iterations = iterations
+        self.seed_posts = seed_posts
+        self.seed_images = seed_images
+        self.use_cache = use_cache
+        self.created_posts = []
+        self.created_images = []
+        self.local = threading.local()
+        self.pool = ThreadPoolExecutor(max_workers=4)
+
+    def session(self):
+        """One keep-alive session per thread"""
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def get(self, path, params=None):
+        params = dict(params or {})
+        if not self.use_cache:
+            params["_"] = time.perf_counter_ns()
+        response = self.session().get(f"{self.tester.base_url}{path}", params=params, timeout=30)
+        response.raise_for_status()
+        return response
+
+    def seed(self):
+        """Create a fixed amount of posts and library images through the API"""
+        print(f"🌱 Seeding {self.seed_posts} posts and {self.seed_images} images")
+        for offset in range(0, self.seed_posts, 500):
+            batch = []
+            for i in range(offset, min(offset + 500, self.seed_posts)):
+                post = sample_scheduled_post()
+                post["content"] = f"Benchmark suite post #{i}"
+                batch.append(post)
+            response = self.session().post(f"{self.tester.base_url}/posts/batch", json=batch, timeout=120)
+            response.raise_for_status()
+            self.created_posts += [r["id"] for r in response.json()["results"] if r.get("success")]
+
+        categories = ["Food", "Interior", "Team", "Events", "Products"]
+        for i in range(self.seed_images):
+            response = self.session().post(f"{self.tester.base_url}/images/upload", json={
+                "filename": f"benchmark-{['latte', 'brunch', 'terrace', 'menu'][i % 4]}-{i}.jpg",
+                "category": categories[i % len(categories)],
+                "tags": "benchmark"
+            }, timeout=30)
+            response.raise_for_status()
+            self.created_images.append(response.json()["image"]["id"])
+
+    def cleanup(self):
+        """Delete everything the suite created"""
+        for post_id in self.created_posts:
+            self.session().delete(f"{self.tester.base_url}/posts/{post_id}", timeout=30)
+        for image_id in self.created_images:
+            self.session().delete(f"{self.tester.base_url}/images/{image_id}", timeout=30)
+        print(f"🧹 Removed {len(self.created_posts)} posts and {len(self.created_images)} images")
+
+    def dashboard_load(self):
+        """The four requests the dashboard fires on open, in parallel"""
+        requests_ = [
+            ("/profile", None),
+            ("/posts", {"limit": 20}),
+            ("/analytics", {"timeframe": 30}),
+            ("/images", {"limit": 40}),
+        ]
+        for future in [self.pool.submit(self.get, path, params) for path, params in requests_]:
+            future.result()
+
+    def post_create(self):
+        post = sample_scheduled_post()
+        post["content"] = "Benchmark suite scheduled post"
+        response = self.session().post(f"{self.tester.base_url}/posts", json=post, timeout=30)
+        response.raise_for_status()
+        self.created_posts.append(response.json()["post"]["id"])
+
+    def analytics_7(self):
+        self.get("/analytics", {"timeframe": 7})
+
+    def analytics_30(self):
+        self.get("/analytics", {"timeframe": 30})
+
+    def analytics_90(self):
+        self.get("/analytics", {"timeframe": 90})
+
+    def image_listing(self):
+        self.get("/images", {"limit": 40, "category": "Food"})
+
+    def image_search(self):
+        self.get("/images", {"q": "latte", "limit": 40})
+
+    def run_scenario(self, name):
+        scenario = getattr(self, name)
+        for _ in range(self.warmup):
+            scenario()
+
+        latencies, errors = [], 0
+        for _ in range(self.iterations):
+            started = time.perf_counter()
+            try:
+                scenario()
+            except (requests.RequestException, KeyError, ValueError):
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        summary = latency_summary(latencies)
+        summary["mean"] = round(sum(latencies) / len(latencies), 2) if latencies else None
+        summary["iterations"] = self.iterations
+        summary["errors"] = errors
+        return summary
+
+    def run(self, scenarios=None):
+        names = scenarios or SCENARIOS
+        metrics_before = self.tester.scrape_metrics()
+        results = {}
+        try:
+            self.seed()
+            print(f"\n{'scenario':<18}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+            for name in names:
+                results[name] = self.run_scenario(name)
+                r = results[name]
+                print(f"{name:<18}{r['p50'] or 0:>9.1f}{r['p95'] or 0:>9.1f}{r['p99'] or 0:>9.1f}{r['errors']:>8}")
+        finally:
+            self.cleanup()
+            self.pool.shutdown()
+
+        return {
+            "meta": environment_info(self.tester.base_url, self.warmup, self.iterations, self.use_cache),
+            "scenarios": results,
+            "server_metrics": self.tester.print_metric_deltas(metrics_before, self.tester.scrape_metrics())
+        }
+
+
+def environment_info(base_url, warmup, iterations, use_cache):
+    """What a baseline was measured on, so comparisons across machines stand out"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "base_url": base_url,
+        "commit": commit,
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "warmup": warmup,
+        "iterations": iterations,
+        "use_cache": use_cache,
+        "recorded_at": datetime.now().isoformat()
+    }
+
+
+def compare(report, baseline, threshold, min_delta_ms):
+    """Scenarios whose p95 grew more than `threshold` (fraction) and `min_delta_ms`"""
+    regressions = []
+    print(f"\n{'scenario':<18}{'base p95':>10}{'p95':>9}{'change':>9}")
+    for name, current in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base or not base.get("p95") or current.get("p95") is None:
+            print(f"{name:<18}{'-':>10}{current.get('p95') or 0:>9.1f}{'new':>9}")
+            continue
+        change = current["p95"] / base["p95"] - 1
+        regressed = change > threshold and current["p95"] - base["p95"] > min_delta_ms
+        marker = " ❌" if regressed else ""
+        print(f"{name:<18}{base['p95']:>10.1f}{current['p95']:>9.1f}{change * 100:>8.1f}%{marker}")
+        if regressed:
+            regressions.append({"scenario": name, "baseline_p95": base["p95"],
+                                "p95": current["p95"], "change": round(change, 3)})
+    return regressions
+
+
+def start_server(command, base_url, env, timeout=180):
+    """Start the Next.js server and wait until /api/health answers"""
+    port = urlparse(base_url).port or 3000
+    print(f"🚀 Starting server: {command.format(port=port)}")
+    process = subprocess.Popen(command.format(port=port), shell=True, env={**os.environ, **env},
+                               start_new_session=True)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    stop_server(process)
+    raise RuntimeError(f"Server did not become healthy within {timeout}s")
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, 15)
+        process.wait(timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        process.kill()
+
+
+def parse_args(argv=None):
+    """Command line options for the benchmark suite"""
+    parser = argparse.ArgumentParser(description="SocialFlow Pro benchmark suite with p95 regression gating")
+    parser.add_argument("--base-url", default=os.environ.get("API_BASE_URL", LOCAL_BASE_URL),
+                        help=f"API base URL (default: $API_BASE_URL or {LOCAL_BASE_URL})")
+    parser.add_argument("--start-server", action="store_true",
+                        help="start the server locally for the run and stop it afterwards")
+    parser.add_argument("--server-cmd", default=DEFAULT_SERVER_CMD,
+                        help="command used by --start-server; {port} comes from --base-url (run `npm run build` first)")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+                        help="MongoDB for a server started with --start-server")
+    parser.add_argument("--db-name", default="socialflow_bench",
+                        help="database name for a server started with --start-server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed iterations per scenario")
+    parser.add_argument("--iterations", type=int, default=50, help="timed iterations per scenario")
+    parser.add_argument("--seed-posts", type=int, default=500, help="posts created before the run")
+    parser.add_argument("--seed-images", type=int, default=200, help="library images created before the run")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="let GET requests hit the server's response cache")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline JSON to compare against (written if missing)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="overwrite the baseline with this run instead of gating")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed p95 growth as a fraction of the baseline (default 0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="ignore p95 growth smaller than this many milliseconds")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for this run")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Run the suite, store results and exit non-zero on regressions"""
+    args = parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {unknown}")
+
+    server = None
+    if args.start_server:
+        server = start_server(args.server_cmd, args.base_url,
+                              {"MONGO_URL": args.mongo_url, "DB_NAME": args.db_name})
+    try:
+        tester = SocialFlowAPITester(base_url=args.base_url)
+        print(f"\n⏱️  SocialFlow Pro benchmark suite against {tester.base_url}")
+        suite = BenchmarkSuite(tester, warmup=args.warmup, iterations=args.iterations,
+                               seed_posts=args.seed_posts, seed_images=args.seed_images,
+                               use_cache=args.use_cache)
+        report = suite.run(scenarios)
+    finally:
+        if server:
+            stop_server(server)
+
+    write_report(report, args.output)
+    errored = [name for name, result in report["scenarios"].items() if result["errors"]]
+    if errored:
+        # A run with failed requests is neither a baseline nor comparable to one
+        sys.exit(f"\n❌ Scenarios with failed requests: {', '.join(errored)}")
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        write_report(report, args.baseline)
+        print(f"📌 Baseline {'updated' if args.update_baseline else 'created'}: {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+
+    if regressions:
+        print(f"\n❌ p95 regressed more than {args.threshold * 100:.0f}% in: "
+              f"{', '.join(r['scenario'] for r in regressions)}")
+        sys.exit(1)
+    print("\n✅ No p95 regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
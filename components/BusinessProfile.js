@@ -96,6 +96,20 @@ export default function BusinessProfile() {
   })
   const [isLoading, setIsLoading] = useState(false)
 
+  // Fields the business has saved replace the placeholders above
+  useEffect(() => {
+    fetch('/api/profile')
+      .then(response => response.json())
+      .then((data) => {
+        if (data.success) {
+          const { id, connectedAccounts, updatedAt, ...saved } = data.profile
+          const filled = Object.fromEntries(Object.entries(saved).filter(([, value]) => value))
+          setProfile(prev => ({ ...prev, ...filled }))
+        }
+      })
+      .catch(() => toast.error('Failed to load profile'))
+  }, [])
+
   const handleProfileUpdate = async (e) => {
     e.preventDefault()
     setIsLoading(true)
@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useCallback } from 'react'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Input } from '@/components/ui/input'
@@ -20,92 +20,77 @@ import {
 import { useDropzone } from 'react-dropzone'
 import { toast } from 'sonner'
 
-const MOCK_IMAGES = [
-  {
-    id: '1',
-    filename: 'summer-menu.jpg',
-    url: 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400&h=400&fit=crop',
-    thumbnail: 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=200&h=200&fit=crop',
-    category: 'Food',
-    uploadedAt: '2024-06-15T10:00:00Z',
-    size: '2.3MB'
-  },
-  {
-    id: '2',
-    filename: 'restaurant-interior.jpg',
-    url: 'https://images.unsplash.com/photo-1517248135467-4c7edcad34c4?w=400&h=400&fit=crop',
-    thumbnail: 'https://images.unsplash.com/photo-1517248135467-4c7edcad34c4?w=200&h=200&fit=crop',
-    category: 'Interior',
-    uploadedAt: '2024-06-14T15:30:00Z',
-    size: '1.8MB'
-  },
-  {
-    id: '3',
-    filename: 'team-photo.jpg',
-    url: 'https://images.unsplash.com/photo-1577219491135-ce391730fb2c?w=400&h=400&fit=crop',
-    thumbnail: 'https://images.unsplash.com/photo-1577219491135-ce391730fb2c?w=200&h=200&fit=crop',
-    category: 'Team',
-    uploadedAt: '2024-06-13T09:15:00Z',
-    size: '3.1MB'
-  },
-  {
-    id: '4',
-    filename: 'special-dish.jpg',
-    url: 'https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b?w=400&h=400&fit=crop',
-    thumbnail: 'https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b?w=200&h=200&fit=crop',
-    category: 'Food',
-    uploadedAt: '2024-06-12T18:45:00Z',
-    size: '2.7MB'
-  }
-]
+const PAGE_SIZE = 40
 
 const CATEGORIES = ['All', 'Food', 'Interior', 'Team', 'Events', 'Products']
 
 export default function ImageLibrary() {
-  const [images, setImages] = useState(MOCK_IMAGES)
-  const [filteredImages, setFilteredImages] = useState(MOCK_IMAGES)
+  const [images, setImages] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loading, setLoading] = useState(false)
   const [searchTerm, setSearchTerm] = useState('')
+  const [debouncedSearch, setDebouncedSearch] = useState('')
   const [selectedCategory, setSelectedCategory] = useState('All')
   const [viewMode, setViewMode] = useState('grid')
   const [selectedImages, setSelectedImages] = useState([])
 
+  // Filtering and search run server-side; only one page of thumbnails is loaded at a time
+  const fetchImages = useCallback(async (after = null) => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) })
+    if (selectedCategory !== 'All') params.set('category', selectedCategory)
+    if (debouncedSearch) params.set('q', debouncedSearch)
+    if (after) params.set('after', after)
+
+    setLoading(true)
+    try {
+      const response = await fetch(`/api/images?${params}`)
+      const data = await response.json()
+      if (!response.ok) {
+        throw new Error(data.error || 'Failed to load images')
+      }
+      setImages(prev => after ? [...prev, ...data.images] : data.images)
+      setNextCursor(data.nextCursor)
+    } catch (error) {
+      toast.error(error.message)
+    } finally {
+      setLoading(false)
+    }
+  }, [selectedCategory, debouncedSearch])
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), 300)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
+
+  useEffect(() => {
+    fetchImages()
+  }, [fetchImages])
+
   const { getRootProps, getInputProps, isDragActive } = useDropzone({
     accept: {
       'image/*': ['.jpeg', '.jpg', '.png', '.gif', '.webp']
     },
     maxFiles: 10,
-    onDrop: (acceptedFiles) => {
-      const newImages = acceptedFiles.map(file => ({
-        id: Math.random().toString(36).substr(2, 9),
-        filename: file.name,
-        url: URL.createObjectURL(file),
-        thumbnail: URL.createObjectURL(file),
-        category: 'Uncategorized',
-        uploadedAt: new Date().toISOString(),
-        size: `${(file.size / 1024 / 1024).toFixed(1)}MB`
-      }))
-      
-      setImages(prev => [...newImages, ...prev])
-      toast.success(`${acceptedFiles.length} image(s) uploaded`)
-    }
-  })
+    onDrop: async (acceptedFiles) => {
+      if (acceptedFiles.length === 0) return
 
-  useEffect(() => {
-    let filtered = images
+      const form = new FormData()
+      acceptedFiles.forEach(file => form.append('files', file))
+      if (selectedCategory !== 'All') form.append('category', selectedCategory)
 
-    if (selectedCategory !== 'All') {
-      filtered = filtered.filter(img => img.category === selectedCategory)
+      try {
+        const response = await fetch('/api/images/upload', { method: 'POST', body: form })
+        const data = await response.json()
+        if (!response.ok) {
+          throw new Error(data.error || 'Upload failed')
+        }
+        toast.success(`${acceptedFiles.length} image(s) uploaded`)
+        fetchImages()
+      } catch (error) {
+        toast.error(error.message)
+      }
     }
-
-    if (searchTerm) {
-      filtered = filtered.filter(img => 
-        img.filename.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        img.category.toLowerCase().includes(searchTerm.toLowerCase())
-      )
-    }
-
-    setFilteredImages(filtered)
-  }, [images, selectedCategory, searchTerm])
+  })
 
   const toggleImageSelection = (imageId) => {
     setSelectedImages(prev => 
@@ -115,10 +100,21 @@ export default function ImageLibrary() {
     )
   }
 
-  const deleteSelectedImages = () => {
-    setImages(prev => prev.filter(img => !selectedImages.includes(img.id)))
+  const deleteSelectedImages = async () => {
+    const results = await Promise.allSettled(
+      selectedImages.map(id => fetch(`/api/images/${id}`, { method: 'DELETE' }))
+    )
+    const deleted = selectedImages.filter((id, index) =>
+      results[index].status === 'fulfilled' && results[index].value.ok
+    )
+
+    setImages(prev => prev.filter(img => !deleted.includes(img.id)))
     setSelectedImages([])
-    toast.success(`${selectedImages.length} image(s) deleted`)
+    if (deleted.length === selectedImages.length) {
+      toast.success(`${deleted.length} image(s) deleted`)
+    } else {
+      toast.error(`${selectedImages.length - deleted.length} image(s) could not be deleted`)
+    }
   }
 
   const formatDate = (dateString) => {
@@ -227,7 +223,7 @@ export default function ImageLibrary() {
           )}
 
           {/* Images Grid/List */}
-          {filteredImages.length === 0 ? (
+          {images.length === 0 ? (
             <div className="text-center py-12">
               <FolderOpen className="h-12 w-12 mx-auto mb-4 text-gray-300" />
               <h3 className="text-lg font-medium text-gray-900 mb-2">No images found</h3>
@@ -244,7 +240,7 @@ export default function ImageLibrary() {
                 ? 'grid grid-cols-2 sm:grid-cols-3 md:grid-cols-4 lg:grid-cols-5 gap-4'
                 : 'space-y-2'
             }>
-              {filteredImages.map((image) => (
+              {images.map((image) => (
                 <div
                   key={image.id}
                   className={
@@ -309,10 +305,18 @@ export default function ImageLibrary() {
             </div>
           )}
 
+          {nextCursor && (
+            <div className="text-center">
+              <Button variant="outline" onClick={() => fetchImages(nextCursor)} disabled={loading}>
+                {loading ? 'Loading...' : 'Load more'}
+              </Button>
+            </div>
+          )}
+
           {/* Stats */}
           <div className="flex items-center justify-between text-sm text-gray-500 pt-4 border-t">
-            <span>{filteredImages.length} of {images.length} images</span>
-            <span>Total storage: {images.reduce((sum, img) => sum + parseFloat(img.size), 0).toFixed(1)}MB</span>
+            <span>{images.length}{nextCursor ? '+' : ''} images</span>
+            <span>Shown storage: {images.reduce((sum, img) => sum + parseFloat(img.size), 0).toFixed(1)}MB</span>
           </div>
         </CardContent>
       </Card>
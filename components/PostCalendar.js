@@ -0,0 +1,167 @@
+'use client'
+
+import { useState, useEffect } from 'react'
+import { Button } from '@/components/ui/button'
+import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
+import { Badge } from '@/components/ui/badge'
+import { Calendar, ChevronLeft, ChevronRight } from 'lucide-react'
+import { toast } from 'sonner'
+
+const WEEKDAYS = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+
+const STATUS_DOTS = {
+  published: 'bg-green-500',
+  scheduled: 'bg-blue-500',
+  failed: 'bg-red-500',
+  paused: 'bg-yellow-500'
+}
+
+const pad = (n) => String(n).padStart(2, '0')
+const dayKey = (date) => `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`
+
+// Local dates shown for a month: whole weeks from the Sunday before the 1st
+function visibleDays(month) {
+  const first = new Date(month.getFullYear(), month.getMonth(), 1)
+  const start = new Date(first.getFullYear(), first.getMonth(), 1 - first.getDay())
+  const last = new Date(month.getFullYear(), month.getMonth() + 1, 0)
+  const weeks = Math.ceil((first.getDay() + last.getDate()) / 7)
+  return Array.from({ length: weeks * 7 }, (_, i) =>
+    new Date(start.getFullYear(), start.getMonth(), start.getDate() + i))
+}
+
+export default function PostCalendar() {
+  const [month, setMonth] = useState(() => {
+    const now = new Date()
+    return new Date(now.getFullYear(), now.getMonth(), 1)
+  })
+  const [days, setDays] = useState({})
+  const [loading, setLoading] = useState(false)
+  const [selectedDay, setSelectedDay] = useState(null)
+
+  const grid = visibleDays(month)
+
+  // Only the visible window is fetched; the server bins posts by local day
+  useEffect(() => {
+    const controller = new AbortController()
+    const from = grid[0]
+    const to = new Date(from.getFullYear(), from.getMonth(), from.getDate() + grid.length)
+    const params = new URLSearchParams({
+      from: dayKey(from),
+      to: dayKey(to),
+      tz: Intl.DateTimeFormat().resolvedOptions().timeZone
+    })
+
+    setLoading(true)
+    fetch(`/api/posts/calendar?${params}`, { signal: controller.signal })
+      .then(response => response.json())
+      .then((data) => {
+        if (!data.success) {
+          throw new Error(data.error)
+        }
+        setDays(Object.fromEntries(data.days.map(day => [day.day, day])))
+      })
+      .catch((error) => {
+        if (error.name !== 'AbortError') {
+          toast.error('Failed to load calendar')
+        }
+      })
+      .finally(() => setLoading(false))
+
+    return () => controller.abort()
+  }, [month])
+
+  const shiftMonth = (delta) => {
+    setSelectedDay(null)
+    setMonth(prev => new Date(prev.getFullYear(), prev.getMonth() + delta, 1))
+  }
+
+  const today = dayKey(new Date())
+  const selected = selectedDay && days[selectedDay]
+
+  return (
+    <Card>
+      <CardHeader>
+        <div className="flex items-center justify-between">
+          <div>
+            <CardTitle className="flex items-center gap-2">
+              <Calendar className="h-5 w-5 text-blue-600" />
+              {month.toLocaleDateString('en-US', { month: 'long', year: 'numeric' })}
+            </CardTitle>
+            <CardDescription>
+              {loading ? 'Loading…' : 'Posts per day in your time zone'}
+            </CardDescription>
+          </div>
+          <div className="flex gap-2">
+            <Button size="sm" variant="outline" onClick={() => shiftMonth(-1)}>
+              <ChevronLeft className="h-4 w-4" />
+            </Button>
+            <Button size="sm" variant="outline" onClick={() => shiftMonth(1)}>
+              <ChevronRight className="h-4 w-4" />
+            </Button>
+          </div>
+        </div>
+      </CardHeader>
+      <CardContent>
+        <div className="grid grid-cols-7 gap-1 text-center text-xs font-medium text-gray-500 mb-1">
+          {WEEKDAYS.map(day => <div key={day}>{day}</div>)}
+        </div>
+        <div className="grid grid-cols-7 gap-1">
+          {grid.map((date) => {
+            const key = dayKey(date)
+            const day = days[key]
+            const inMonth = date.getMonth() === month.getMonth()
+
+            return (
+              <button
+                key={key}
+                type="button"
+                onClick={() => setSelectedDay(day ? key : null)}
+                className={`h-20 rounded-md border p-1 text-left text-xs transition-colors ${
+                  inMonth ? 'bg-white' : 'bg-gray-50 text-gray-400'
+                } ${selectedDay === key ? 'border-blue-500' : 'border-gray-200'} ${
+                  day ? 'hover:border-blue-300' : 'cursor-default'
+                }`}
+              >
+                <div className={`font-medium ${key === today ? 'text-blue-600' : ''}`}>{date.getDate()}</div>
+                {day && (
+                  <div className="mt-1 space-y-1">
+                    <Badge variant="secondary" className="text-xs">{day.count}</Badge>
+                    <div className="flex gap-1">
+                      {Object.entries(day.byStatus)
+                        .filter(([, count]) => count > 0)
+                        .map(([status]) => (
+                          <span key={status} className={`h-2 w-2 rounded-full ${STATUS_DOTS[status]}`} />
+                        ))}
+                    </div>
+                  </div>
+                )}
+              </button>
+            )
+          })}
+        </div>
+
+        {selected && (
+          <div className="mt-4 space-y-2">
+            {selected.posts.map(post => (
+              <div key={post.id} className="flex items-start gap-3 rounded-md border p-3 text-sm">
+                <span className={`mt-1 h-2 w-2 shrink-0 rounded-full ${STATUS_DOTS[post.status] || 'bg-gray-400'}`} />
+                <div className="flex-1">
+                  <p className="text-gray-900 line-clamp-2">{post.preview}</p>
+                  <p className="text-xs text-gray-500">
+                    {new Date(post.scheduledAt).toLocaleTimeString('en-US', { hour: 'numeric', minute: '2-digit' })}
+                    {post.platforms?.length > 0 && ` · ${post.platforms.join(', ')}`}
+                  </p>
+                </div>
+              </div>
+            ))}
+            {selected.count > selected.posts.length && (
+              <p className="text-xs text-gray-500">
+                and {selected.count - selected.posts.length} more
+              </p>
+            )}
+          </div>
+        )}
+      </CardContent>
+    </Card>
+  )
+}
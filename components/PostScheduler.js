@@ -5,6 +5,7 @@ import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Badge } from '@/components/ui/badge'
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
+import PostCalendar from '@/components/PostCalendar'
 import { 
   Calendar,
   Clock,
@@ -186,6 +187,8 @@ export default function PostScheduler() {
 
   return (
     <div className="space-y-6">
+      <PostCalendar />
+
       <Card>
         <CardHeader>
           <CardTitle className="flex items-center gap-2">
@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+SocialFlow Pro Dataset Generator
+Builds a deterministic, production-shaped dataset (businesses, posts, image
+records, scheduler jobs and engagement rollups) in local MongoDB or as NDJSON
+files, so load tests and benchmarks all run against the same data
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from multiprocessing import Pool
+
+from backend_test import mongo_db, write_report
+
+ANONYMOUS = "anonymous"
+PLATFORMS = ["instagram", "facebook", "googleBusiness"]
+COLLECTIONS = ["profiles", "posts", "images", "jobs", "analytics_daily"]
+
+# Rollup keys shared with lib/analytics.js
+ALL_PLATFORMS = "_all"
+TOP_POSTS = "_top"
+TOP_POSTS_PER_DAY = 10
+
+# The indexes lib/*.js ensure on first use; built once after a bulk load
+# instead of being maintained through it
+INDEXES = {
+    "posts": [
+        ([("tenantId", 1), ("status", 1), ("scheduledAt", -1), ("id", -1)], {"name": "tenant_status_scheduledAt"}),
+        ([("tenantId", 1), ("scheduledAt", -1), ("id", -1)], {"name": "tenant_scheduledAt"}),
+        ([("id", 1)], {"name": "id", "unique": True})
+    ],
+    "images": [
+        ([("tenantId", 1), ("category", 1), ("uploadedAt", -1), ("id", -1)], {"name": "tenant_category_uploadedAt"}),
+        ([("tenantId", 1), ("uploadedAt", -1), ("id", -1)], {"name": "tenant_uploadedAt"}),
+        ([("tenantId", 1), ("filename", "text"), ("tags", "text")], {"name": "tenant_text"}),
+        ([("id", 1)], {"name": "id", "unique": True})
+    ],
+    "analytics_daily": [
+        ([("tenantId", 1), ("day", 1), ("platform", 1)], {"name": "tenant_day_platform", "unique": True})
+    ],
+    "profiles": [
+        ([("tenantId", 1)], {"name": "tenant", "unique": True})
+    ],
+    "jobs": [
+        ([("status", 1), ("dueAt", 1)], {"name": "status_dueAt"}),
+        ([("status", 1), ("leaseUntil", 1)], {"name": "status_leaseUntil"}),
+        ([("postId", 1), ("platform", 1)], {"name": "postId_platform", "unique": True})
+    ]
+}
+
+BUSINESS_TYPES = {
+    "restaurant": ["Food", "Interior", "Staff", "Events", "Promotions"],
+    "cafe": ["Food", "Drinks", "Interior", "Staff", "Promotions"],
+    "salon": ["Styles", "Interior", "Staff", "Products", "Promotions"],
+    "retail": ["Products", "Storefront", "Staff", "Events", "Promotions"],
+    "fitness": ["Classes", "Equipment", "Staff", "Events", "Promotions"]
+}
+NAME_WORDS = ["Golden", "Corner", "Urban", "Harbor", "Maple", "Blue", "Olive", "Copper", "Riverside", "Little",
+              "Summit", "Cedar", "Lucky", "North", "Velvet", "Sunny", "Oak", "Silver", "Garden", "Union"]
+OPENERS = ["New this week:", "Don't miss it!", "Weekend special:", "Behind the scenes:", "Thank you all!",
+           "Just in:", "Last chance:", "Meet the team:", "Fresh today:", "Save the date:"]
+BODIES = ["Come by and see what we've been working on.", "Our regulars already know, now it's your turn.",
+          "Tag a friend who needs to see this.", "Limited spots, book ahead to be sure.",
+          "Made by hand, every single day.", "Open late all week for you.",
+          "Show this post for 10% off your next visit.", "We couldn't do it without our amazing community."]
+HASHTAGS = ["#local", "#smallbusiness", "#shoplocal", "#weekend", "#new", "#community", "#special", "#tbt",
+            "#goodvibes", "#supportlocal", "#openlate", "#family"]
+TAGS = ["featured", "seasonal", "menu", "team", "event", "sale", "new", "classic", "outdoor", "holiday"]
+# Posting hours (UTC) of a typical small business: late morning and early evening peaks
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 16, 18, 16, 12, 10, 10, 12, 16, 18, 14, 10, 6, 3, 2]
+# How many platforms a business has connected
+PLATFORM_COUNT_WEIGHTS = [30, 45, 25]
+# Share of a post's engagement that arrives on its publish day and the two after
+ENGAGEMENT_DECAY = [0.6, 0.25, 0.15]
+COUNTERS = ["reach", "likes", "comments", "shares"]
+
+
+def weighted_table(values, weights):
+    """Values repeated by weight: indexing with a uniform draw samples the
+    weights far faster than random.choices in the per-post loop"""
+    return [value for value, weight in zip(values, weights) for _ in range(weight)]
+
+
+HOUR_TABLE = weighted_table(range(24), HOUR_WEIGHTS)
+
+
+def content_pool(size=1024):
+    """Post texts picked per post; built from a fixed seed, so every dataset shares them"""
+    rng = random.Random("content")
+    return [f"{rng.choice(OPENERS)} {rng.choice(BODIES)} {' '.join(rng.sample(HASHTAGS, rng.randint(1, 4)))}"
+            for _ in range(size)]
+
+
+CONTENT_POOL = content_pool()
+
+
+@lru_cache(maxsize=4)
+def calendar_for(anchor, days, future_days):
+    """Midnight datetimes and YYYY-MM-DD keys for every day in the window;
+    index `days` is the anchor day"""
+    starts = [anchor + timedelta(days=offset) for offset in range(-days, future_days + 1)]
+    return starts, [start.strftime("%Y-%m-%d") for start in starts]
+
+
+def seeded_uuid(rng):
+    """A version 4 uuid drawn from `rng`, so ids repeat for the same seed"""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def tenant_sizes(rng, tenants, posts, anonymous_posts=None):
+    """Posts per business. Sizes follow a Pareto law (most businesses post a
+    little, a few post a lot); the anonymous tenant, when present, gets
+    `anonymous_posts` so unauthenticated benchmarks see a predictable size.
+    """
+    weights = [rng.paretovariate(1.16) for _ in range(tenants)]
+    fixed = 0
+    if anonymous_posts is not None:
+        weights[0] = 0.0
+        fixed = min(anonymous_posts, posts)
+    total = sum(weights) or 1.0
+    shares = [weight / total * (posts - fixed) for weight in weights]
+    sizes = [int(share) for share in shares]
+    # Hand out what flooring lost to the largest remainders
+    leftover = posts - fixed - sum(sizes)
+    for index in sorted(range(tenants), key=lambda i: shares[i] - sizes[i], reverse=True)[:leftover]:
+        sizes[index] += 1
+    if anonymous_posts is not None:
+        sizes[0] = fixed
+    return sizes
+
+
+def shard_tenants(tenant_ids, sizes, shard_posts):
+    """Group tenants into work units of roughly `shard_posts` posts each"""
+    shards, current, count = [], [], 0
+    for index, (tenant_id, size) in enumerate(zip(tenant_ids, sizes)):
+        current.append((index, tenant_id, size))
+        count += size
+        if count >= shard_posts:
+            shards.append(current)
+            current, count = [], 0
+    if current:
+        shards.append(current)
+    return shards
+
+
+class TenantGenerator:
+    """Every document of one business, drawn from its own seeded generator.
+
+    A tenant's data depends only on (seed, tenant index, anchor), never on
+    how tenants were spread across processes, so any worker count yields the
+    same dataset. `anchor` is "now" for the data: history runs `days` back
+    from it and scheduled posts up to `future_days` ahead. Days are handled
+    as indexes into a per-run calendar (see calendar_for) on the hot path.
+    """
+
+    def __init__(self, seed, index, tenant_id, posts, anchor, days, future_days):
+        self.rng = random.Random(f"{seed}:{index}")
+        self.tenant_id = tenant_id
+        self.posts = posts
+        self.anchor = anchor
+        self.days = days
+        self.future_days = future_days
+        self.day_starts, self.day_keys = calendar_for(anchor, days, future_days)
+        self.business_type = self.rng.choice(list(BUSINESS_TYPES))
+        self.categories = BUSINESS_TYPES[self.business_type]
+        count = self.rng.choices([1, 2, 3], PLATFORM_COUNT_WEIGHTS)[0]
+        self.platforms = self.rng.sample(PLATFORMS, count)
+        # Each post goes to a non-empty subset of the connected platforms
+        self.platform_sets = [[p for bit, p in enumerate(self.platforms) if mask >> bit & 1]
+                              for mask in range(1, 1 << count)]
+        # Typical reach per post; audiences vary by orders of magnitude
+        self.audience = math.log(self.rng.lognormvariate(5.5, 1.0))
+
+    def profile(self):
+        rng = self.rng
+        name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {self.business_type.title()}"
+        handle = name.lower().replace(" ", "")
+        return {
+            "tenantId": self.tenant_id,
+            "businessName": name,
+            "businessType": self.business_type,
+            "address": f"{rng.randint(1, 9999)} {rng.choice(NAME_WORDS)} Street",
+            "phone": f"(555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "email": f"hello@{handle}.example.com",
+            "connectedAccounts": {
+                platform: {"connected": platform in self.platforms,
+                           "username": f"@{handle}" if platform in self.platforms else None}
+                for platform in PLATFORMS
+            },
+            "updatedAt": (self.anchor - timedelta(days=rng.uniform(0, self.days))).isoformat() + "Z"
+        }
+
+    def images(self):
+        rng = self.rng
+        count = max(3, int(self.posts * rng.uniform(0.15, 0.35)))
+        images = []
+        for i in range(count):
+            image_id = seeded_uuid(rng)
+            category = rng.choice(self.categories)
+            size = rng.lognormvariate(13.8, 0.6)
+            images.append({
+                "id": image_id,
+                "tenantId": self.tenant_id,
+                "filename": f"{category.lower()}-{i + 1}.jpg",
+                "url": f"https://images.example.com/{image_id}.jpg?w=800",
+                "thumbnail": f"https://images.example.com/{image_id}.jpg?w=200",
+                "category": category,
+                "tags": rng.sample(TAGS, rng.randint(0, 3)),
+                "uploadedAt": self.anchor - timedelta(seconds=rng.uniform(0, self.days * 86400)),
+                "size": f"{size / (1024 * 1024):.1f}MB"
+            })
+        return images
+
+    def engagement(self):
+        """Per-platform counters for one published post"""
+        rng = self.rng
+        reach = int(rng.lognormvariate(self.audience, 0.8))
+        likes = int(reach * (0.02 + rng.random() * 0.07))
+        return {"reach": reach, "likes": likes, "comments": int(likes * (0.05 + rng.random() * 0.15)),
+                "shares": int(likes * (0.01 + rng.random() * 0.09))}
+
+    def post(self, image_urls):
+        """(post, day index, per-platform engagement) for one post"""
+        rng = self.rng
+        random_ = rng.random
+        # Posting volume grows toward the present
+        day = self.days + math.floor(rng.triangular(-self.days, self.future_days, 0))
+        scheduled_at = self.day_starts[day] + timedelta(
+            hours=HOUR_TABLE[int(random_() * len(HOUR_TABLE))], minutes=5 * int(random_() * 12))
+        roll = random_()
+        if scheduled_at > self.anchor:
+            status = "scheduled" if roll < 0.92 else "paused"
+        else:
+            status = "published" if roll < 0.93 else "failed" if roll < 0.97 else "paused"
+        platforms = self.platform_sets[int(random_() * len(self.platform_sets))]
+        images = []
+        if image_urls and random_() < 0.6:
+            picks = 1 + int(random_() * 3)
+            images = list(dict.fromkeys(image_urls[int(random_() * len(image_urls))] for _ in range(picks)))
+        created_at = min(scheduled_at, self.anchor) - timedelta(hours=rng.expovariate(1 / 48))
+
+        post = {
+            "id": seeded_uuid(rng),
+            "tenantId": self.tenant_id,
+            "content": CONTENT_POOL[int(random_() * len(CONTENT_POOL))],
+            "platforms": platforms,
+            "status": status,
+            "scheduledAt": scheduled_at,
+            "publishedAt": None,
+            "images": images,
+            "delivery": {},
+            "createdAt": created_at,
+            "engagement": {"likes": 0, "comments": 0, "shares": 0}
+        }
+        per_platform = {}
+        if status == "published":
+            published_at = scheduled_at + timedelta(seconds=0.5 + random_() * 30)
+            post["publishedAt"] = published_at
+            for platform in platforms:
+                if random_() < 0.03:
+                    post["delivery"][platform] = {"status": "failed", "attempts": 5, "error": "Platform rejected the post",
+                                                  "completedAt": published_at + timedelta(minutes=5)}
+                    continue
+                post["delivery"][platform] = {"status": "published", "attempts": 1,
+                                              "externalId": f"{platform}_{rng.getrandbits(48):012x}",
+                                              "completedAt": published_at + timedelta(seconds=0.2 + random_() * 3)}
+                per_platform[platform] = self.engagement()
+            post["engagement"] = {counter: sum(e[counter] for e in per_platform.values()) for counter in COUNTERS}
+        return post, day, per_platform
+
+    def job(self, post):
+        return {
+            "_id": seeded_uuid(self.rng),
+            "type": "publish_post",
+            "tenantId": self.tenant_id,
+            "postId": post["id"],
+            "dueAt": post["scheduledAt"],
+            "status": "pending",
+            "attempts": 0,
+            "leaseOwner": None,
+            "leaseUntil": None,
+            "lastError": None,
+            "createdAt": post["createdAt"],
+            "updatedAt": post["createdAt"]
+        }
+
+    def rollups(self, published):
+        """Daily buckets as the API's own counters would have built them:
+        post counts on the publish day, engagement spread over the days after
+        (never past the anchor), and each day's top posts.
+        """
+        last_day = self.days
+        buckets = {}
+        top = {}
+
+        for post, day, per_platform in published:
+            for platform in (ALL_PLATFORMS, *post["platforms"]):
+                counters = buckets.get((day, platform))
+                if counters is None:
+                    counters = buckets[(day, platform)] = {"posts": 0}
+                counters["posts"] += 1
+            span = min(len(ENGAGEMENT_DECAY), last_day - day + 1)
+            for platform, engagement in per_platform.items():
+                for counter, value in engagement.items():
+                    parts = [int(value * share) for share in ENGAGEMENT_DECAY[:span]]
+                    parts[0] += value - sum(parts)
+                    for offset, part in enumerate(parts):
+                        counters = buckets.get((day + offset, platform))
+                        if counters is None:
+                            counters = buckets[(day + offset, platform)] = {"posts": 0}
+                        counters[counter] = counters.get(counter, 0) + part
+            if per_platform:
+                totals = post["engagement"]
+                top.setdefault(day, []).append({
+                    "id": post["id"],
+                    "content": post["content"],
+                    "platform": max(per_platform, key=lambda p: per_platform[p]["likes"]),
+                    "engagement": totals["likes"] + totals["comments"] + totals["shares"],
+                    "reach": totals["reach"]
+                })
+
+        docs = [{"tenantId": self.tenant_id, "day": self.day_keys[day], "platform": platform, **counters}
+                for (day, platform), counters in buckets.items()]
+        for day, entries in top.items():
+            entries.sort(key=lambda entry: entry["engagement"], reverse=True)
+            docs.append({"tenantId": self.tenant_id, "day": self.day_keys[day], "platform": TOP_POSTS,
+                         "top": entries[:TOP_POSTS_PER_DAY]})
+        return docs
+
+    def generate(self, sink):
+        sink.add("profiles", self.profile())
+        images = self.images()
+        for image in images:
+            sink.add("images", image)
+        image_urls = [image["url"] for image in images]
+
+        published = []
+        for _ in range(self.posts):
+            post, day, per_platform = self.post(image_urls)
+            sink.add("posts", post)
+            if post["status"] == "scheduled":
+                sink.add("jobs", self.job(post))
+            elif post["publishedAt"]:
+                published.append((post, day, per_platform))
+        for rollup in self.rollups(published):
+            sink.add("analytics_daily", rollup)
+
+
+def encode_extended(value):
+    """Dates as MongoDB Extended JSON, so mongoimport restores their type"""
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat(timespec="milliseconds") + "Z"}
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+class MongoSink:
+    """Buffers documents per collection and writes them as unordered bulk inserts"""
+
+    def __init__(self, db, batch_size):
+        self.db = db
+        self.batch_size = batch_size
+        self.buffers = {name: [] for name in COLLECTIONS}
+        self.counts = dict.fromkeys(COLLECTIONS, 0)
+
+    def add(self, collection, doc):
+        buffer = self.buffers[collection]
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            self.write(collection)
+
+    def write(self, collection):
+        buffer = self.buffers[collection]
+        if buffer:
+            # Unordered inserts let the server apply the batch in parallel
+            self.db[collection].insert_many(buffer, ordered=False, bypass_document_validation=True)
+            self.counts[collection] += len(buffer)
+            self.buffers[collection] = []
+
+    def close(self):
+        for collection in COLLECTIONS:
+            self.write(collection)
+
+
+class NdjsonSink:
+    """One NDJSON file per collection per shard, importable with mongoimport"""
+
+    def __init__(self, directory, shard):
+        self.encoder = json.JSONEncoder(separators=(",", ":"), default=encode_extended)
+        self.files = {}
+        self.directory = directory
+        self.shard = shard
+        self.counts = dict.fromkeys(COLLECTIONS, 0)
+
+    def add(self, collection, doc):
+        out = self.files.get(collection)
+        if out is None:
+            path = os.path.join(self.directory, collection, f"part-{self.shard:05d}.ndjson")
+            out = self.files[collection] = open(path, "w", buffering=1 << 20)
+        out.write(self.encoder.encode(doc))
+        out.write("\n")
+        self.counts[collection] += 1
+
+    def close(self):
+        for out in self.files.values():
+            out.close()
+
+
+_worker_db = None
+
+
+def init_mongo_worker(mongo_url, db_name):
+    """One MongoDB client per worker process, opened before any shard runs"""
+    global _worker_db
+    os.environ["MONGO_URL"] = mongo_url
+    os.environ["DB_NAME"] = db_name
+    _worker_db = mongo_db()
+
+
+def generate_shard(task):
+    """Generate and write one shard; returns its document counts"""
+    shard, tenants, options = task
+    started = time.perf_counter()
+    if options["ndjson"]:
+        sink = NdjsonSink(options["ndjson"], shard)
+    else:
+        sink = MongoSink(_worker_db, options["batch_size"])
+    try:
+        for index, tenant_id, posts in tenants:
+            TenantGenerator(options["seed"], index, tenant_id, posts, options["anchor"],
+                            options["days"], options["future_days"]).generate(sink)
+    finally:
+        sink.close()
+    return sink.counts, time.perf_counter() - started
+
+
+def build_indexes(db):
+    from pymongo import IndexModel
+
+    for collection, specs in INDEXES.items():
+        started = time.perf_counter()
+        db[collection].create_indexes([IndexModel(keys, **options) for keys, options in specs])
+        print(f"  {collection:<16} indexes built in {time.perf_counter() - started:.1f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic SocialFlow dataset")
+    parser.add_argument("--posts", type=int, default=1_000_000, help="total posts across all businesses")
+    parser.add_argument("--tenants", type=int, default=10_000, help="number of businesses")
+    parser.add_argument("--seed", default="socialflow", help="same seed and anchor, same dataset")
+    parser.add_argument("--anchor", default=datetime.utcnow().strftime("%Y-%m-%d"),
+                        help="the dataset's 'today' (YYYY-MM-DD, default: today UTC)")
+    parser.add_argument("--days", type=int, default=365, help="days of history before the anchor")
+    parser.add_argument("--future-days", type=int, default=30, help="days of scheduled posts after the anchor")
+    parser.add_argument("--no-anonymous", action="store_true",
+                        help="do not make the first business the anonymous tenant (served without sign-in "
+                             "when the API runs with ALLOW_ANONYMOUS_API=true)")
+    parser.add_argument("--anonymous-posts", type=int, default=None,
+                        help="posts for the anonymous tenant (default: the average business size)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="generator processes")
+    parser.add_argument("--shard-posts", type=int, default=50_000, help="posts per unit of work")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="documents per bulk insert")
+    parser.add_argument("--ndjson", default=None, metavar="DIR",
+                        help="write NDJSON files under DIR instead of inserting into MongoDB")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+                        help="MongoDB to load into")
+    parser.add_argument("--db-name", default="socialflow_bench",
+                        help="database to load into (point the server's DB_NAME at it)")
+    parser.add_argument("--drop", action="store_true", help="drop the generated collections first")
+    parser.add_argument("--skip-indexes", action="store_true", help="do not build indexes after loading")
+    parser.add_argument("--output", default="dataset_report.json", help="JSON summary of the generated data")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Plan tenants, generate shards in parallel and report throughput"""
+    args = parse_args()
+    if args.tenants < 1 or args.posts < 0:
+        sys.exit("--tenants must be at least 1 and --posts not negative")
+    try:
+        anchor = datetime.strptime(args.anchor, "%Y-%m-%d")
+    except ValueError:
+        sys.exit(f"Invalid --anchor {args.anchor!r}, expected YYYY-MM-DD")
+
+    rng = random.Random(args.seed)
+    anonymous = not args.no_anonymous
+    tenant_ids = [f"gen-{args.seed}-{i:07d}" for i in range(args.tenants)]
+    anonymous_posts = None
+    if anonymous:
+        tenant_ids[0] = ANONYMOUS
+        anonymous_posts = args.anonymous_posts if args.anonymous_posts is not None else args.posts // args.tenants
+    sizes = tenant_sizes(rng, args.tenants, args.posts, anonymous_posts)
+    shards = shard_tenants(tenant_ids, sizes, args.shard_posts)
+
+    db = None
+    initializer, initargs = None, ()
+    if args.ndjson:
+        for collection in COLLECTIONS:
+            os.makedirs(os.path.join(args.ndjson, collection), exist_ok=True)
+        target = args.ndjson
+    else:
+        initializer, initargs = init_mongo_worker, (args.mongo_url, args.db_name)
+        init_mongo_worker(*initargs)
+        db = _worker_db
+        if args.drop:
+            for collection in COLLECTIONS:
+                db[collection].drop()
+        target = f"{args.mongo_url}/{args.db_name}"
+
+    print(f"\n🏭 Generating {args.posts} posts for {args.tenants} businesses into {target} "
+          f"({len(shards)} shards, {args.workers} workers, seed {args.seed!r}, anchor {args.anchor})")
+    options = {"seed": args.seed, "anchor": anchor, "days": args.days, "future_days": args.future_days,
+               "ndjson": args.ndjson, "batch_size": args.batch_size}
+    counts = dict.fromkeys(COLLECTIONS, 0)
+    started = time.perf_counter()
+    with Pool(args.workers, initializer=initializer, initargs=initargs) as pool:
+        tasks = [(shard, tenants, options) for shard, tenants in enumerate(shards)]
+        for done, (shard_counts, _) in enumerate(pool.imap_unordered(generate_shard, tasks), 1):
+            for collection, count in shard_counts.items():
+                counts[collection] += count
+            elapsed = time.perf_counter() - started
+            print(f"\r  {done}/{len(shards)} shards, {counts['posts']} posts, "
+                  f"{counts['posts'] / elapsed:,.0f} posts/s", end="", flush=True)
+    generated_seconds = time.perf_counter() - started
+    print()
+
+    index_seconds = None
+    if db is not None and not args.skip_indexes:
+        index_started = time.perf_counter()
+        build_indexes(db)
+        index_seconds = round(time.perf_counter() - index_started, 2)
+
+    largest = sorted(zip(sizes, tenant_ids), reverse=True)[:10]
+    report = {
+        "seed": args.seed,
+        "anchor": args.anchor,
+        "target": target,
+        "tenants": args.tenants,
+        "anonymousTenantPosts": sizes[0] if anonymous else None,
+        "largestTenants": [{"tenantId": tenant_id, "posts": size} for size, tenant_id in largest],
+        "documents": counts,
+        "workers": args.workers,
+        "generateSeconds": round(generated_seconds, 2),
+        "indexSeconds": index_seconds,
+        "postsPerSecond": round(counts["posts"] / generated_seconds, 1) if generated_seconds else None
+    }
+    for collection, count in counts.items():
+        print(f"  {collection:<16} {count:>12,}")
+    print(f"\n✅ Generated in {generated_seconds:.1f}s ({report['postsPerSecond']:,} posts/s)")
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+export async function register() {
+  if (process.env.NEXT_RUNTIME === 'nodejs') {
+    const { getDb, warmUp } = await import('./lib/mongodb')
+    await warmUp()
+
+    if (process.env.SCHEDULER_ENABLED === 'true') {
+      const { createDispatcher } = await import('./lib/scheduler')
+      createDispatcher(getDb).start()
+    }
+
+    if (process.env.DERIVATIVES_ENABLED === 'true') {
+      const { createDerivativeWorker } = await import('./lib/derivatives')
+      createDerivativeWorker(getDb).start()
+    }
+  }
+}
@@ -0,0 +1,345 @@
+import { httpError } from './errors.js'
+import { engagementEvent, issueMessage } from './schemas.js'
+
+// Incrementally maintained analytics. Every publish and engagement event bumps
+// a per-tenant, per-day, per-platform counter document, so any timeframe is
+// answered by summing at most TIMEFRAMES.max days of one tenant's buckets
+// instead of scanning posts. `db` is a tenant handle (forTenant) throughout.
+
+export const TIMEFRAMES = [7, 30, 90]
+export const PLATFORMS = ['instagram', 'facebook', 'googleBusiness']
+
+const TOP_POSTS_PER_DAY = 10
+const TOP_POSTS_RETURNED = 5
+
+const COUNTERS = ['posts', 'reach', 'likes', 'comments', 'shares']
+
+// Posts go to several platforms at once, so distinct post counts per day are
+// kept in their own bucket rather than summed from the platform buckets.
+export const ALL_PLATFORMS = '_all'
+
+// The per-day top post list shares the collection under its own platform key
+export const TOP_POSTS = '_top'
+
+// Engagement fields on posts use the same names as the rollup counters
+const ENGAGEMENT_FIELDS = ['reach', 'likes', 'comments', 'shares']
+
+let indexesReady = null
+
+export function ensureAnalyticsIndexes(db) {
+  if (!indexesReady) {
+    indexesReady = db.collection('analytics_daily').createIndexes([
+      // One bucket per key, so concurrent first upserts cannot duplicate it
+      { key: { tenantId: 1, day: 1, platform: 1 }, name: 'tenant_day_platform', unique: true }
+    ]).catch((error) => {
+      indexesReady = null
+      throw error
+    })
+  }
+  return indexesReady
+}
+
+export function dayKey(date) {
+  return new Date(date).toISOString().slice(0, 10)
+}
+
+export function parseTimeframe(value) {
+  const days = parseInt(value, 10)
+  if (!Number.isFinite(days) || days < 1) {
+    return 30
+  }
+  return Math.min(days, Math.max(...TIMEFRAMES))
+}
+
+function rollupFilter(day, platform) {
+  return { day, platform }
+}
+
+function incrementFor(delta) {
+  const inc = {}
+  for (const counter of COUNTERS) {
+    if (delta[counter]) {
+      inc[counter] = delta[counter]
+    }
+  }
+  return inc
+}
+
+// Top-K per publish day: every post belongs to exactly one day, so the top
+// posts of any window are always contained in the union of its daily lists.
+function topPostOps(day, entry) {
+  const filter = rollupFilter(day, TOP_POSTS)
+  return [
+    { updateOne: { filter, update: { $pull: { top: { id: entry.id } } } } },
+    {
+      updateOne: {
+        filter,
+        update: {
+          $push: { top: { $each: [entry], $sort: { engagement: -1 }, $slice: TOP_POSTS_PER_DAY } }
+        },
+        upsert: true
+      }
+    }
+  ]
+}
+
+export async function recordPostPublished(db, post) {
+  await recordPostsPublished(db, [post])
+}
+
+// One bulkWrite for many published posts, merging increments per bucket
+export async function recordPostsPublished(db, posts) {
+  const increments = new Map()
+  for (const post of posts) {
+    const day = dayKey(post.publishedAt || new Date())
+    const platforms = post.platforms?.length ? post.platforms : ['unknown']
+    for (const platform of [...platforms, ALL_PLATFORMS]) {
+      const key = `${day}:${platform}`
+      const bucket = increments.get(key) || { day, platform, posts: 0 }
+      bucket.posts++
+      increments.set(key, bucket)
+    }
+  }
+  if (increments.size === 0) {
+    return
+  }
+
+  await ensureAnalyticsIndexes(db)
+  await db.collection('analytics_daily').bulkWrite(
+    [...increments.values()].map(({ day, platform, posts: count }) => ({
+      updateOne: {
+        filter: rollupFilter(day, platform),
+        update: { $inc: { posts: count } },
+        upsert: true
+      }
+    })),
+    { ordered: false }
+  )
+}
+
+function postIncrement(inc) {
+  const postInc = {}
+  for (const field of ENGAGEMENT_FIELDS) {
+    if (inc[field]) {
+      postInc[`engagement.${field}`] = inc[field]
+    }
+  }
+  return postInc
+}
+
+function topPostEntry(post, platform) {
+  const { likes = 0, comments = 0, shares = 0, reach = 0 } = post.engagement || {}
+  return {
+    id: post.id,
+    content: post.content,
+    platform,
+    engagement: likes + comments + shares,
+    reach
+  }
+}
+
+// Apply one engagement delta: { postId, platform, reach, likes, comments, shares, at }
+export async function recordEngagement(db, event) {
+  const parsed = engagementEvent.safeParse(event)
+  if (!parsed.success) {
+    throw httpError(issueMessage(parsed.error.issues[0]), 400)
+  }
+  event = parsed.data
+  const day = dayKey(event.at || new Date())
+  const inc = incrementFor(event)
+  if (Object.keys(inc).length === 0) {
+    return
+  }
+
+  await ensureAnalyticsIndexes(db)
+  const [post] = await Promise.all([
+    db.collection('posts').findOneAndUpdate(
+      { id: event.postId },
+      { $inc: postIncrement(inc) },
+      { returnDocument: 'after', projection: { _id: 0, id: 1, content: 1, publishedAt: 1, engagement: 1 } }
+    ),
+    db.collection('analytics_daily').updateOne(
+      rollupFilter(day, event.platform),
+      { $inc: inc },
+      { upsert: true }
+    )
+  ])
+
+  if (post?.publishedAt) {
+    await db.collection('analytics_daily').bulkWrite(
+      topPostOps(dayKey(post.publishedAt), topPostEntry(post, event.platform)),
+      { ordered: true }
+    )
+  }
+}
+
+// Recent flush ids kept on each post and rollup written with one
+const APPLIED_FLUSHES = 64
+
+function isDuplicateKey(writeError) {
+  return writeError.code === 11000
+}
+
+// Unordered upserts guarded by { applied: { $ne: flushId } }. A document that
+// already has the id fails the filter, so its upsert collides with the unique
+// index instead. Those ops are tried once more, in case the collision was
+// two first upserts racing; a second collision means the update is applied.
+async function bulkUpsertOnce(collection, ops) {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      await collection.bulkWrite(ops, { ordered: false })
+      return
+    } catch (error) {
+      const writeErrors = [].concat(error.writeErrors || [])
+      if (writeErrors.length === 0 || !writeErrors.every(isDuplicateKey)) {
+        throw error
+      }
+      if (attempt > 0) {
+        return
+      }
+      ops = writeErrors.map(writeError => ops[writeError.index])
+    }
+  }
+}
+
+// Apply many already coalesced deltas ({ postId, platform, day, ...counters })
+// with one bulkWrite per collection instead of a round trip per event. With a
+// flushId each post and rollup records it in the same update and is skipped
+// if it already has it, so a batch can be retried after a partial failure
+// without counting anything twice.
+export async function recordEngagementBatch(db, deltas, { flushId } = {}) {
+  const postOps = new Map()
+  const rollupOps = new Map()
+
+  for (const delta of deltas) {
+    const inc = incrementFor(delta)
+    if (Object.keys(inc).length === 0) {
+      continue
+    }
+
+    const post = postOps.get(delta.postId) || { platform: delta.platform, inc: {} }
+    for (const [field, value] of Object.entries(postIncrement(inc))) {
+      post.inc[field] = (post.inc[field] || 0) + value
+    }
+    postOps.set(delta.postId, post)
+
+    const key = `${delta.day}:${delta.platform}`
+    const rollup = rollupOps.get(key) || { day: delta.day, platform: delta.platform, inc: {} }
+    for (const [counter, value] of Object.entries(inc)) {
+      rollup.inc[counter] = (rollup.inc[counter] || 0) + value
+    }
+    rollupOps.set(key, rollup)
+  }
+
+  if (postOps.size === 0) {
+    return { posts: 0, rollups: 0 }
+  }
+
+  await ensureAnalyticsIndexes(db)
+
+  const unapplied = flushId ? { ingestFlushes: { $ne: flushId } } : {}
+  const record = flushId ? { $push: { ingestFlushes: { $each: [flushId], $slice: -APPLIED_FLUSHES } } } : {}
+
+  // Posts are not upserted; deltas reach here already attributed to this
+  // tenant by post (findPostTenants), so every one names an existing post
+  const [postResult] = await Promise.all([
+    db.collection('posts').bulkWrite(
+      [...postOps].map(([id, { inc }]) => ({
+        updateOne: { filter: { id, ...unapplied }, update: { $inc: inc, ...record } }
+      })),
+      { ordered: false }
+    ),
+    bulkUpsertOnce(db.collection('analytics_daily'),
+      [...rollupOps.values()].map(({ day, platform, inc }) => ({
+        updateOne: { filter: { ...rollupFilter(day, platform), ...unapplied }, update: { $inc: inc, ...record }, upsert: true }
+      }))
+    )
+  ])
+
+  const published = await db.collection('posts')
+    .find(
+      { id: { $in: [...postOps.keys()] }, publishedAt: { $ne: null } },
+      { projection: { _id: 0, id: 1, content: 1, publishedAt: 1, engagement: 1 } }
+    )
+    .toArray()
+
+  if (published.length > 0) {
+    await db.collection('analytics_daily').bulkWrite(
+      published.flatMap(post => topPostOps(dayKey(post.publishedAt), topPostEntry(post, postOps.get(post.id).platform))),
+      { ordered: true }
+    )
+  }
+
+  return { posts: postResult.matchedCount, rollups: rollupOps.size }
+}
+
+function uniqueTopPosts(candidates) {
+  // Concurrent updates can briefly leave two entries for one post; keep the newest total
+  const best = new Map()
+  for (const candidate of candidates) {
+    const current = best.get(candidate.id)
+    if (!current || candidate.engagement > current.engagement) {
+      best.set(candidate.id, candidate)
+    }
+  }
+  return [...best.values()]
+}
+
+export async function getAnalytics(db, timeframe) {
+  await ensureAnalyticsIndexes(db)
+  const days = parseTimeframe(timeframe)
+  const since = dayKey(Date.now() - (days - 1) * 86400000)
+
+  const buckets = await db.collection('analytics_daily')
+    .find({ day: { $gte: since } }, { projection: { ingestFlushes: 0 } })
+    .toArray()
+
+  const totals = { posts: 0, reach: 0, likes: 0, comments: 0, shares: 0 }
+  const platforms = {}
+  const candidates = []
+
+  for (const platform of PLATFORMS) {
+    platforms[platform] = { posts: 0, reach: 0, engagement: 0 }
+  }
+
+  for (const bucket of buckets) {
+    if (bucket.top) {
+      candidates.push(...bucket.top)
+      continue
+    }
+    if (bucket.platform === ALL_PLATFORMS) {
+      totals.posts += bucket.posts || 0
+      continue
+    }
+    for (const counter of ENGAGEMENT_FIELDS) {
+      totals[counter] += bucket[counter] || 0
+    }
+    const platform = platforms[bucket.platform] || (platforms[bucket.platform] = { posts: 0, reach: 0, engagement: 0 })
+    platform.posts += bucket.posts || 0
+    platform.reach += bucket.reach || 0
+    platform.engagement += (bucket.likes || 0) + (bucket.comments || 0) + (bucket.shares || 0)
+  }
+
+  const totalEngagement = totals.likes + totals.comments + totals.shares
+
+  return {
+    timeframe: days,
+    overview: {
+      totalPosts: totals.posts,
+      totalReach: totals.reach,
+      totalEngagement,
+      // Follower counts are not tracked yet
+      followerGrowth: 0
+    },
+    engagement: {
+      likes: totals.likes,
+      comments: totals.comments,
+      shares: totals.shares,
+      avgEngagementRate: totals.reach ? Math.round(totalEngagement / totals.reach * 1000) / 10 : 0
+    },
+    platforms,
+    topPosts: uniqueTopPosts(candidates)
+      .sort((a, b) => b.engagement - a.engagement)
+      .slice(0, TOP_POSTS_RETURNED)
+  }
+}
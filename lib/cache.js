@@ -0,0 +1,124 @@
+import { createHash } from 'crypto'
+import { performance } from 'perf_hooks'
+import { addTiming } from './metrics.js'
+
+// In-process response cache for read-heavy GET endpoints. Entries hold the
+// already serialized body plus its ETag, keyed by tenant, tag and query string.
+// Writes invalidate by tag; TTL bounds staleness from other processes. A
+// build that was running when its tag was invalidated may have read the old
+// data, so its result is served but not stored.
+
+const MAX_ENTRIES = parseInt(process.env.RESPONSE_CACHE_MAX_ENTRIES || '1000', 10)
+const DEFAULT_TTL_MS = parseInt(process.env.RESPONSE_CACHE_TTL_MS || '15000', 10)
+
+const entries = new Map()
+
+// Invalidations are numbered; `tenant|tag` (or `|tag` for every tenant) maps
+// to the number of the latest one that covered it
+let invalidationClock = 0
+const invalidatedAt = new Map()
+
+const stats = {
+  hits: 0,
+  misses: 0,
+  notModified: 0,
+  invalidations: 0,
+  evictions: 0,
+  discarded: 0
+}
+
+function cacheKey(tenantId, tag, request) {
+  const url = new URL(request.url)
+  url.searchParams.sort()
+  return `${tenantId}|${tag}|${url.pathname}?${url.searchParams}`
+}
+
+function lastInvalidated(tenantId, tag) {
+  return Math.max(invalidatedAt.get(`${tenantId}|${tag}`) || 0, invalidatedAt.get(`|${tag}`) || 0)
+}
+
+function etagFor(body) {
+  return `"${createHash('sha1').update(body).digest('base64url')}"`
+}
+
+function matchesEtag(request, etag) {
+  const header = request.headers.get('if-none-match')
+  if (!header) {
+    return false
+  }
+  return header === '*' || header.split(',').some(value => value.trim().replace(/^W\//, '') === etag)
+}
+
+function store(key, entry) {
+  entries.delete(key)
+  entries.set(key, entry)
+  while (entries.size > MAX_ENTRIES) {
+    entries.delete(entries.keys().next().value)
+    stats.evictions++
+  }
+}
+
+function respond(request, entry, cacheStatus) {
+  const headers = {
+    ETag: entry.etag,
+    // Clients must revalidate every time; unchanged data costs a bodiless 304
+    'Cache-Control': 'private, no-cache',
+    'X-Cache': cacheStatus
+  }
+
+  if (matchesEtag(request, entry.etag)) {
+    stats.notModified++
+    return new Response(null, { status: 304, headers })
+  }
+
+  return new Response(entry.body, {
+    status: 200,
+    headers: { ...headers, 'Content-Type': 'application/json' }
+  })
+}
+
+// Serve `build()`'s JSON payload through the cache for this tenant and tag
+export async function cachedJson(request, { tenantId, tag, ttlMs = DEFAULT_TTL_MS }, build) {
+  const key = cacheKey(tenantId, tag, request)
+  const cached = entries.get(key)
+
+  if (cached && cached.expiresAt > Date.now()) {
+    stats.hits++
+    // Refresh recency so hot entries survive LRU eviction
+    store(key, cached)
+    return respond(request, cached, 'HIT')
+  }
+
+  stats.misses++
+  const generation = invalidationClock
+  const payload = await build()
+  const started = performance.now()
+  const body = JSON.stringify(payload)
+  addTiming('serialize', performance.now() - started)
+  const entry = { body, etag: etagFor(body), expiresAt: Date.now() + ttlMs }
+  if (lastInvalidated(tenantId, tag) > generation) {
+    stats.discarded++
+  } else {
+    store(key, entry)
+  }
+  return respond(request, entry, 'MISS')
+}
+
+// Drop cached responses for the given tags, for one tenant or (null) everyone
+export function invalidate(tenantId, ...tags) {
+  invalidationClock++
+  for (const tag of tags) {
+    invalidatedAt.set(`${tenantId === null ? '' : tenantId}|${tag}`, invalidationClock)
+  }
+  for (const key of entries.keys()) {
+    const [keyTenant, keyTag] = key.split('|', 2)
+    if ((tenantId === null || keyTenant === tenantId) && tags.includes(keyTag)) {
+      entries.delete(key)
+      stats.invalidations++
+    }
+  }
+}
+
+export function getCacheStats() {
+  return { ...stats, entries: entries.size, maxEntries: MAX_ENTRIES }
+}
@@ -0,0 +1,128 @@
+import { httpError } from './errors.js'
+import { ensurePostIndexes, POST_STATUSES } from './posts.js'
+
+// Calendar view of posts: per-day counts and short summaries for a window of
+// local days in the viewer's time zone. The window is turned into one UTC
+// scheduledAt range, so a month costs a single index range scan, and MongoDB
+// groups by local day with $dateToString's timezone support.
+
+export const MAX_CALENDAR_DAYS = 92
+export const POSTS_PER_DAY = parseInt(process.env.CALENDAR_POSTS_PER_DAY || '5', 10)
+
+const PREVIEW_LENGTH = 80
+const DAY_MS = 24 * 60 * 60 * 1000
+// Local days around a DST change are an hour longer or shorter than DAY_MS
+const DST_SLACK_MS = 60 * 60 * 1000
+const LOCAL_DAY = /^(\d{4})-(\d{2})-(\d{2})$/
+
+export function parseTimeZone(tz) {
+  const zone = tz || 'UTC'
+  try {
+    return new Intl.DateTimeFormat('en-US', { timeZone: zone }).resolvedOptions().timeZone
+  } catch {
+    throw httpError(`Unknown time zone: ${zone}`, 400)
+  }
+}
+
+// Milliseconds `timeZone` is ahead of UTC at `instant`
+function zoneOffset(instant, timeZone) {
+  const parts = {}
+  const format = new Intl.DateTimeFormat('en-US', {
+    timeZone,
+    hourCycle: 'h23',
+    year: 'numeric',
+    month: '2-digit',
+    day: '2-digit',
+    hour: '2-digit',
+    minute: '2-digit',
+    second: '2-digit'
+  })
+  for (const { type, value } of format.formatToParts(instant)) {
+    parts[type] = value
+  }
+  const wall = Date.UTC(parts.year, parts.month - 1, parts.day, parts.hour, parts.minute, parts.second)
+  return wall - Math.floor(instant / 1000) * 1000
+}
+
+// The UTC instant local `day` (YYYY-MM-DD) starts at in `timeZone`. The
+// offset is taken twice so days next to a DST change land right; where the
+// change skips midnight itself, the day starts at the transition.
+export function startOfLocalDay(day, timeZone) {
+  const match = LOCAL_DAY.exec(day || '')
+  if (!match) {
+    throw httpError('from and to must be dates (YYYY-MM-DD)', 400)
+  }
+  const wall = Date.UTC(match[1], match[2] - 1, match[3])
+  if (Number.isNaN(wall) || new Date(wall).toISOString().slice(0, 10) !== day) {
+    throw httpError(`Invalid date: ${day}`, 400)
+  }
+  const guess = wall - zoneOffset(wall, timeZone)
+  const offset = zoneOffset(guess, timeZone)
+  const start = wall - offset
+  return new Date(zoneOffset(start, timeZone) === offset ? start : guess)
+}
+
+const statusCounts = Object.fromEntries(POST_STATUSES.map(status => [
+  status,
+  { $sum: { $cond: [{ $eq: ['$status', status] }, 1, 0] } }
+]))
+
+// Days from `from` up to but excluding `to`, both local dates in `tz`
+export async function getPostCalendar(db, { from, to, tz }) {
+  const timeZone = parseTimeZone(tz)
+  const start = startOfLocalDay(from, timeZone)
+  const end = startOfLocalDay(to, timeZone)
+
+  if (end <= start) {
+    throw httpError('to must be after from', 400)
+  }
+  if (end - start > MAX_CALENDAR_DAYS * DAY_MS + DST_SLACK_MS) {
+    throw httpError(`Calendar windows are limited to ${MAX_CALENDAR_DAYS} days`, 400)
+  }
+
+  await ensurePostIndexes(db)
+  const days = await db.collection('posts').aggregate([
+    { $match: { scheduledAt: { $gte: start, $lt: end } } },
+    {
+      $group: {
+        _id: { $dateToString: { format: '%Y-%m-%d', date: '$scheduledAt', timezone: timeZone } },
+        count: { $sum: 1 },
+        ...statusCounts,
+        // Keeps only the day's first POSTS_PER_DAY posts while grouping, so a
+        // busy day never holds all of its posts in memory ($topN: MongoDB 5.2+)
+        posts: {
+          $topN: {
+            n: POSTS_PER_DAY,
+            sortBy: { scheduledAt: 1, id: 1 },
+            output: {
+              id: '$id',
+              scheduledAt: '$scheduledAt',
+              status: '$status',
+              platforms: '$platforms',
+              preview: { $substrCP: [{ $ifNull: ['$content', ''] }, 0, PREVIEW_LENGTH] }
+            }
+          }
+        }
+      }
+    },
+    { $sort: { _id: 1 } },
+    {
+      $project: {
+        _id: 0,
+        day: '$_id',
+        count: 1,
+        byStatus: Object.fromEntries(POST_STATUSES.map(status => [status, `$${status}`])),
+        posts: 1
+      }
+    }
+  ]).toArray()
+
+  return {
+    from,
+    to,
+    tz: timeZone,
+    range: { start, end },
+    total: days.reduce((sum, day) => sum + day.count, 0),
+    days
+  }
+}
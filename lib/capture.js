@@ -0,0 +1,170 @@
+import { AsyncLocalStorage } from 'async_hooks'
+import fs from 'fs'
+import { performance } from 'perf_hooks'
+import { getRouteName } from './metrics.js'
+
+// Traffic capture for production-shaped load tests. With CAPTURE_FILE set,
+// a sample of API requests is appended to that file as NDJSON, one record
+// per request: arrival time, method, matched route, path, query, the shape
+// of the body and how long the handler took. replay_traffic.py re-issues a
+// capture against another server and compares the latency distributions.
+//
+// Records are anonymized as they are written: strings become same-length
+// placeholders unless the field only steers behaviour (a status, platform,
+// date or page size), so sizes and validation outcomes survive but content,
+// names and contact details do not. Headers and cookies are never recorded.
+// Bodies the router does not read (uploads, NDJSON event streams) are
+// recorded by content type and size only.
+
+const DEFAULTS = {
+  file: process.env.CAPTURE_FILE || '',
+  sampleRate: parseFloat(process.env.CAPTURE_SAMPLE_RATE || '1'),
+  // Larger bodies keep one anonymized item and the item count
+  maxBodyBytes: parseInt(process.env.CAPTURE_MAX_BODY_BYTES || String(64 * 1024), 10),
+  // Records waiting on a slow disk beyond this are dropped, not buffered
+  maxPendingBytes: parseInt(process.env.CAPTURE_MAX_PENDING_BYTES || String(4 * 1024 * 1024), 10),
+  // Long-lived streams and scrape targets say nothing about request latency
+  excludeRoutes: new Set((process.env.CAPTURE_EXCLUDE_ROUTES || 'events,health,metrics').split(',').filter(Boolean))
+}
+
+// Fields whose string values are kept as sent
+const KEPT_FIELDS = new Set([
+  'action', 'after', 'at', 'businessType', 'category', 'connected', 'contentType', 'day', 'fields', 'from',
+  'lastEventId', 'limit', 'platform', 'platforms', 'scheduledAt', 'status', 'timeframe', 'to', 'types', 'tz',
+  'wait'
+])
+
+const URL_PREFIX = 'https://example.com/'
+
+const requestCapture = new AsyncLocalStorage()
+const stats = { captured: 0, dropped: 0, writeErrors: 0 }
+let stream = null
+
+function mask(text) {
+  if (/^https?:\/\//.test(text)) {
+    return URL_PREFIX + 'x'.repeat(Math.max(0, text.length - URL_PREFIX.length))
+  }
+  return 'x'.repeat(text.length)
+}
+
+export function anonymize(value, key = null) {
+  if (Array.isArray(value)) {
+    return value.map(item => anonymize(item, key))
+  }
+  if (value && typeof value === 'object') {
+    return Object.fromEntries(Object.entries(value).map(([field, item]) => [field, anonymize(item, field)]))
+  }
+  if (typeof value === 'string' && !KEPT_FIELDS.has(key)) {
+    return mask(value)
+  }
+  return value
+}
+
+function parseLines(text) {
+  return text.split('\n').filter(line => line.trim()).map(line => JSON.parse(line))
+}
+
+// { format, body } for small bodies, { format, sample, items } for large
+// arrays and NDJSON, or just the format when the text is not JSON at all
+export function describeBody(text, maxBytes = DEFAULTS.maxBodyBytes) {
+  let format = 'json'
+  let value
+  try {
+    value = JSON.parse(text)
+  } catch {
+    try {
+      format = 'ndjson'
+      value = parseLines(text)
+    } catch {
+      return { format: 'text' }
+    }
+  }
+  if (Buffer.byteLength(text) <= maxBytes || !Array.isArray(value) || value.length === 0) {
+    return { format, body: anonymize(value) }
+  }
+  return { format, sample: anonymize(value[0]), items: value.length }
+}
+
+function getStream() {
+  if (!stream) {
+    stream = fs.createWriteStream(DEFAULTS.file, { flags: 'a' })
+    stream.on('error', (error) => {
+      stats.writeErrors++
+      console.error('Capture write failed:', error.message)
+    })
+  }
+  return stream
+}
+
+function write(record) {
+  const out = getStream()
+  if (out.writableLength > DEFAULTS.maxPendingBytes) {
+    stats.dropped++
+    return
+  }
+  out.write(JSON.stringify(record) + '\n')
+  stats.captured++
+}
+
+// Called by the router with the body text it read for the current request
+export function captureBody(text) {
+  const record = requestCapture.getStore()
+  if (record) {
+    Object.assign(record, describeBody(text))
+  }
+}
+
+function startRecord(method, request) {
+  const url = new URL(request.url)
+  const query = {}
+  for (const [key, value] of url.searchParams) {
+    query[key] = KEPT_FIELDS.has(key) ? value : mask(value)
+  }
+  const contentType = request.headers.get('content-type')
+  const length = request.headers.get('content-length')
+  return {
+    at: Date.now(),
+    method,
+    route: null,
+    path: url.pathname,
+    query,
+    contentType: contentType ? contentType.split(';')[0].trim() : null,
+    bodyBytes: length === null ? null : parseInt(length, 10)
+  }
+}
+
+// Wraps a route handler, inside withMetrics so the matched route is known
+export function withCapture(method, handler) {
+  if (!DEFAULTS.file || !(DEFAULTS.sampleRate > 0)) {
+    return handler
+  }
+  return async function captured(request, context) {
+    if (Math.random() >= DEFAULTS.sampleRate) {
+      return handler(request, context)
+    }
+    const record = startRecord(method, request)
+    const started = performance.now()
+    let status = 500
+    try {
+      const response = await requestCapture.run(record, () => handler(request, context))
+      status = response.status
+      return response
+    } finally {
+      record.route = getRouteName()
+      if (!DEFAULTS.excludeRoutes.has(record.route)) {
+        write({ ...record, status, durationMs: Math.round((performance.now() - started) * 10) / 10 })
+      }
+    }
+  }
+}
+
+export function getCaptureStats() {
+  if (!DEFAULTS.file) {
+    return null
+  }
+  return {
+    sampleRate: DEFAULTS.sampleRate,
+    ...stats,
+    pendingBytes: stream ? stream.writableLength : 0
+  }
+}
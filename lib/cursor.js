@@ -0,0 +1,68 @@
+import { httpError } from './errors.js'
+
+// Opaque keyset cursors over (date desc, id desc). A page query continues
+// strictly after the last row returned, so it is one index range scan no
+// matter how far into the list the client has paged.
+
+export function encodeCursor(date, id) {
+  const payload = JSON.stringify([new Date(date).getTime(), id])
+  return Buffer.from(payload).toString('base64url')
+}
+
+export function decodeCursor(cursor) {
+  try {
+    const [time, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString())
+    if (!Number.isFinite(time) || typeof id !== 'string') {
+      return null
+    }
+    return { date: new Date(time), id }
+  } catch {
+    return null
+  }
+}
+
+// Filter matching rows after `cursor` when sorted by { [field]: -1, id: -1 }
+export function afterCursor(field, cursor) {
+  const position = decodeCursor(cursor)
+  if (!position) {
+    throw httpError('Invalid cursor', 400)
+  }
+  return {
+    $or: [
+      { [field]: { $lt: position.date } },
+      { [field]: position.date, id: { $lt: position.id } }
+    ]
+  }
+}
+
+export function parseLimit(limit, { defaultSize = 20, maxSize = 100 } = {}) {
+  const parsed = parseInt(limit, 10)
+  if (!Number.isFinite(parsed) || parsed < 1) {
+    return defaultSize
+  }
+  return Math.min(parsed, maxSize)
+}
+
+// Run a keyset page query: fetch one extra row to learn whether more exist
+export async function findPage(collection, query, { field, projection, limit, after }) {
+  if (after) {
+    Object.assign(query, afterCursor(field, after))
+  }
+
+  const rows = await collection
+    .find(query, { projection })
+    .sort({ [field]: -1, id: -1 })
+    .limit(limit + 1)
+    .toArray()
+
+  const hasMore = rows.length > limit
+  if (hasMore) {
+    rows.pop()
+  }
+
+  const last = rows[rows.length - 1]
+  return {
+    rows,
+    nextCursor: hasMore ? encodeCursor(last[field], last.id) : null
+  }
+}
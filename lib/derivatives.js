@@ -0,0 +1,259 @@
+import os from 'os'
+import { rename, stat, unlink } from 'fs/promises'
+import { v4 as uuidv4 } from 'uuid'
+import { httpError } from './errors.js'
+import {
+  VARIANT_NAMES,
+  fileResponse,
+  findObject,
+  isImageType,
+  isSha256,
+  objectPath,
+  parseVariant,
+  variantPath
+} from './uploads.js'
+
+// Background resize pipeline. Uploads enqueue one job per stored object in
+// `derivative_jobs`; workers lease jobs and render every 200/400/800px WebP
+// and JPEG variant next to the original with sharp (libvips).
+
+const DEFAULTS = {
+  concurrency: parseInt(process.env.DERIVATIVE_CONCURRENCY || String(os.availableParallelism?.() || os.cpus().length), 10),
+  leaseMs: parseInt(process.env.DERIVATIVE_LEASE_MS || '120000', 10),
+  pollIntervalMs: parseInt(process.env.DERIVATIVE_POLL_MS || '1000', 10),
+  maxAttempts: parseInt(process.env.DERIVATIVE_MAX_ATTEMPTS || '3', 10)
+}
+
+let sharpLoading = null
+
+// sharp is a native module; load it on first use so the API still starts
+// (and serves originals) on hosts where it is not installed.
+async function loadSharp() {
+  if (!sharpLoading) {
+    sharpLoading = import('sharp')
+      .then(module => module.default)
+      .catch((error) => {
+        sharpLoading = null
+        throw new Error(`Image derivatives require sharp (npm install sharp): ${error.message}`)
+      })
+  }
+  return sharpLoading
+}
+
+let indexesReady = null
+
+export function ensureDerivativeIndexes(db) {
+  if (!indexesReady) {
+    indexesReady = db.collection('derivative_jobs').createIndexes([
+      { key: { status: 1, createdAt: 1 }, name: 'status_createdAt' },
+      { key: { status: 1, leaseUntil: 1 }, name: 'status_leaseUntil' }
+    ]).catch((error) => {
+      indexesReady = null
+      throw error
+    })
+  }
+  return indexesReady
+}
+
+export async function getDerivativeQueueDepth(db) {
+  const jobs = db.collection('derivative_jobs')
+  const [pending, leased, failed] = await Promise.all(
+    ['pending', 'leased', 'failed'].map(status => jobs.countDocuments({ status }))
+  )
+  return { pending, leased, failed }
+}
+
+// One job per stored object; re-uploads of the same content are no-ops
+export async function enqueueDerivatives(db, images) {
+  const hashes = [...new Set(images
+    .filter(image => image && isImageType(image.contentType))
+    .map(image => image.sha256))]
+
+  if (hashes.length === 0) {
+    return
+  }
+
+  await ensureDerivativeIndexes(db)
+  const now = new Date()
+  await db.collection('derivative_jobs').bulkWrite(
+    hashes.map(sha256 => ({
+      updateOne: {
+        filter: { _id: sha256 },
+        update: {
+          $setOnInsert: { status: 'pending', attempts: 0, leaseOwner: null, leaseUntil: null, createdAt: now }
+        },
+        upsert: true
+      }
+    })),
+    { ordered: false }
+  )
+}
+
+function encode(pipeline, format) {
+  return format === 'webp'
+    ? pipeline.webp({ quality: 80 })
+    : pipeline.jpeg({ quality: 82, progressive: true, mozjpeg: true })
+}
+
+// Write to a temp name and rename so readers never see a partial file
+async function writeVariant(pipeline, sha256, name) {
+  const target = variantPath(sha256, name)
+  const tmp = `${target}.${uuidv4()}.tmp`
+  try {
+    await pipeline.toFile(tmp)
+    await rename(tmp, target)
+  } catch (error) {
+    await unlink(tmp).catch(() => {})
+    throw error
+  }
+  return target
+}
+
+export async function renderVariant(sha256, name) {
+  const variant = parseVariant(name)
+  const sharp = await loadSharp()
+  const pipeline = sharp(objectPath(sha256), { failOn: 'none' })
+    .rotate()
+    .resize({ width: variant.width, withoutEnlargement: true })
+  return writeVariant(encode(pipeline, variant.format), sha256, name)
+}
+
+// Decode the original once and fan the resizes out from clones of it
+export async function renderAllVariants(sha256) {
+  const sharp = await loadSharp()
+  const source = sharp(objectPath(sha256), { failOn: 'none' }).rotate()
+
+  await Promise.all(VARIANT_NAMES.map((name) => {
+    const { width, format } = parseVariant(name)
+    const pipeline = source.clone().resize({ width, withoutEnlargement: true })
+    return writeVariant(encode(pipeline, format), sha256, name)
+  }))
+
+  return VARIANT_NAMES
+}
+
+async function claimJob(db, workerId, leaseMs) {
+  const now = new Date()
+  return db.collection('derivative_jobs').findOneAndUpdate(
+    {
+      $or: [
+        { status: 'pending' },
+        { status: 'leased', leaseUntil: { $lte: now } }
+      ]
+    },
+    {
+      $set: { status: 'leased', leaseOwner: workerId, leaseUntil: new Date(now.getTime() + leaseMs) },
+      $inc: { attempts: 1 }
+    },
+    { sort: { createdAt: 1 }, returnDocument: 'after' }
+  )
+}
+
+async function processJob(db, job, workerId, options) {
+  const jobs = db.collection('derivative_jobs')
+  try {
+    const variants = await renderAllVariants(job._id)
+    await db.collection('image_objects').updateOne({ _id: job._id }, { $set: { variants } })
+    await jobs.updateOne(
+      { _id: job._id, leaseOwner: workerId },
+      { $set: { status: 'done', completedAt: new Date(), leaseUntil: null } }
+    )
+  } catch (error) {
+    console.error(`Derivatives for ${job._id} failed:`, error.message)
+    const exhausted = job.attempts >= options.maxAttempts
+    await jobs.updateOne(
+      { _id: job._id, leaseOwner: workerId },
+      {
+        $set: {
+          status: exhausted ? 'failed' : 'pending',
+          leaseOwner: null,
+          leaseUntil: null,
+          lastError: error.message
+        }
+      }
+    )
+  }
+}
+
+// Keeps up to `concurrency` jobs in flight; libvips runs each resize on its
+// own thread pool, so the default of one job per core keeps every core busy.
+export function createDerivativeWorker(getDb, {
+  workerId = `${os.hostname()}:${process.pid}:${uuidv4().slice(0, 8)}`,
+  ...overrides
+} = {}) {
+  const options = { ...DEFAULTS, ...overrides }
+  const stats = { processed: 0, active: 0 }
+  let running = false
+  let filling = false
+  let timer = null
+
+  async function fill() {
+    if (!running || filling) {
+      return
+    }
+    filling = true
+    try {
+      const db = await getDb()
+      await ensureDerivativeIndexes(db)
+      while (running && stats.active < options.concurrency) {
+        const job = await claimJob(db, workerId, options.leaseMs)
+        if (!job) {
+          break
+        }
+        stats.active++
+        processJob(db, job, workerId, options).finally(() => {
+          stats.active--
+          stats.processed++
+          fill()
+        })
+      }
+    } catch (error) {
+      console.error('Derivative worker error:', error)
+    } finally {
+      filling = false
+    }
+    clearTimeout(timer)
+    timer = setTimeout(fill, options.pollIntervalMs)
+  }
+
+  return {
+    workerId,
+    start() {
+      if (!running) {
+        running = true
+        loadSharp().catch(error => console.error(error.message))
+        fill()
+      }
+    },
+    stop() {
+      running = false
+      clearTimeout(timer)
+    },
+    stats() {
+      return { workerId, running, concurrency: options.concurrency, ...stats }
+    }
+  }
+}
+
+// Serve a variant, rendering it on the spot if the background job has not
+// reached this object yet. Either way the result is cached immutably.
+export async function variantResponse(db, sha256, name, request) {
+  const variant = parseVariant(name)
+  const object = isSha256(sha256) && variant ? await findObject(db, sha256) : null
+  if (!object || !isImageType(object.contentType)) {
+    throw httpError('File not found', 404)
+  }
+
+  const filePath = variantPath(sha256, name)
+  let info = await stat(filePath).catch(() => null)
+  if (!info) {
+    await renderVariant(sha256, name)
+    info = await stat(filePath)
+  }
+
+  return fileResponse(filePath, {
+    contentType: variant.contentType,
+    bytes: info.size,
+    etag: `"${sha256}-${name}"`
+  }, request)
+}
@@ -0,0 +1,9 @@
+// Errors carrying an HTTP status. The router turns them into a JSON response
+// { error: message, ...details } with that status; anything thrown without a
+// status is logged and answered with a 500.
+export function httpError(message, status, details) {
+  const error = new Error(message)
+  error.status = status
+  error.details = details
+  return error
+}
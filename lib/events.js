@@ -0,0 +1,350 @@
+import { allTenants } from './tenancy.js'
+
+// Live updates for connected dashboards over Server-Sent Events. Every event
+// is encoded once into a bounded ring of recent events and the same bytes are
+// enqueued on each connection, so fan-out costs one enqueue per client. One
+// upstream feed per process fills the ring: a MongoDB change stream on posts
+// when the server supports them (replica sets), so status changes made by
+// a standalone dispatcher reach every API process, otherwise the in-process
+// bus that the route handlers, scheduler, publisher and ingestor emit to.
+// The feed starts with the first connection.
+//
+// Connections belong to the tenant of the session that opened them and only
+// ever see that tenant's events; the ring is shared, replay filters it.
+//
+// Event ids are `<epoch>-<seq>`. A client reconnecting with Last-Event-ID
+// gets the events it missed replayed from the ring, or a `reset` event if
+// they are gone (or the id is from another process) and it must refetch.
+
+const DEFAULTS = {
+  bufferSize: parseInt(process.env.EVENTS_BUFFER_SIZE || '1000', 10),
+  heartbeatMs: parseInt(process.env.EVENTS_HEARTBEAT_MS || '15000', 10),
+  maxClients: parseInt(process.env.EVENTS_MAX_CLIENTS || '10000', 10),
+  // Events queued for one slow client before it is disconnected to resume later
+  maxQueued: parseInt(process.env.EVENTS_MAX_QUEUED || '256', 10),
+  source: process.env.EVENTS_SOURCE || 'auto',
+  retryMs: 3000
+}
+
+// Types the change stream produces itself; local emits of these are dropped
+// while it is the active source so clients never see them twice
+const STREAMED_TYPES = new Set(['post.created', 'post.status', 'post.delivery'])
+
+const encoder = new TextEncoder()
+
+function frame(event) {
+  return encoder.encode(`id: ${event.id}\nevent: ${event.type}\ndata: ${JSON.stringify(event.data)}\n\n`)
+}
+
+// Map one change stream document to the events clients understand
+export function changeToEvents(change) {
+  const post = change.fullDocument
+  if (!post?.id || !post.tenantId) {
+    return []
+  }
+  const { tenantId } = post
+  if (change.operationType === 'insert') {
+    return [{ tenantId, type: 'post.created', data: { id: post.id, status: post.status, scheduledAt: post.scheduledAt } }]
+  }
+
+  const events = []
+  const updated = change.updateDescription?.updatedFields || {}
+  if (change.operationType === 'replace' || 'status' in updated) {
+    events.push({
+      tenantId,
+      type: 'post.status',
+      data: { id: post.id, status: post.status, publishedAt: post.publishedAt || null }
+    })
+  }
+  for (const [field, delivery] of Object.entries(updated)) {
+    if (field.startsWith('delivery.')) {
+      events.push({
+        tenantId,
+        type: 'post.delivery',
+        data: { id: post.id, platform: field.slice('delivery.'.length), delivery }
+      })
+    }
+  }
+  return events
+}
+
+// Inserts, status changes and per-platform delivery updates; engagement
+// counter updates are skipped before the post lookup
+const CHANGE_PIPELINE = [
+  {
+    $match: {
+      $or: [
+        { operationType: { $in: ['insert', 'replace'] } },
+        { 'updateDescription.updatedFields.status': { $exists: true } },
+        {
+          $expr: {
+            $anyElementTrue: [{
+              $map: {
+                input: { $objectToArray: { $ifNull: ['$updateDescription.updatedFields', {}] } },
+                in: { $eq: [{ $substrCP: ['$$this.k', 0, 9] }, 'delivery.'] }
+              }
+            }]
+          }
+        }
+      ]
+    }
+  },
+  {
+    $project: {
+      operationType: 1,
+      updateDescription: 1,
+      'fullDocument.id': 1,
+      'fullDocument.tenantId': 1,
+      'fullDocument.status': 1,
+      'fullDocument.scheduledAt': 1,
+      'fullDocument.publishedAt': 1
+    }
+  }
+]
+
+export function createEventHub(getDb, overrides = {}) {
+  const options = { ...DEFAULTS, ...overrides }
+  const epoch = Date.now().toString(36)
+  const ring = []
+  // tenantId -> Set of clients, so an event is offered to its tenant's clients only
+  const tenants = new Map()
+  const heartbeat = encoder.encode(': ping\n\n')
+  const stats = {
+    published: 0,
+    dropped: 0,
+    connected: 0,
+    rejected: 0,
+    resumed: 0,
+    resets: 0,
+    feedRestarts: 0
+  }
+
+  let seq = 0
+  let clientCount = 0
+  let mode = options.source === 'local' ? 'local' : 'pending'
+  let feedStarted = false
+  let stream = null
+  let resumeToken = null
+  let heartbeatTimer = null
+
+  function send(client, bytes) {
+    // desiredSize falls as the client falls behind; past maxQueued it is cut
+    // loose to reconnect with Last-Event-ID instead of growing the queue
+    if (client.controller.desiredSize <= 0) {
+      stats.dropped++
+      close(client)
+      return
+    }
+    client.controller.enqueue(bytes)
+  }
+
+  function publish(tenantId, type, data) {
+    const event = { seq: ++seq, id: `${epoch}-${seq}`, tenantId, type, data: { ...data, at: new Date().toISOString() } }
+    event.bytes = frame(event)
+    ring.push(event)
+    if (ring.length > options.bufferSize) {
+      ring.shift()
+    }
+    stats.published++
+    for (const client of tenants.get(tenantId) || []) {
+      if (!client.types || client.types.has(type)) {
+        send(client, event.bytes)
+      }
+    }
+    return event
+  }
+
+  function close(client) {
+    const clients = tenants.get(client.tenantId)
+    if (!clients?.delete(client)) {
+      return
+    }
+    if (clients.size === 0) {
+      tenants.delete(client.tenantId)
+    }
+    clientCount--
+    try {
+      client.controller.close()
+    } catch {
+      // Already closed by the client going away
+    }
+    if (clientCount === 0) {
+      clearInterval(heartbeatTimer)
+      heartbeatTimer = null
+    }
+  }
+
+  async function watch() {
+    try {
+      const db = allTenants(await getDb())
+      if (mode === 'pending') {
+        const hello = await db.command({ hello: 1 })
+        if (!hello.setName && hello.msg !== 'isdbgrid') {
+          console.warn('MongoDB is standalone, so /api/events serves in-process events only')
+          mode = 'local'
+          return
+        }
+        mode = 'changestream'
+      }
+      stream = db.collection('posts').watch(CHANGE_PIPELINE, {
+        fullDocument: 'updateLookup',
+        ...(resumeToken ? { resumeAfter: resumeToken } : {})
+      })
+    } catch (error) {
+      restartFeed(error)
+      return
+    }
+    stream.on('change', (change) => {
+      resumeToken = change._id
+      for (const { tenantId, type, data } of changeToEvents(change)) {
+        publish(tenantId, type, data)
+      }
+    })
+    stream.on('error', restartFeed)
+  }
+
+  // Reopen the change stream where the last change left off
+  function restartFeed(error) {
+    console.error('Post change stream failed:', error.message)
+    stream?.close().catch(() => {})
+    stream = null
+    stats.feedRestarts++
+    setTimeout(watch, options.retryMs).unref?.()
+  }
+
+  function ensureFeed() {
+    if (!feedStarted && mode === 'pending') {
+      feedStarted = true
+      watch()
+    }
+    if (!heartbeatTimer) {
+      heartbeatTimer = setInterval(() => {
+        for (const clients of tenants.values()) {
+          for (const client of clients) {
+            send(client, heartbeat)
+          }
+        }
+      }, options.heartbeatMs)
+      heartbeatTimer.unref?.()
+    }
+  }
+
+  // Events after `lastEventId` (any tenant's), or null when they are no longer buffered
+  function missedSince(lastEventId) {
+    const [idEpoch, idSeq] = String(lastEventId).split('-')
+    const after = parseInt(idSeq, 10)
+    if (idEpoch !== epoch || !Number.isFinite(after) || after > seq) {
+      return null
+    }
+    if (after < (ring[0]?.seq ?? seq + 1) - 1) {
+      return null
+    }
+    return ring.filter(event => event.seq > after)
+  }
+
+  return {
+    // Emit from application code; ignored for types the change stream covers
+    emit(tenantId, type, data) {
+      if (mode === 'changestream' && STREAMED_TYPES.has(type)) {
+        return null
+      }
+      return publish(tenantId, type, data)
+    },
+    // A text/event-stream Response for one client of `tenantId`
+    connect(request, { tenantId, lastEventId, types } = {}) {
+      if (clientCount >= options.maxClients) {
+        stats.rejected++
+        return Response.json({ error: 'Too many event stream clients' }, {
+          status: 503,
+          headers: { 'Retry-After': String(Math.ceil(options.retryMs / 1000)) }
+        })
+      }
+
+      let client
+      const body = new ReadableStream({
+        start(controller) {
+          client = { tenantId, controller, types: types?.length ? new Set(types) : null }
+          controller.enqueue(encoder.encode(`retry: ${options.retryMs}\n: connected ${epoch}-${seq}\n\n`))
+
+          if (lastEventId) {
+            const missed = missedSince(lastEventId)
+            if (missed) {
+              stats.resumed++
+              for (const event of missed) {
+                if (event.tenantId === tenantId && (!client.types || client.types.has(event.type))) {
+                  controller.enqueue(event.bytes)
+                }
+              }
+            } else {
+              stats.resets++
+              controller.enqueue(frame({ id: `${epoch}-${seq}`, type: 'reset', data: { reason: 'events expired' } }))
+            }
+          }
+
+          if (!tenants.has(tenantId)) {
+            tenants.set(tenantId, new Set())
+          }
+          tenants.get(tenantId).add(client)
+          clientCount++
+          stats.connected++
+          ensureFeed()
+        },
+        cancel() {
+          close(client)
+        }
+      }, { highWaterMark: options.maxQueued })
+
+      request.signal?.addEventListener('abort', () => close(client), { once: true })
+
+      return new Response(body, {
+        headers: {
+          'Content-Type': 'text/event-stream; charset=utf-8',
+          'Cache-Control': 'no-cache, no-transform',
+          Connection: 'keep-alive',
+          'X-Accel-Buffering': 'no'
+        }
+      })
+    },
+    stats() {
+      return {
+        mode,
+        clients: clientCount,
+        tenants: tenants.size,
+        buffered: ring.length,
+        lastEventId: `${epoch}-${seq}`,
+        bufferSize: options.bufferSize,
+        heartbeatMs: options.heartbeatMs,
+        ...stats
+      }
+    },
+    stop() {
+      for (const clients of [...tenants.values()]) {
+        for (const client of [...clients]) {
+          close(client)
+        }
+      }
+      stream?.close().catch(() => {})
+      stream = null
+    }
+  }
+}
+
+let shared = null
+
+// The process-wide hub behind /api/events
+export function getEventHub(getDb) {
+  if (!shared) {
+    shared = createEventHub(getDb)
+  }
+  return shared
+}
+
+// For code paths that have no getDb of their own (publisher, ingestor).
+// Nothing is buffered until the API has created the hub.
+export function emitEvent(tenantId, type, data) {
+  return shared ? shared.emit(tenantId, type, data) : null
+}
+
+export function getEventStats() {
+  return shared ? shared.stats() : null
+}
@@ -0,0 +1,236 @@
+import { ALL_PLATFORMS, ensureAnalyticsIndexes, TOP_POSTS } from './analytics.js'
+import { parseTimeZone, startOfLocalDay } from './calendar.js'
+import { httpError } from './errors.js'
+import { ensurePostIndexes } from './posts.js'
+
+// Full-history exports of a tenant's posts or daily analytics as CSV or
+// NDJSON. Rows are encoded straight off a MongoDB cursor one driver batch at
+// a time, and the ReadableStream only pulls the next batch once the client
+// has drained what is queued, so a slow reader pauses the cursor and memory
+// holds about one batch however many rows the export has. A client that
+// disconnects cancels the stream and closes the cursor. `db` is a tenant
+// handle (forTenant).
+
+export const EXPORT_TYPES = ['posts', 'analytics']
+export const EXPORT_FORMATS = ['csv', 'ndjson']
+
+const DEFAULTS = {
+  batchSize: parseInt(process.env.EXPORT_BATCH_SIZE || '1000', 10),
+  // Encoded bytes queued ahead of the client before the cursor waits
+  highWaterBytes: parseInt(process.env.EXPORT_HIGH_WATER_BYTES || String(256 * 1024), 10)
+}
+
+const CONTENT_TYPES = {
+  csv: 'text/csv; charset=utf-8',
+  ndjson: 'application/x-ndjson'
+}
+
+const ENGAGEMENT_FIELDS = ['reach', 'likes', 'comments', 'shares']
+
+const encoder = new TextEncoder()
+const stats = { started: 0, completed: 0, cancelled: 0, failed: 0, rows: 0, active: 0 }
+
+function isoDate(value) {
+  return value ? new Date(value).toISOString() : null
+}
+
+const EXPORTS = {
+  posts: {
+    collection: 'posts',
+    ensureIndexes: ensurePostIndexes,
+    // scheduledAt range in the tenant_scheduledAt index, read oldest first
+    filter({ start, end }) {
+      const range = {}
+      if (start) {
+        range.$gte = start
+      }
+      if (end) {
+        range.$lt = end
+      }
+      return Object.keys(range).length > 0 ? { scheduledAt: range } : {}
+    },
+    sort: { scheduledAt: 1, id: 1 },
+    projection: {
+      _id: 0, id: 1, status: 1, scheduledAt: 1, publishedAt: 1, createdAt: 1,
+      platforms: 1, content: 1, images: 1, engagement: 1, delivery: 1
+    },
+    columns: [
+      'id', 'status', 'scheduledAt', 'publishedAt', 'createdAt', 'platforms', 'content', 'images',
+      ...ENGAGEMENT_FIELDS, 'delivery'
+    ],
+    row(post) {
+      const engagement = post.engagement || {}
+      return {
+        id: post.id,
+        status: post.status,
+        scheduledAt: isoDate(post.scheduledAt),
+        publishedAt: isoDate(post.publishedAt),
+        createdAt: isoDate(post.createdAt),
+        platforms: post.platforms || [],
+        content: post.content,
+        images: post.images || [],
+        ...Object.fromEntries(ENGAGEMENT_FIELDS.map(field => [field, engagement[field] || 0])),
+        // { <platform>: <delivery status> }
+        delivery: Object.fromEntries(Object.entries(post.delivery || {}).map(([platform, d]) => [platform, d.status]))
+      }
+    }
+  },
+  analytics: {
+    collection: 'analytics_daily',
+    ensureIndexes: ensureAnalyticsIndexes,
+    // Buckets are keyed by UTC date strings, so the dates are compared as given
+    filter({ from, to }) {
+      const day = {}
+      if (from) {
+        day.$gte = from
+      }
+      if (to) {
+        day.$lt = to
+      }
+      const filter = { platform: { $ne: TOP_POSTS } }
+      return Object.keys(day).length > 0 ? { day, ...filter } : filter
+    },
+    sort: { day: 1, platform: 1 },
+    projection: { _id: 0, day: 1, platform: 1, posts: 1, ...Object.fromEntries(ENGAGEMENT_FIELDS.map(f => [f, 1])) },
+    columns: ['day', 'platform', 'posts', ...ENGAGEMENT_FIELDS],
+    row(bucket) {
+      return {
+        day: bucket.day,
+        // Distinct posts across platforms; it carries no engagement of its own
+        platform: bucket.platform === ALL_PLATFORMS ? 'all' : bucket.platform,
+        posts: bucket.posts || 0,
+        ...Object.fromEntries(ENGAGEMENT_FIELDS.map(field => [field, bucket[field] || 0]))
+      }
+    }
+  }
+}
+
+// Quote per RFC 4180, and defuse text a spreadsheet would run as a formula
+function csvField(value) {
+  if (value === null || value === undefined) {
+    return ''
+  }
+  let text
+  if (Array.isArray(value)) {
+    text = value.join(';')
+  } else if (typeof value === 'object') {
+    text = Object.entries(value).map(([key, item]) => `${key}:${item}`).join(';')
+  } else {
+    text = String(value)
+  }
+  if (typeof value === 'string' && /^[=+\-@\t\r]/.test(text)) {
+    text = `'${text}`
+  }
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text
+}
+
+function csvLine(columns, row) {
+  return columns.map(column => csvField(row[column])).join(',') + '\r\n'
+}
+
+function encoderFor(spec, format) {
+  if (format === 'csv') {
+    return { header: spec.columns.join(',') + '\r\n', line: doc => csvLine(spec.columns, spec.row(doc)) }
+  }
+  return { header: '', line: doc => JSON.stringify(spec.row(doc)) + '\n' }
+}
+
+// Each pull encodes the cursor's current batch into one chunk
+function cursorStream(cursor, { header, line }, options) {
+  let sentHeader = false
+  let finished = false
+  stats.started++
+  stats.active++
+
+  const finish = (outcome) => {
+    if (!finished) {
+      finished = true
+      stats.active--
+      stats[outcome]++
+    }
+  }
+
+  return new ReadableStream({
+    async pull(controller) {
+      try {
+        let text = sentHeader ? '' : header
+        sentHeader = true
+        if (await cursor.hasNext()) {
+          const docs = cursor.readBufferedDocuments()
+          for (const doc of docs) {
+            text += line(doc)
+          }
+          stats.rows += docs.length
+        } else {
+          finish('completed')
+          await cursor.close()
+          if (text) {
+            controller.enqueue(encoder.encode(text))
+          }
+          controller.close()
+          return
+        }
+        controller.enqueue(encoder.encode(text))
+      } catch (error) {
+        // Headers are already sent; the client sees a truncated download
+        console.error('Export failed:', error)
+        finish('failed')
+        await cursor.close().catch(() => {})
+        controller.error(error)
+      }
+    },
+    async cancel() {
+      finish('cancelled')
+      await cursor.close()
+    }
+  }, new ByteLengthQueuingStrategy({ highWaterMark: options.highWaterBytes }))
+}
+
+function acceptsGzip(request) {
+  return /\bgzip\b/.test(request.headers.get('accept-encoding') || '')
+}
+
+// { type, format, from, to, tz, gzip }: from/to are dates (YYYY-MM-DD), from
+// inclusive and to exclusive, either may be left open. Post dates are local
+// to `tz`; analytics days are always UTC, as they are stored. The body is
+// gzipped when the client accepts it, unless `gzip` is '0'.
+export async function exportResponse(db, { type, format, from, to, tz, gzip }, request, options = DEFAULTS) {
+  if (!EXPORT_TYPES.includes(type)) {
+    throw httpError(`type must be one of: ${EXPORT_TYPES.join(', ')}`, 400)
+  }
+  const spec = EXPORTS[type]
+  const encoding = format || 'csv'
+  if (!EXPORT_FORMATS.includes(encoding)) {
+    throw httpError(`format must be one of: ${EXPORT_FORMATS.join(', ')}`, 400)
+  }
+  const timeZone = parseTimeZone(tz)
+  const start = from ? startOfLocalDay(from, timeZone) : null
+  const end = to ? startOfLocalDay(to, timeZone) : null
+  if (start && end && end <= start) {
+    throw httpError('to must be after from', 400)
+  }
+
+  await spec.ensureIndexes(db)
+  const cursor = db.collection(spec.collection)
+    .find(spec.filter({ start, end, from, to }), { projection: spec.projection })
+    .sort(spec.sort)
+    .batchSize(options.batchSize)
+
+  let body = cursorStream(cursor, encoderFor(spec, encoding), options)
+  const filename = [type, from, to].filter(Boolean).join('-') + `.${encoding}`
+  const headers = {
+    'Content-Type': CONTENT_TYPES[encoding],
+    'Content-Disposition': `attachment; filename="${filename}"`,
+    'Cache-Control': 'no-store',
+    Vary: 'Accept-Encoding'
+  }
+  if (gzip !== '0' && acceptsGzip(request)) {
+    body = body.pipeThrough(new CompressionStream('gzip'))
+    headers['Content-Encoding'] = 'gzip'
+  }
+  return new Response(body, { headers })
+}
+
+export function getExportStats() {
+  return { ...stats }
+}
@@ -0,0 +1,79 @@
+import https from 'https'
+import { getAccessToken } from './tokens.js'
+
+// Pooled googleapis clients. One OAuth2 client (and its service objects) is
+// kept per account and reused across requests; only its credentials change
+// when the token manager hands out a new access token. All clients share one
+// keep-alive agent, so calls reuse TLS connections to googleapis.com.
+
+const MAX_CLIENTS = parseInt(process.env.GOOGLE_CLIENT_POOL_SIZE || '1000', 10)
+
+const clients = new Map()
+
+let googleLoading = null
+
+// googleapis is large; load it the first time a Google call is made
+async function loadGoogle() {
+  if (!googleLoading) {
+    googleLoading = import('googleapis')
+      .then(({ google }) => {
+        google.options({ agent: new https.Agent({ keepAlive: true, maxSockets: 50 }) })
+        return google
+      })
+      .catch((error) => {
+        googleLoading = null
+        throw error
+      })
+  }
+  return googleLoading
+}
+
+async function clientFor(db, accountId) {
+  const google = await loadGoogle()
+  const { accessToken, expiresAt } = await getAccessToken(db, accountId)
+
+  let client = clients.get(accountId)
+  if (client) {
+    // Re-insert to keep the map in least-recently-used order
+    clients.delete(accountId)
+  } else {
+    client = {
+      auth: new google.auth.OAuth2(process.env.GOOGLE_CLIENT_ID, process.env.GOOGLE_CLIENT_SECRET),
+      services: new Map()
+    }
+  }
+  clients.set(accountId, client)
+  while (clients.size > MAX_CLIENTS) {
+    clients.delete(clients.keys().next().value)
+  }
+
+  if (client.auth.credentials.access_token !== accessToken) {
+    client.auth.setCredentials({ access_token: accessToken, expiry_date: expiresAt })
+  }
+  return { google, client }
+}
+
+export async function getGoogleAuth(db, accountId) {
+  const { client } = await clientFor(db, accountId)
+  return client.auth
+}
+
+// e.g. getGoogleService(db, user, 'drive', 'v3')
+export async function getGoogleService(db, accountId, name, version) {
+  const { google, client } = await clientFor(db, accountId)
+  const key = `${name}:${version}`
+  let service = client.services.get(key)
+  if (!service) {
+    service = google[name]({ version, auth: client.auth })
+    client.services.set(key, service)
+  }
+  return service
+}
+
+export function getDrive(db, accountId) {
+  return getGoogleService(db, accountId, 'drive', 'v3')
+}
+
+export function getGoogleClientStats() {
+  return { pooledClients: clients.size }
+}
@@ -0,0 +1,92 @@
+import { v4 as uuidv4 } from 'uuid'
+import { findPage, parseLimit } from './cursor.js'
+import { parseTags, releaseObject } from './uploads.js'
+
+export const DEFAULT_PAGE_SIZE = 40
+export const MAX_PAGE_SIZE = 200
+
+// What the library grid needs and nothing more: no originals, no hashes
+const LISTING_PROJECTION = {
+  _id: 0,
+  id: 1,
+  filename: 1,
+  thumbnail: 1,
+  category: 1,
+  tags: 1,
+  uploadedAt: 1,
+  size: 1
+}
+
+let indexesReady = null
+
+// `db` is a tenant handle (forTenant): every image query is one tenant's library
+export function ensureImageIndexes(db) {
+  if (!indexesReady) {
+    indexesReady = db.collection('images').createIndexes([
+      { key: { tenantId: 1, category: 1, uploadedAt: -1, id: -1 }, name: 'tenant_category_uploadedAt' },
+      { key: { tenantId: 1, uploadedAt: -1, id: -1 }, name: 'tenant_uploadedAt' },
+      // The tenant prefix means every text search is confined to one library
+      { key: { tenantId: 1, filename: 'text', tags: 'text' }, name: 'tenant_text' },
+      { key: { id: 1 }, name: 'id', unique: true }
+    ]).catch((error) => {
+      indexesReady = null
+      throw error
+    })
+  }
+  return indexesReady
+}
+
+export async function listImages(db, { category, q, limit, after } = {}) {
+  await ensureImageIndexes(db)
+
+  const query = {}
+  if (category && category !== 'All') {
+    query.category = category
+  }
+  if (q && q.trim()) {
+    query.$text = { $search: q.trim() }
+  }
+
+  const { rows, nextCursor } = await findPage(db.collection('images'), query, {
+    field: 'uploadedAt',
+    projection: LISTING_PROJECTION,
+    limit: parseLimit(limit, { defaultSize: DEFAULT_PAGE_SIZE, maxSize: MAX_PAGE_SIZE }),
+    after
+  })
+
+  return { images: rows, nextCursor }
+}
+
+// Library entry for an image hosted elsewhere (JSON upload with a URL)
+export async function createLinkedImage(db, body) {
+  await ensureImageIndexes(db)
+  const image = {
+    id: uuidv4(),
+    filename: body.filename || 'uploaded-image.jpg',
+    url: body.url || 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=800&h=600&fit=crop',
+    thumbnail: body.thumbnail || 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=200&h=200&fit=crop',
+    category: body.category || 'Uncategorized',
+    tags: parseTags(body.tags),
+    uploadedAt: new Date(),
+    size: body.size || '0.0MB'
+  }
+  await db.collection('images').insertOne({ ...image })
+  return image
+}
+
+// Each deleted entry gives up its reference to the stored object, which goes
+// with the last entry using it. Linked images have no stored object.
+export async function deleteImages(db, ids) {
+  const deleted = (await Promise.all(ids.map(id =>
+    db.collection('images').findOneAndDelete({ id }, { projection: { _id: 0, sha256: 1 } })
+  ))).filter(Boolean)
+
+  const refs = new Map()
+  for (const { sha256 } of deleted) {
+    if (sha256) {
+      refs.set(sha256, (refs.get(sha256) || 0) + 1)
+    }
+  }
+  await Promise.all([...refs].map(([sha256, count]) => releaseObject(db, sha256, count)))
+  return deleted.length
+}
@@ -0,0 +1,311 @@
+import { randomUUID } from 'crypto'
+import { dayKey, recordEngagementBatch } from './analytics.js'
+import { invalidate } from './cache.js'
+import { httpError } from './errors.js'
+import { emitEvent } from './events.js'
+import { findPostTenants } from './posts.js'
+import { engagementEvent, issueMessage } from './schemas.js'
+import { forTenant } from './tenancy.js'
+
+// Buffered engagement ingestion. Events are merged in memory per
+// (post, platform, day) and written every flushMs, or sooner once flushKeys
+// distinct keys are waiting, as one bulkWrite per collection and tenant. A
+// burst of likes on one post costs a single $inc however many events it
+// spans. Events carry no session, so each is attributed to its post's tenant;
+// events for unknown posts are counted and dropped. Each flush has an id that
+// its writes record, and a failed flush is retried with backoff as the same
+// batch under the same id before anything newer, so whatever the failed
+// attempt did apply is skipped. Callers waiting on it get a 503 rather than
+// a silent loss.
+
+const DEFAULTS = {
+  flushMs: parseInt(process.env.INGEST_FLUSH_MS || '500', 10),
+  flushKeys: parseInt(process.env.INGEST_FLUSH_KEYS || '5000', 10),
+  maxKeys: parseInt(process.env.INGEST_MAX_KEYS || '20000', 10),
+  // Retries after a failed flush back off from flushMs up to this
+  maxBackoffMs: parseInt(process.env.INGEST_MAX_BACKOFF_MS || '30000', 10)
+}
+
+// The ingest endpoint takes no session, so bodies and lines are capped
+const NDJSON_LIMITS = {
+  maxBodyBytes: parseInt(process.env.INGEST_MAX_BODY_BYTES || String(64 * 1024 * 1024), 10),
+  maxLineLength: parseInt(process.env.INGEST_MAX_LINE_LENGTH || '16384', 10)
+}
+
+const COUNTERS = ['reach', 'likes', 'comments', 'shares']
+
+// Flush timings kept for the stats endpoint
+const FLUSH_SAMPLES = 500
+
+// Deltas per engagement event pushed to /api/events subscribers
+const DELTAS_PER_EVENT = 500
+
+function summarize(samples) {
+  if (samples.length === 0) {
+    return { p50: null, p95: null, max: null }
+  }
+  const sorted = [...samples].sort((a, b) => a - b)
+  const at = pct => sorted[Math.max(0, Math.ceil(pct / 100 * sorted.length) - 1)]
+  return { p50: at(50), p95: at(95), max: sorted[sorted.length - 1] }
+}
+
+export function createEngagementIngestor(getDb, overrides = {}) {
+  const options = { ...DEFAULTS, ...overrides }
+  const stats = {
+    accepted: 0,
+    flushes: 0,
+    flushErrors: 0,
+    keysWritten: 0,
+    keysRetried: 0,
+    unattributed: 0,
+    waits: 0
+  }
+  const flushTimes = []
+
+  let buffer = new Map()
+  let flushing = null
+  let timer = null
+  // { id, deltas } of a failed flush, written again before the buffer
+  let retry = null
+  // Consecutive failed flushes, which set the retry backoff
+  let failures = 0
+
+  // Keys leave the batch as they are written or dropped, so a retry only
+  // repeats the tenants that had not finished
+  async function write(batch) {
+    const started = Date.now()
+    const { id, deltas: pending } = batch
+    try {
+      const db = await getDb()
+      const tenants = await findPostTenants(db, [...pending.values()].map(delta => delta.postId))
+      const byTenant = new Map()
+      for (const [key, delta] of pending) {
+        const tenantId = tenants.get(delta.postId)
+        if (!tenantId) {
+          stats.unattributed++
+          pending.delete(key)
+          continue
+        }
+        if (!byTenant.has(tenantId)) {
+          byTenant.set(tenantId, [])
+        }
+        byTenant.get(tenantId).push(key)
+      }
+
+      for (const [tenantId, keys] of byTenant) {
+        const tenantDeltas = keys.map(key => pending.get(key))
+        await recordEngagementBatch(forTenant(db, tenantId), tenantDeltas, { flushId: id })
+        for (const key of keys) {
+          pending.delete(key)
+        }
+        stats.keysWritten += tenantDeltas.length
+        invalidate(tenantId, 'posts', 'analytics')
+        for (let i = 0; i < tenantDeltas.length; i += DELTAS_PER_EVENT) {
+          emitEvent(tenantId, 'engagement', { deltas: tenantDeltas.slice(i, i + DELTAS_PER_EVENT) })
+        }
+      }
+      stats.flushes++
+      failures = 0
+    } catch (error) {
+      stats.flushErrors++
+      failures++
+      console.error(`Engagement flush ${id} failed, retrying ${pending.size} keys:`, error)
+      stats.keysRetried += pending.size
+      retry = batch
+      throw httpError('Engagement events could not be stored, retry later', 503)
+    } finally {
+      flushTimes.push(Date.now() - started)
+      if (flushTimes.length > FLUSH_SAMPLES) {
+        flushTimes.shift()
+      }
+    }
+  }
+
+  // One flush at a time; the buffer is swapped out up front so new events
+  // keep merging into a fresh map while the previous one is written. A
+  // pending retry goes first. The returned promise rejects with a 503 if the
+  // write failed.
+  function flush() {
+    clearTimeout(timer)
+    timer = null
+    if (flushing) {
+      return flushing
+    }
+    let batch = retry
+    if (!batch) {
+      if (buffer.size === 0) {
+        return Promise.resolve()
+      }
+      batch = { id: randomUUID(), deltas: buffer }
+      buffer = new Map()
+    }
+    retry = null
+    flushing = write(batch).finally(() => {
+      flushing = null
+      if (failures > 0) {
+        schedule(Math.min(options.flushMs * 2 ** failures, options.maxBackoffMs))
+      } else if (buffer.size >= options.flushKeys) {
+        flushInBackground()
+      } else if (buffer.size > 0) {
+        schedule(options.flushMs)
+      }
+    })
+    return flushing
+  }
+
+  // Timed and threshold flushes have no caller to report to; write() has
+  // already counted and logged the failure and kept the batch for retry
+  function flushInBackground() {
+    flush().catch(() => {})
+  }
+
+  function schedule(delayMs) {
+    if (!timer) {
+      timer = setTimeout(flushInBackground, delayMs)
+    }
+  }
+
+  return {
+    // Merge one validated event. Returns a promise only when the buffer is
+    // full and a flush is already running: callers should await it before
+    // adding more, which pushes backpressure up to the request stream.
+    add(event) {
+      const day = dayKey(event.at || new Date())
+      const key = `${event.postId}\u0000${event.platform}\u0000${day}`
+      let delta = buffer.get(key)
+      if (!delta) {
+        delta = { postId: event.postId, platform: event.platform, day }
+        buffer.set(key, delta)
+      }
+      for (const counter of COUNTERS) {
+        if (event[counter]) {
+          delta[counter] = (delta[counter] || 0) + event[counter]
+        }
+      }
+      stats.accepted++
+
+      if (buffer.size >= options.maxKeys) {
+        // Also while backing off from a failure: the caller waits on a write
+        // attempt, and stops sending if that fails too
+        stats.waits++
+        return flushing || flush()
+      }
+      if (buffer.size >= options.flushKeys && !flushing && failures === 0) {
+        flushInBackground()
+      } else if (!flushing) {
+        schedule(options.flushMs)
+      }
+      return null
+    },
+    // Resolves once everything added so far has been written; rejects with a
+    // 503 if a flush fails on the way, leaving the events buffered for retry
+    async drain() {
+      while (flushing || retry || buffer.size > 0) {
+        await flush()
+      }
+    },
+    stats() {
+      return {
+        ...options,
+        ...stats,
+        bufferedKeys: buffer.size,
+        retryKeys: retry ? retry.deltas.size : 0,
+        flushing: Boolean(flushing),
+        failingFlushes: failures,
+        flushLatencyMs: summarize(flushTimes)
+      }
+    }
+  }
+}
+
+// Read an NDJSON body line by line, feeding valid events to the ingestor and
+// pausing the read whenever the ingestor asks for backpressure. Bodies over
+// maxBodyBytes or lines over maxLineLength characters end the read with a
+// 413; events before that point have already been accepted. A request
+// without a body is a 400.
+export async function ingestNdjson(ingestor, body, { maxErrors = 20, ...overrides } = {}) {
+  if (!body) {
+    throw httpError('Request body is empty', 400)
+  }
+  const { maxBodyBytes, maxLineLength } = { ...NDJSON_LIMITS, ...overrides }
+  const result = { accepted: 0, rejected: 0, errors: [] }
+  const decoder = new TextDecoder()
+  // Text after the last newline seen so far
+  let pending = ''
+  let received = 0
+  let lineNumber = 0
+
+  function checkLength(length) {
+    if (length > maxLineLength) {
+      throw httpError(`Line ${lineNumber + 1} exceeds ${maxLineLength} characters`, 413)
+    }
+  }
+
+  // Returns the ingestor's backpressure promise, if any, so the common
+  // path stays synchronous
+  function handle(line) {
+    lineNumber++
+    if (!line.trim()) {
+      return null
+    }
+    let parsed
+    try {
+      parsed = engagementEvent.safeParse(JSON.parse(line))
+    } catch {
+      parsed = null
+    }
+    if (!parsed?.success) {
+      result.rejected++
+      if (result.errors.length < maxErrors) {
+        const error = parsed ? issueMessage(parsed.error.issues[0]) : 'Invalid JSON'
+        result.errors.push({ line: lineNumber, error })
+      }
+      return null
+    }
+    result.accepted++
+    return ingestor.add(parsed.data)
+  }
+
+  // Only the newly decoded text is scanned for newlines, so each byte is
+  // looked at once however long the body is
+  for await (const chunk of body) {
+    received += chunk.byteLength
+    if (received > maxBodyBytes) {
+      throw httpError(`Request body exceeds ${maxBodyBytes} bytes`, 413)
+    }
+    const text = decoder.decode(chunk, { stream: true })
+    let start = 0
+    let newline = text.indexOf('\n')
+    while (newline !== -1) {
+      checkLength(pending.length + newline - start)
+      const line = pending + text.slice(start, newline)
+      pending = ''
+      const wait = handle(line)
+      if (wait) {
+        await wait
+      }
+      start = newline + 1
+      newline = text.indexOf('\n', start)
+    }
+    checkLength(pending.length + text.length - start)
+    pending += text.slice(start)
+  }
+  pending += decoder.decode()
+  await handle(pending)
+
+  return result
+}
+
+let shared = null
+
+// The process-wide ingestor used by the API routes
+export function getEngagementIngestor(getDb) {
+  if (!shared) {
+    shared = createEngagementIngestor(getDb)
+  }
+  return shared
+}
+
+export function getIngestStats() {
+  return shared ? shared.stats() : null
+}
@@ -0,0 +1,78 @@
+import { v4 as uuidv4 } from 'uuid'
+
+// Storage for the durable `jobs` queue that the scheduler's dispatchers work
+// through. It holds two kinds of job: one per scheduled post, and one per
+// platform delivery deferred by an open circuit breaker. Both are written by
+// upsert on (postId, platform), so re-enqueueing moves the existing job rather
+// than adding another. Post jobs have no platform.
+
+export const JOB_STATUS = {
+  pending: 'pending',
+  leased: 'leased',
+  done: 'done',
+  failed: 'failed'
+}
+
+export const JOB_TYPES = {
+  publishPost: 'publish_post',
+  deliverPlatform: 'deliver_platform'
+}
+
+let indexesReady = null
+
+async function dropLegacyIndex(jobs) {
+  try {
+    // Unique on postId alone, which left no room for delivery jobs
+    await jobs.dropIndex('postId')
+  } catch (error) {
+    // 27: IndexNotFound, 26: NamespaceNotFound
+    if (![26, 27].includes(error.code)) {
+      throw error
+    }
+  }
+}
+
+export function ensureJobIndexes(db) {
+  if (!indexesReady) {
+    const jobs = db.collection('jobs')
+    indexesReady = dropLegacyIndex(jobs).then(() => jobs.createIndexes([
+      { key: { status: 1, dueAt: 1 }, name: 'status_dueAt' },
+      { key: { status: 1, leaseUntil: 1 }, name: 'status_leaseUntil' },
+      { key: { postId: 1, platform: 1 }, name: 'postId_platform', unique: true }
+    ])).catch((error) => {
+      indexesReady = null
+      throw error
+    })
+  }
+  return indexesReady
+}
+
+// Update for an upsert that (re)arms a job: fields that make it runnable again
+// are always set, identity fields only on insert
+export function enqueueUpdate({ type, tenantId, postId, platform, dueAt, ...fields }, now = new Date()) {
+  return {
+    $set: {
+      ...fields,
+      dueAt,
+      status: JOB_STATUS.pending,
+      attempts: 0,
+      leaseOwner: null,
+      leaseUntil: null,
+      lastError: null,
+      updatedAt: now
+    },
+    $unset: { completedAt: '', lagMs: '' },
+    $setOnInsert: { _id: uuidv4(), type, tenantId, postId, ...(platform && { platform }), createdAt: now }
+  }
+}
+
+// Queue another attempt at one platform's delivery of a post. `db` is the
+// post's tenant handle (forTenant).
+export async function enqueueDelivery(db, postId, platform, { account, deferrals, dueAt }) {
+  await ensureJobIndexes(db)
+  await db.collection('jobs').updateOne(
+    { postId, platform },
+    enqueueUpdate({ type: JOB_TYPES.deliverPlatform, tenantId: db.tenantId, postId, platform, account, deferrals, dueAt }),
+    { upsert: true }
+  )
+}
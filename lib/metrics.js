@@ -0,0 +1,285 @@
+import { AsyncLocalStorage } from 'async_hooks'
+import { performance } from 'perf_hooks'
+
+// Request instrumentation. withMetrics() wraps a route handler so every
+// request records total time, time spent in MongoDB and response size into
+// per-route, per-method histograms, and answers with a Server-Timing header.
+// Database time is collected through instrumentDb(), which getDb() applies
+// while a request is being handled.
+
+const DURATION_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+const SIZE_BUCKETS_BYTES = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+// Route labels beyond this many distinct values are folded into "other"
+const MAX_ROUTES = 200
+
+// Path segments that are ids rather than route names
+const ID_SEGMENT = /^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{16,}|\d+)$/i
+
+const COLLECTION_METHODS = new Set([
+  'aggregate', 'bulkWrite', 'countDocuments', 'createIndexes', 'deleteMany', 'deleteOne',
+  'distinct', 'estimatedDocumentCount', 'findOne', 'findOneAndDelete', 'findOneAndReplace',
+  'findOneAndUpdate', 'insertMany', 'insertOne', 'replaceOne', 'updateMany', 'updateOne'
+])
+const CURSOR_METHODS = new Set(['toArray', 'next', 'hasNext', 'forEach'])
+
+const requestTiming = new AsyncLocalStorage()
+const routes = new Map()
+
+function createHistogram(buckets) {
+  return { buckets, counts: new Array(buckets.length + 1).fill(0), sum: 0, count: 0 }
+}
+
+function observe(histogram, value) {
+  histogram.sum += value
+  histogram.count++
+  const index = histogram.buckets.findIndex(bound => value <= bound)
+  histogram.counts[index === -1 ? histogram.buckets.length : index]++
+}
+
+export function routeLabel(path = []) {
+  if (path.length === 0) {
+    return '/'
+  }
+  return path.map(segment => ID_SEGMENT.test(segment) ? ':id' : segment).join('/')
+}
+
+function routeMetrics(route, method) {
+  let key = `${route} ${method}`
+  if (!routes.has(key) && routes.size >= MAX_ROUTES) {
+    key = `other ${method}`
+  }
+  let metrics = routes.get(key)
+  if (!metrics) {
+    metrics = {
+      route: key.slice(0, key.lastIndexOf(' ')),
+      method,
+      statuses: new Map(),
+      duration: createHistogram(DURATION_BUCKETS_MS),
+      db: createHistogram(DURATION_BUCKETS_MS),
+      size: createHistogram(SIZE_BUCKETS_BYTES)
+    }
+    routes.set(key, metrics)
+  }
+  return metrics
+}
+
+// Label the current request's metrics with a route pattern such as 'posts/:id'
+export function setRouteName(name) {
+  const timing = requestTiming.getStore()
+  if (timing) {
+    timing.route = name
+  }
+}
+
+// The route pattern the router matched for the current request, if any
+export function getRouteName() {
+  return requestTiming.getStore()?.route || null
+}
+
+// Add `ms` to a named phase of the current request, if there is one
+export function addTiming(name, ms) {
+  const timing = requestTiming.getStore()
+  if (timing) {
+    timing.spans[name] = (timing.spans[name] || 0) + ms
+  }
+}
+
+async function timedDb(run) {
+  const started = performance.now()
+  try {
+    return await run()
+  } finally {
+    addTiming('db', performance.now() - started)
+  }
+}
+
+function instrumentCursor(cursor) {
+  const proxy = new Proxy(cursor, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop)
+      if (typeof value !== 'function') {
+        return value
+      }
+      if (CURSOR_METHODS.has(prop)) {
+        return (...args) => timedDb(() => value.apply(target, args))
+      }
+      // Builder methods (sort, limit, project, ...) return the cursor itself
+      return (...args) => {
+        const result = value.apply(target, args)
+        return result === target ? proxy : result
+      }
+    }
+  })
+  return proxy
+}
+
+function instrumentCollection(collection) {
+  return new Proxy(collection, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop)
+      if (typeof value !== 'function') {
+        return value
+      }
+      if (prop === 'find' || prop === 'aggregate') {
+        return (...args) => instrumentCursor(value.apply(target, args))
+      }
+      if (COLLECTION_METHODS.has(prop)) {
+        return (...args) => timedDb(() => value.apply(target, args))
+      }
+      return value.bind(target)
+    }
+  })
+}
+
+// Time every collection operation issued through this handle. Concurrent
+// operations each count in full, so db time is summed, not wall-clock.
+export function instrumentDb(db) {
+  if (!requestTiming.getStore()) {
+    return db
+  }
+  return new Proxy(db, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop)
+      if (prop === 'collection') {
+        return (...args) => instrumentCollection(value.apply(target, args))
+      }
+      if (prop === 'command') {
+        return (...args) => timedDb(() => value.apply(target, args))
+      }
+      return typeof value === 'function' ? value.bind(target) : value
+    }
+  })
+}
+
+function serverTiming(spans, total) {
+  const parts = Object.entries(spans).map(([name, ms]) => `${name};dur=${ms.toFixed(1)}`)
+  const accounted = Object.values(spans).reduce((sum, ms) => sum + ms, 0)
+  parts.push(`app;dur=${Math.max(0, total - accounted).toFixed(1)}`)
+  parts.push(`total;dur=${total.toFixed(1)}`)
+  return parts.join(', ')
+}
+
+// Count response bytes as they stream out when the length is not known
+function countBody(response, onDone) {
+  let bytes = 0
+  const counter = new TransformStream({
+    transform(chunk, controller) {
+      bytes += chunk.byteLength
+      controller.enqueue(chunk)
+    },
+    flush() {
+      onDone(bytes)
+    }
+  })
+  return new Response(response.body.pipeThrough(counter), {
+    status: response.status,
+    statusText: response.statusText,
+    headers: response.headers
+  })
+}
+
+export function withMetrics(method, handler) {
+  return async function instrumented(request, context) {
+    const timing = { spans: {}, route: null }
+    const started = performance.now()
+    // The router names the matched route; otherwise ids are folded out of the path
+    const metricsFor = () => routeMetrics(timing.route || routeLabel(context?.params?.path), method)
+
+    let response
+    try {
+      response = await requestTiming.run(timing, () => handler(request, context))
+    } catch (error) {
+      const metrics = metricsFor()
+      metrics.statuses.set(500, (metrics.statuses.get(500) || 0) + 1)
+      throw error
+    }
+
+    const total = performance.now() - started
+    const metrics = metricsFor()
+    observe(metrics.duration, total)
+    observe(metrics.db, timing.spans.db || 0)
+    metrics.statuses.set(response.status, (metrics.statuses.get(response.status) || 0) + 1)
+
+    try {
+      response.headers.set('Server-Timing', serverTiming(timing.spans, total))
+    } catch {
+      // Immutable headers (a proxied fetch response); skip the header
+    }
+
+    const length = response.headers.get('content-length')
+    if (length !== null || !response.body) {
+      observe(metrics.size, parseInt(length || '0', 10))
+      return response
+    }
+    return countBody(response, bytes => observe(metrics.size, bytes))
+  }
+}
+
+function labelString(labels) {
+  const entries = Object.entries(labels)
+  if (entries.length === 0) {
+    return ''
+  }
+  const escape = value => String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')
+  return `{${entries.map(([key, value]) => `${key}="${escape(value)}"`).join(',')}}`
+}
+
+function snakeCase(name) {
+  return name.replace(/([a-z0-9])([A-Z])/g, '$1_$2').toLowerCase()
+}
+
+function renderHistogram(lines, name, help, scale, pick) {
+  lines.push(`# HELP ${name} ${help}`, `# TYPE ${name} histogram`)
+  for (const metrics of routes.values()) {
+    const histogram = pick(metrics)
+    const labels = { route: metrics.route, method: metrics.method }
+    let cumulative = 0
+    histogram.buckets.forEach((bound, i) => {
+      cumulative += histogram.counts[i]
+      lines.push(`${name}_bucket${labelString({ ...labels, le: bound / scale })} ${cumulative}`)
+    })
+    lines.push(`${name}_bucket${labelString({ ...labels, le: '+Inf' })} ${histogram.count}`)
+    lines.push(`${name}_sum${labelString(labels)} ${histogram.sum / scale}`)
+    lines.push(`${name}_count${labelString(labels)} ${histogram.count}`)
+  }
+}
+
+// Prometheus text exposition of the request histograms plus the numeric
+// fields of each stats group: [{ subsystem, stats, counters, labels }].
+// Fields listed in `counters` are exported as counters, the rest as gauges.
+export function renderMetrics(groups = []) {
+  const lines = []
+
+  lines.push('# HELP socialflow_http_requests_total Requests handled, by route, method and status', '# TYPE socialflow_http_requests_total counter')
+  for (const metrics of routes.values()) {
+    for (const [status, count] of metrics.statuses) {
+      lines.push(`socialflow_http_requests_total${labelString({ route: metrics.route, method: metrics.method, status })} ${count}`)
+    }
+  }
+  renderHistogram(lines, 'socialflow_http_request_duration_seconds', 'Total handler time', 1000, m => m.duration)
+  renderHistogram(lines, 'socialflow_http_db_duration_seconds', 'Summed MongoDB operation time per request', 1000, m => m.db)
+  renderHistogram(lines, 'socialflow_http_response_size_bytes', 'Response body size', 1, m => m.size)
+
+  // Samples are grouped by name first: a family must be contiguous
+  const families = new Map()
+  for (const { subsystem, stats, counters = [], labels = {} } of groups) {
+    for (const [field, raw] of Object.entries(stats || {})) {
+      const value = typeof raw === 'boolean' ? Number(raw) : raw
+      if (typeof value !== 'number' || !Number.isFinite(value)) {
+        continue
+      }
+      const counter = counters.includes(field)
+      const name = `socialflow_${subsystem}_${snakeCase(field)}${counter ? '_total' : ''}`
+      if (!families.has(name)) {
+        families.set(name, { type: counter ? 'counter' : 'gauge', samples: [] })
+      }
+      families.get(name).samples.push(`${name}${labelString(labels)} ${value}`)
+    }
+  }
+  for (const [name, { type, samples }] of families) {
+    lines.push(`# TYPE ${name} ${type}`, ...samples)
+  }
+
+  return `${lines.join('\n')}\n`
+}
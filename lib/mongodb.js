@@ -0,0 +1,110 @@
+import { MongoClient } from 'mongodb'
+import { performance } from 'perf_hooks'
+import { addTiming, instrumentDb } from './metrics.js'
+import { guardTenants } from './tenancy.js'
+
+const DB_NAME = process.env.DB_NAME || 'socialflow_pro'
+
+const POOL_OPTIONS = {
+  maxPoolSize: parseInt(process.env.MONGO_MAX_POOL_SIZE || '20', 10),
+  minPoolSize: parseInt(process.env.MONGO_MIN_POOL_SIZE || '2', 10),
+  maxIdleTimeMS: parseInt(process.env.MONGO_MAX_IDLE_MS || '60000', 10),
+  serverSelectionTimeoutMS: parseInt(process.env.MONGO_SERVER_SELECTION_TIMEOUT_MS || '5000', 10)
+}
+
+// Cache the client on globalThis so dev hot-reloads and repeated module
+// evaluation in serverless runtimes reuse one pool instead of leaking clients.
+const globalForMongo = globalThis
+
+if (!globalForMongo._socialflowMongo) {
+  globalForMongo._socialflowMongo = {
+    client: null,
+    connecting: null,
+    stats: {
+      clientsCreated: 0,
+      connectionsCreated: 0,
+      connectionsClosed: 0,
+      checkouts: 0,
+      checkoutFailures: 0
+    }
+  }
+}
+
+const state = globalForMongo._socialflowMongo
+
+function createClient() {
+  const client = new MongoClient(process.env.MONGO_URL, POOL_OPTIONS)
+  const { stats } = state
+
+  client.on('connectionCreated', () => { stats.connectionsCreated++ })
+  client.on('connectionClosed', () => { stats.connectionsClosed++ })
+  client.on('connectionCheckedOut', () => { stats.checkouts++ })
+  client.on('connectionCheckOutFailed', () => { stats.checkoutFailures++ })
+
+  stats.clientsCreated++
+  return client
+}
+
+export async function getClient() {
+  if (state.client) {
+    return state.client
+  }
+
+  if (!state.connecting) {
+    const client = createClient()
+    state.connecting = client.connect()
+      .then(() => {
+        state.client = client
+        return client
+      })
+      .catch((error) => {
+        console.error('Database connection error:', error)
+        state.connecting = null
+        throw error
+      })
+  }
+
+  return state.connecting
+}
+
+// Inside an instrumented request the handle also records connect and query
+// time. Tenant collections are reached through forTenant() (lib/tenancy.js).
+export async function getDb() {
+  if (state.client) {
+    return guardTenants(instrumentDb(state.client.db(DB_NAME)))
+  }
+  const started = performance.now()
+  const client = await getClient()
+  addTiming('connect', performance.now() - started)
+  return guardTenants(instrumentDb(client.db(DB_NAME)))
+}
+
+export async function pingDB() {
+  const started = Date.now()
+  try {
+    const db = await getDb()
+    await db.command({ ping: 1 })
+    return { ok: true, latencyMs: Date.now() - started }
+  } catch (error) {
+    return { ok: false, latencyMs: Date.now() - started, error: error.message }
+  }
+}
+
+export function getPoolStats() {
+  const { stats } = state
+  return {
+    ...stats,
+    openConnections: stats.connectionsCreated - stats.connectionsClosed,
+    maxPoolSize: POOL_OPTIONS.maxPoolSize,
+    minPoolSize: POOL_OPTIONS.minPoolSize,
+    connected: Boolean(state.client)
+  }
+}
+
+export function warmUp() {
+  if (!process.env.MONGO_URL) {
+    return Promise.resolve(null)
+  }
+  // Start the handshake and fill minPoolSize before the first request needs it
+  return getClient().catch(() => null)
+}
@@ -0,0 +1,204 @@
+import { v4 as uuidv4 } from 'uuid'
+import { findPage, parseLimit } from './cursor.js'
+import { httpError } from './errors.js'
+import { pendingDelivery } from './publisher.js'
+import { MAX_BATCH_SIZE, postInput } from './schemas.js'
+import { allTenants } from './tenancy.js'
+
+export const POST_STATUSES = ['published', 'scheduled', 'failed', 'paused']
+
+export const DEFAULT_PAGE_SIZE = 20
+export const MAX_PAGE_SIZE = 100
+
+// Fields a client may ask for with ?fields=. id and scheduledAt are always
+// returned because the cursor is built from them.
+const PROJECTABLE_FIELDS = [
+  'content',
+  'platforms',
+  'status',
+  'publishedAt',
+  'images',
+  'createdAt',
+  'engagement',
+  'delivery'
+]
+
+let indexesReady = null
+
+// `db` is a tenant handle (forTenant); the indexes are per tenant
+export function ensurePostIndexes(db) {
+  if (!indexesReady) {
+    indexesReady = db.collection('posts').createIndexes([
+      { key: { tenantId: 1, status: 1, scheduledAt: -1, id: -1 }, name: 'tenant_status_scheduledAt' },
+      { key: { tenantId: 1, scheduledAt: -1, id: -1 }, name: 'tenant_scheduledAt' },
+      { key: { id: 1 }, name: 'id', unique: true }
+    ]).catch((error) => {
+      indexesReady = null
+      throw error
+    })
+  }
+  return indexesReady
+}
+
+export function parseFields(fields) {
+  const projection = { _id: 0, id: 1, scheduledAt: 1 }
+  const requested = fields
+    ? fields.split(',').map(field => field.trim()).filter(Boolean)
+    : PROJECTABLE_FIELDS
+
+  for (const field of requested) {
+    if (PROJECTABLE_FIELDS.includes(field)) {
+      projection[field] = 1
+    }
+  }
+  return projection
+}
+
+// Keyset pagination over (scheduledAt desc, id desc): each page is a single
+// index range scan no matter how deep into the list the client is.
+export async function listPosts(db, { status = 'all', limit, after, fields } = {}) {
+  await ensurePostIndexes(db)
+
+  const query = {}
+
+  if (status !== 'all') {
+    query.status = status
+  }
+
+  const { rows, nextCursor } = await findPage(db.collection('posts'), query, {
+    field: 'scheduledAt',
+    projection: parseFields(fields),
+    limit: parseLimit(limit, { defaultSize: DEFAULT_PAGE_SIZE, maxSize: MAX_PAGE_SIZE }),
+    after
+  })
+
+  return { posts: rows, nextCursor }
+}
+
+// The tenant of each post, for events that arrive without a session
+// (platform webhooks). A cross-tenant lookup on the unique id index.
+export async function findPostTenants(db, postIds) {
+  const rows = await allTenants(db).collection('posts')
+    .find({ id: { $in: [...new Set(postIds)] } }, { projection: { _id: 0, id: 1, tenantId: 1 } })
+    .toArray()
+  return new Map(rows.map(row => [row.id, row.tenantId]))
+}
+
+// { post } with the fields postInput allows, or { error } describing the
+// first problem in the form the router uses for rejected bodies
+function parsePostInput(body) {
+  const result = postInput.safeParse(body)
+  if (result.success) {
+    return { post: result.data }
+  }
+  const [{ path, message }] = result.error.issues
+  return { error: path.length > 0 ? `${path.join('.')}: ${message}` : message }
+}
+
+export function buildPost(body) {
+  const now = new Date()
+  const publishNow = body.action === 'publish'
+  const scheduledAt = body.scheduledAt ? new Date(body.scheduledAt) : now
+
+  if (Number.isNaN(scheduledAt.getTime())) {
+    throw httpError('Invalid scheduledAt', 400)
+  }
+
+  return {
+    id: uuidv4(),
+    content: body.content,
+    platforms: body.platforms || [],
+    status: publishNow ? 'published' : 'scheduled',
+    scheduledAt,
+    publishedAt: publishNow ? now : null,
+    images: body.images || [],
+    // Filled in per platform by the publisher once the post goes out
+    delivery: publishNow ? pendingDelivery(body.platforms) : {},
+    createdAt: now,
+    engagement: { likes: 0, comments: 0, shares: 0 }
+  }
+}
+
+export async function createPost(db, body) {
+  const input = parsePostInput(body)
+  if (input.error) {
+    throw httpError(input.error, 400)
+  }
+
+  await ensurePostIndexes(db)
+  const post = buildPost(input.post)
+  // insertOne adds _id to the document it is given; keep the response clean
+  await db.collection('posts').insertOne({ ...post })
+  return post
+}
+
+// Parse a batch body: a JSON array, { posts: [...] }, or NDJSON (one post per line)
+export function parseBatchBody(text, contentType = '') {
+  if (contentType.includes('ndjson')) {
+    return text.split('\n')
+      .map(line => line.trim())
+      .filter(Boolean)
+      .map((line) => {
+        try {
+          return JSON.parse(line)
+        } catch {
+          return { __parseError: 'Invalid JSON line' }
+        }
+      })
+  }
+
+  const parsed = JSON.parse(text)
+  return Array.isArray(parsed) ? parsed : parsed?.posts
+}
+
+// Validate every item up front, insert the valid ones with one unordered
+// insertMany and report a result per input index.
+export async function createPosts(db, items) {
+  if (!Array.isArray(items) || items.length === 0) {
+    throw httpError('Batch must contain at least one post', 400)
+  }
+  if (items.length > MAX_BATCH_SIZE) {
+    throw httpError(`Batch is limited to ${MAX_BATCH_SIZE} posts`, 413)
+  }
+
+  const results = new Array(items.length)
+  const posts = []
+  const indexes = []
+
+  items.forEach((item, index) => {
+    const input = item?.__parseError ? { error: item.__parseError } : parsePostInput(item)
+    if (input.error) {
+      results[index] = { index, success: false, error: input.error }
+      return
+    }
+    const post = buildPost(input.post)
+    posts.push(post)
+    indexes.push(index)
+    results[index] = { index, success: true, id: post.id, status: post.status }
+  })
+
+  const created = []
+  if (posts.length > 0) {
+    await ensurePostIndexes(db)
+    const failed = new Set()
+    try {
+      await db.collection('posts').insertMany(posts.map(post => ({ ...post })), { ordered: false })
+    } catch (error) {
+      if (!error.writeErrors) {
+        throw error
+      }
+      for (const writeError of [].concat(error.writeErrors)) {
+        const index = indexes[writeError.index]
+        failed.add(writeError.index)
+        results[index] = { index, success: false, error: writeError.errmsg || 'Insert failed' }
+      }
+    }
+    posts.forEach((post, i) => {
+      if (!failed.has(i)) {
+        created.push(post)
+      }
+    })
+  }
+
+  return { results, created }
+}
@@ -0,0 +1,51 @@
+// Business profile, one document per tenant. `db` is a tenant handle
+// (forTenant), so the tenant key is the whole lookup.
+
+const PROJECTION = { _id: 0, tenantId: 0 }
+
+let indexesReady = null
+
+export function ensureProfileIndexes(db) {
+  if (!indexesReady) {
+    indexesReady = db.collection('profiles').createIndexes([
+      { key: { tenantId: 1 }, name: 'tenant', unique: true }
+    ]).catch((error) => {
+      indexesReady = null
+      throw error
+    })
+  }
+  return indexesReady
+}
+
+// What a business sees before it has saved anything
+function emptyProfile() {
+  return {
+    businessName: '',
+    businessType: '',
+    address: '',
+    phone: '',
+    email: '',
+    connectedAccounts: {
+      instagram: { connected: false, username: null },
+      facebook: { connected: false, username: null },
+      googleBusiness: { connected: false, username: null }
+    }
+  }
+}
+
+export async function getProfile(db) {
+  const profile = await db.collection('profiles').findOne({}, { projection: PROJECTION })
+  return { ...emptyProfile(), ...profile, id: db.tenantId }
+}
+
+// Fields not sent are kept; the profile id is always the tenant's
+export async function saveProfile(db, fields) {
+  const { id, _id, tenantId, ...changes } = fields
+  await ensureProfileIndexes(db)
+  const profile = await db.collection('profiles').findOneAndUpdate(
+    {},
+    { $set: { ...changes, updatedAt: new Date().toISOString() } },
+    { upsert: true, returnDocument: 'after', projection: PROJECTION }
+  )
+  return { ...emptyProfile(), ...profile, id: db.tenantId }
+}
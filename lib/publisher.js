@@ -0,0 +1,287 @@
+import { PLATFORMS } from './analytics.js'
+import { invalidate } from './cache.js'
+import { emitEvent } from './events.js'
+import { enqueueDelivery } from './jobs.js'
+import { createCircuitBreaker, createTokenBucket } from './ratelimit.js'
+
+// Publish fan-out. A post going live is sent to every target platform at
+// once; each platform call waits for a token from the platform-wide bucket and
+// the per-account bucket, passes that platform's circuit breaker, and records
+// its own outcome under `delivery.<platform>` on the post.
+//
+// Platforms are reached through adapters: { publish(post, { account }) }
+// resolving to { externalId }. Errors may set `retryable` (default true),
+// `retryAfterMs`, and `tripsBreaker` (default true) to steer the retry loop.
+//
+// A platform whose breaker is open is not failed: its delivery is recorded as
+// 'deferred' with a retryAt and sent again once the cooldown ends, up to
+// maxDeferrals times. Each retry is a job in the scheduler's queue due at
+// retryAt, so it survives a restart; a dispatcher must be running to send it.
+
+const ACCOUNT_BUCKET_SWEEP_SIZE = 10000
+
+function envInt(name, fallback) {
+  return parseInt(process.env[name] || String(fallback), 10)
+}
+
+const DEFAULTS = {
+  platformRps: envInt('PUBLISH_PLATFORM_RPS', 50),
+  accountRps: envInt('PUBLISH_ACCOUNT_RPS', 10),
+  maxAttempts: envInt('PUBLISH_MAX_ATTEMPTS', 3),
+  timeoutMs: envInt('PUBLISH_TIMEOUT_MS', 10000),
+  breakerThreshold: envInt('PUBLISH_BREAKER_THRESHOLD', 5),
+  breakerCooldownMs: envInt('PUBLISH_BREAKER_COOLDOWN_MS', 30000),
+  backoffBaseMs: envInt('PUBLISH_BACKOFF_BASE_MS', 500),
+  backoffMaxMs: envInt('PUBLISH_BACKOFF_MAX_MS', 10000),
+  maxDeferrals: envInt('PUBLISH_MAX_DEFERRALS', 10)
+}
+
+// Per-platform overrides: PUBLISH_INSTAGRAM_RPS, PUBLISH_GOOGLE_BUSINESS_ACCOUNT_RPS, ...
+function platformLimit(platform, scope) {
+  const prefix = `PUBLISH_${platform.replace(/([a-z])([A-Z])/g, '$1_$2').replace(/\W/g, '_').toUpperCase()}`
+  return scope === 'account'
+    ? envInt(`${prefix}_ACCOUNT_RPS`, DEFAULTS.accountRps)
+    : envInt(`${prefix}_RPS`, DEFAULTS.platformRps)
+}
+
+const adapters = new Map()
+const platformBuckets = new Map()
+const accountBuckets = new Map()
+const breakers = new Map()
+const counters = new Map()
+
+export function registerAdapter(platform, adapter) {
+  adapters.set(platform, adapter)
+}
+
+export function deliveryError(message, { retryable = true, retryAfterMs, tripsBreaker = true } = {}) {
+  const error = new Error(message)
+  error.retryable = retryable
+  error.retryAfterMs = retryAfterMs
+  error.tripsBreaker = tripsBreaker
+  return error
+}
+
+// Generic adapter for a platform API (or the stub platform server used in
+// tests) that accepts POST <baseUrl>/<platform>/posts and returns { id }.
+export function createHttpAdapter(platform, baseUrl, { timeoutMs = DEFAULTS.timeoutMs } = {}) {
+  const url = `${baseUrl.replace(/\/$/, '')}/${platform}/posts`
+
+  return {
+    kind: 'http',
+    async publish(post, { account }) {
+      let response
+      try {
+        response = await fetch(url, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ postId: post.id, account, content: post.content, images: post.images || [] }),
+          signal: AbortSignal.timeout(timeoutMs)
+        })
+      } catch (error) {
+        throw deliveryError(`${platform} unreachable: ${error.message}`)
+      }
+
+      if (response.status === 429) {
+        const retryAfter = parseInt(response.headers.get('retry-after') || '', 10)
+        throw deliveryError(`${platform} rate limited the request`, {
+          retryAfterMs: Number.isFinite(retryAfter) ? retryAfter * 1000 : undefined,
+          tripsBreaker: false
+        })
+      }
+      if (!response.ok) {
+        const serverError = response.status >= 500
+        throw deliveryError(`${platform} responded ${response.status}`, {
+          retryable: serverError,
+          tripsBreaker: serverError
+        })
+      }
+
+      const data = await response.json().catch(() => ({}))
+      return { externalId: data.id ?? null }
+    }
+  }
+}
+
+// PUBLISH_ADAPTER_URL points every platform without a registered adapter at
+// one HTTP endpoint, which is how the stub platform server is wired in.
+function adapterFor(platform) {
+  if (!adapters.has(platform) && process.env.PUBLISH_ADAPTER_URL) {
+    adapters.set(platform, createHttpAdapter(platform, process.env.PUBLISH_ADAPTER_URL))
+  }
+  return adapters.get(platform)
+}
+
+function memo(map, key, create) {
+  let value = map.get(key)
+  if (!value) {
+    value = create()
+    map.set(key, value)
+  }
+  return value
+}
+
+function platformBucket(platform) {
+  return memo(platformBuckets, platform, () => createTokenBucket({ rate: platformLimit(platform, 'platform') }))
+}
+
+function accountBucket(platform, account) {
+  if (accountBuckets.size > ACCOUNT_BUCKET_SWEEP_SIZE) {
+    for (const [key, bucket] of accountBuckets) {
+      if (bucket.idle()) {
+        accountBuckets.delete(key)
+      }
+    }
+  }
+  return memo(accountBuckets, `${platform}:${account}`, () => createTokenBucket({ rate: platformLimit(platform, 'account') }))
+}
+
+function breakerFor(platform) {
+  return memo(breakers, platform, () => createCircuitBreaker({
+    failureThreshold: DEFAULTS.breakerThreshold,
+    cooldownMs: DEFAULTS.breakerCooldownMs
+  }))
+}
+
+function countersFor(platform) {
+  return memo(counters, platform, emptyCounters)
+}
+
+function emptyCounters() {
+  return { published: 0, failed: 0, skipped: 0, deferred: 0, retries: 0, inFlight: 0 }
+}
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms))
+
+export function pendingDelivery(platforms = []) {
+  return Object.fromEntries(platforms.map(platform => [platform, { status: 'pending' }]))
+}
+
+async function deliver(post, platform, account, options) {
+  const adapter = adapterFor(platform)
+  if (!adapter) {
+    return { status: 'skipped', attempts: 0, error: `No publisher configured for ${platform}` }
+  }
+
+  const breaker = breakerFor(platform)
+  const stats = countersFor(platform)
+  let attempts = 0
+
+  while (true) {
+    // Checked before taking tokens, so calls that are never made do not
+    // drain the buckets while the circuit is open
+    if (!breaker.allow()) {
+      // A trial call may be in flight while half-open; check back after a backoff step
+      const retryAfterMs = Math.max(breaker.retryAfterMs(), options.backoffBaseMs)
+      return { status: 'deferred', attempts, error: `Circuit open for ${platform}`, retryAfterMs }
+    }
+    await accountBucket(platform, account).take()
+    await platformBucket(platform).take()
+
+    attempts++
+    stats.inFlight++
+    let failure
+    try {
+      const { externalId } = await adapter.publish(post, { account })
+      breaker.success()
+      return { status: 'published', attempts, externalId }
+    } catch (error) {
+      failure = error
+    } finally {
+      stats.inFlight--
+    }
+
+    // Rejections the platform answered deliberately (4xx, 429) prove it is up
+    if (failure.tripsBreaker === false) {
+      breaker.success()
+    } else {
+      breaker.failure()
+    }
+    if (failure.retryable === false || attempts >= options.maxAttempts) {
+      return { status: 'failed', attempts, error: failure.message }
+    }
+    stats.retries++
+    await sleep(failure.retryAfterMs ?? Math.min(options.backoffMaxMs, options.backoffBaseMs * 2 ** (attempts - 1)))
+  }
+}
+
+// Deliver to one platform and record the outcome on the post. A deferred
+// delivery queues its own retry for when the breaker's cooldown ends; the job
+// is written before the post so a failed write never strands a 'deferred'
+// delivery with nothing left to retry it.
+async function deliverAndRecord(db, post, platform, account, options, deferrals = 0) {
+  let outcome
+  try {
+    outcome = await deliver(post, platform, account, options)
+  } catch (error) {
+    outcome = { status: 'failed', attempts: 0, error: error.message }
+  }
+
+  const { retryAfterMs, ...result } = outcome
+  let delivery
+  if (result.status === 'deferred' && deferrals < options.maxDeferrals) {
+    delivery = { ...result, deferrals: deferrals + 1, retryAt: new Date(Date.now() + retryAfterMs) }
+    await enqueueDelivery(db, post.id, platform, { account, deferrals: delivery.deferrals, dueAt: delivery.retryAt })
+  } else {
+    // Still deferred after maxDeferrals cooldowns: give up on this platform
+    delivery = { ...result, status: result.status === 'deferred' ? 'failed' : result.status, completedAt: new Date() }
+  }
+
+  countersFor(platform)[delivery.status]++
+  await db.collection('posts').updateOne({ id: post.id }, { $set: { [`delivery.${platform}`]: delivery } })
+  emitEvent(db.tenantId, 'post.delivery', { id: post.id, platform, delivery })
+  return delivery
+}
+
+// Send a post to all of its platforms concurrently and record each outcome.
+// Resolves once every platform has a final status or has been deferred;
+// never rejects for a platform failure, since those are part of the result.
+// `db` is the post's tenant handle (forTenant).
+export async function publishPost(db, post, { account = 'default', ...overrides } = {}) {
+  const options = { ...DEFAULTS, ...overrides }
+
+  const outcomes = await Promise.all((post.platforms || []).map(async platform =>
+    [platform, await deliverAndRecord(db, post, platform, account, options)]
+  ))
+
+  if (outcomes.length > 0) {
+    invalidate(db.tenantId, 'posts')
+  }
+  return Object.fromEntries(outcomes)
+}
+
+// Send a post to one platform again, for a deferred delivery's queued job.
+// `deferrals` counts the cooldowns already waited out.
+export async function redeliverPost(db, post, platform, { account = 'default', deferrals = 0, ...overrides } = {}) {
+  const options = { ...DEFAULTS, ...overrides }
+  const delivery = await deliverAndRecord(db, post, platform, account, options, deferrals)
+  invalidate(db.tenantId, 'posts')
+  return delivery
+}
+
+// Fire-and-forget form for request handlers: the response goes out right away
+// and the post's delivery map fills in as platforms answer.
+export function publishInBackground(db, posts, options) {
+  for (const post of posts) {
+    publishPost(db, post, options).catch((error) => {
+      console.error(`Publishing post ${post.id} failed:`, error)
+    })
+  }
+}
+
+export function getPublisherStats() {
+  const platforms = {}
+  for (const platform of new Set([...PLATFORMS, ...adapters.keys(), ...counters.keys()])) {
+    platforms[platform] = {
+      adapter: adapterFor(platform)?.kind || null,
+      rateLimit: {
+        platformRps: platformLimit(platform, 'platform'),
+        accountRps: platformLimit(platform, 'account')
+      },
+      bucket: platformBuckets.get(platform)?.stats() || null,
+      breaker: breakers.get(platform)?.stats() || { state: 'closed', consecutiveFailures: 0, opens: 0 },
+      ...(counters.get(platform) || emptyCounters())
+    }
+  }
+  return { accounts: accountBuckets.size, platforms }
+}
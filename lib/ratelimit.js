@@ -0,0 +1,102 @@
+// In-process flow control for calls to third-party APIs: token buckets to stay
+// under published rate limits and circuit breakers to stop hammering a
+// platform that is failing.
+
+// Refills `rate` tokens per second up to `burst`. take() resolves once a token
+// is available; waiters are served in arrival order from a single timer.
+export function createTokenBucket({ rate, burst = rate }) {
+  let tokens = burst
+  let updatedAt = Date.now()
+  let timer = null
+  const waiters = []
+
+  function refill() {
+    const now = Date.now()
+    tokens = Math.min(burst, tokens + (now - updatedAt) / 1000 * rate)
+    updatedAt = now
+  }
+
+  function drain() {
+    timer = null
+    refill()
+    while (waiters.length > 0 && tokens >= 1) {
+      tokens -= 1
+      waiters.shift()()
+    }
+    if (waiters.length > 0) {
+      timer = setTimeout(drain, Math.ceil((1 - tokens) / rate * 1000))
+    }
+  }
+
+  return {
+    take() {
+      return new Promise((resolve) => {
+        waiters.push(resolve)
+        if (!timer) {
+          drain()
+        }
+      })
+    },
+    // A full bucket with nobody waiting holds no state worth keeping
+    idle() {
+      refill()
+      return waiters.length === 0 && tokens >= burst
+    },
+    stats() {
+      refill()
+      return { rate, burst, tokens: Math.floor(tokens), waiting: waiters.length }
+    }
+  }
+}
+
+// closed -> open after `failureThreshold` consecutive failures; after
+// `cooldownMs` one trial call is let through (half-open) and its result
+// decides whether the circuit closes again or reopens.
+export function createCircuitBreaker({ failureThreshold, cooldownMs }) {
+  let state = 'closed'
+  let failures = 0
+  let openedAt = 0
+  let trialInFlight = false
+  let opens = 0
+
+  function open() {
+    state = 'open'
+    openedAt = Date.now()
+    trialInFlight = false
+    opens++
+  }
+
+  return {
+    allow() {
+      if (state === 'open' && Date.now() - openedAt >= cooldownMs) {
+        state = 'half-open'
+      }
+      if (state === 'closed') {
+        return true
+      }
+      if (state === 'half-open' && !trialInFlight) {
+        trialInFlight = true
+        return true
+      }
+      return false
+    },
+    // How long until allow() may let a call through again
+    retryAfterMs() {
+      return state === 'open' ? Math.max(0, openedAt + cooldownMs - Date.now()) : 0
+    },
+    success() {
+      state = 'closed'
+      failures = 0
+      trialInFlight = false
+    },
+    failure() {
+      failures++
+      if (state === 'half-open' || (state === 'closed' && failures >= failureThreshold)) {
+        open()
+      }
+    },
+    stats() {
+      return { state, consecutiveFailures: failures, opens }
+    }
+  }
+}
@@ -0,0 +1,215 @@
+import { captureBody } from './capture.js'
+import { httpError } from './errors.js'
+import { setRouteName } from './metrics.js'
+import { issueMessage } from './schemas.js'
+
+// Table-driven dispatch for the catch-all API route. The table is compiled
+// once: static paths go into a map per method, paths with :params into a
+// segment trie, and each route's middleware is composed into one function.
+// Bodies are read against a byte limit and validated with the route's zod
+// schema before the handler runs, so malformed requests never reach MongoDB.
+//
+// A route is { method, path, handler, middleware, body, maxBodyBytes, accepts }:
+//   path        'posts/:id' style; '' is the API root
+//   handler     ctx => Response | payload, where payloads are sent as JSON
+//   middleware  [(ctx, next) => ...], outermost first
+//   body        a zod schema (parsed JSON), 'text', or omitted to leave the
+//               request body untouched for streaming handlers
+//   accepts     request => boolean, to pick between routes on one path
+
+const DEFAULT_MAX_BODY_BYTES = parseInt(process.env.API_MAX_BODY_BYTES || String(1024 * 1024), 10)
+
+// Issues reported back to the client for a rejected body
+const MAX_REPORTED_ISSUES = 20
+
+function errorResponse(error) {
+  if (error.status) {
+    return Response.json({ error: error.message, ...error.details }, { status: error.status })
+  }
+  console.error('API Error:', error)
+  return Response.json({
+    error: 'Internal server error',
+    message: error.message
+  }, { status: 500 })
+}
+
+function toResponse(result) {
+  return result instanceof Response ? result : Response.json(result)
+}
+
+// Read the body as text, refusing it as soon as it passes `maxBytes`
+export async function readBody(request, maxBytes) {
+  const declared = parseInt(request.headers.get('content-length') || '', 10)
+  if (declared > maxBytes) {
+    throw httpError(`Request body exceeds ${maxBytes} bytes`, 413)
+  }
+  if (!request.body) {
+    return ''
+  }
+
+  const reader = request.body.getReader()
+  const decoder = new TextDecoder()
+  let received = 0
+  let text = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) {
+      break
+    }
+    received += value.byteLength
+    if (received > maxBytes) {
+      await reader.cancel()
+      throw httpError(`Request body exceeds ${maxBytes} bytes`, 413)
+    }
+    text += decoder.decode(value, { stream: true })
+  }
+  return text + decoder.decode()
+}
+
+async function parseBody(request, schema, maxBytes) {
+  const text = await readBody(request, maxBytes)
+  captureBody(text)
+  let parsed
+  try {
+    parsed = JSON.parse(text)
+  } catch {
+    throw httpError('Invalid JSON body', 400)
+  }
+  const result = schema.safeParse(parsed)
+  if (!result.success) {
+    const issues = result.error.issues.slice(0, MAX_REPORTED_ISSUES)
+    throw httpError(issueMessage(issues[0]), 400, { issues: issues.map(issueMessage) })
+  }
+  return result.data
+}
+
+function compose(route) {
+  const maxBytes = route.maxBodyBytes || DEFAULT_MAX_BODY_BYTES
+  const run = async (ctx) => {
+    if (route.body === 'text') {
+      ctx.body = await readBody(ctx.request, maxBytes)
+      captureBody(ctx.body)
+    } else if (route.body) {
+      ctx.body = await parseBody(ctx.request, route.body, maxBytes)
+    }
+    return route.handler(ctx)
+  }
+  return (route.middleware || []).reduceRight((next, middleware) => ctx => middleware(ctx, () => next(ctx)), run)
+}
+
+function createNode() {
+  return { routes: [], children: new Map(), param: null }
+}
+
+function compileRoute(route) {
+  const segments = route.path ? route.path.split('/') : []
+  return {
+    ...route,
+    segments,
+    params: segments.filter(segment => segment.startsWith(':')).map(segment => segment.slice(1)),
+    run: compose(route)
+  }
+}
+
+export function createRouter(routes) {
+  const tables = new Map()
+
+  for (const route of routes.map(compileRoute)) {
+    if (!tables.has(route.method)) {
+      tables.set(route.method, { exact: new Map(), root: createNode() })
+    }
+    const table = tables.get(route.method)
+
+    if (route.params.length === 0) {
+      if (!table.exact.has(route.path)) {
+        table.exact.set(route.path, [])
+      }
+      table.exact.get(route.path).push(route)
+      continue
+    }
+
+    let node = table.root
+    for (const segment of route.segments) {
+      if (segment.startsWith(':')) {
+        node.param = node.param || createNode()
+        node = node.param
+      } else {
+        if (!node.children.has(segment)) {
+          node.children.set(segment, createNode())
+        }
+        node = node.children.get(segment)
+      }
+    }
+    node.routes.push(route)
+  }
+
+  // Literal segments win over :params; param values are collected on the way
+  function walk(node, segments, index, values) {
+    if (index === segments.length) {
+      return node.routes.length > 0 ? { candidates: node.routes, values } : null
+    }
+    const child = node.children.get(segments[index])
+    const found = child && walk(child, segments, index + 1, values)
+    if (found) {
+      return found
+    }
+    return node.param ? walk(node.param, segments, index + 1, [...values, segments[index]]) : null
+  }
+
+  function lookup(method, segments) {
+    const table = tables.get(method)
+    if (!table) {
+      return null
+    }
+    const exact = table.exact.get(segments.join('/'))
+    return exact ? { candidates: exact, values: [] } : walk(table.root, segments, 0, [])
+  }
+
+  // The route for `method` and path segments, or null
+  function match(method, segments, request) {
+    const found = lookup(method, segments)
+    if (!found) {
+      return null
+    }
+    const route = found.candidates.find(candidate => !candidate.accepts || candidate.accepts(request))
+    if (!route) {
+      return null
+    }
+    const params = {}
+    route.params.forEach((name, i) => {
+      params[name] = found.values[i]
+    })
+    return { route, params }
+  }
+
+  function allowed(segments) {
+    return [...tables.keys()].filter(method => lookup(method, segments))
+  }
+
+  async function dispatch(method, request, segments = []) {
+    const matched = match(method, segments, request)
+    if (!matched) {
+      setRouteName('unmatched')
+      const methods = allowed(segments)
+      if (methods.length > 0) {
+        return Response.json({ error: 'Method not allowed' }, { status: 405, headers: { Allow: methods.join(', ') } })
+      }
+      return Response.json({ error: 'Endpoint not found' }, { status: 404 })
+    }
+
+    const { route, params } = matched
+    setRouteName(route.path || '/')
+    try {
+      return toResponse(await route.run({ request, params, url: new URL(request.url) }))
+    } catch (error) {
+      return errorResponse(error)
+    }
+  }
+
+  // Next.js route handler for one method
+  function handler(method) {
+    return (request, { params }) => dispatch(method, request, params?.path)
+  }
+
+  return { match, dispatch, handler }
+}
@@ -0,0 +1,310 @@
+import os from 'os'
+import { v4 as uuidv4 } from 'uuid'
+import { recordPostPublished } from './analytics.js'
+import { invalidate } from './cache.js'
+import { emitEvent } from './events.js'
+import { JOB_STATUS, JOB_TYPES, enqueueUpdate, ensureJobIndexes } from './jobs.js'
+import { publishPost, redeliverPost } from './publisher.js'
+import { forTenant } from './tenancy.js'
+
+// Durable job queue for scheduled posts. Jobs live in the `jobs` collection
+// indexed by due time; any number of dispatcher processes can poll it because
+// every claim is a single findOneAndUpdate that takes a time-limited lease.
+// The queue is shared by all tenants so jobs are claimed in due order; each
+// job records its tenant and is processed through that tenant's handle.
+// Besides scheduled posts, the queue carries platform deliveries the publisher
+// deferred while a circuit breaker was open (see jobs.js).
+
+export { JOB_STATUS, JOB_TYPES, ensureJobIndexes }
+
+const DEFAULTS = {
+  batchSize: parseInt(process.env.SCHEDULER_BATCH_SIZE || '50', 10),
+  leaseMs: parseInt(process.env.SCHEDULER_LEASE_MS || '60000', 10),
+  pollIntervalMs: parseInt(process.env.SCHEDULER_POLL_MS || '1000', 10),
+  maxAttempts: parseInt(process.env.SCHEDULER_MAX_ATTEMPTS || '5', 10),
+  backoffBaseMs: parseInt(process.env.SCHEDULER_BACKOFF_BASE_MS || '5000', 10),
+  backoffMaxMs: parseInt(process.env.SCHEDULER_BACKOFF_MAX_MS || '3600000', 10)
+}
+
+// Enqueue is idempotent per post: re-enqueueing an existing post moves its due
+// time and makes the job runnable again, so retried client requests never
+// create a second job and a rescheduled post whose job already finished or
+// failed runs once more.
+function postJobUpdate(tenantId, post, now) {
+  return enqueueUpdate({
+    type: JOB_TYPES.publishPost,
+    tenantId,
+    postId: post.id,
+    dueAt: new Date(post.scheduledAt)
+  }, now)
+}
+
+// Post jobs are the ones without a platform
+function postJobFilter(postId) {
+  return { postId, platform: null }
+}
+
+// `db` is the post's tenant handle (forTenant).
+export async function enqueuePost(db, post) {
+  await ensureJobIndexes(db)
+  await db.collection('jobs').updateOne(
+    postJobFilter(post.id),
+    postJobUpdate(db.tenantId, post),
+    { upsert: true }
+  )
+}
+
+export async function enqueuePosts(db, posts) {
+  if (posts.length === 0) {
+    return { enqueued: 0 }
+  }
+  await ensureJobIndexes(db)
+  const now = new Date()
+  const result = await db.collection('jobs').bulkWrite(
+    posts.map(post => ({
+      updateOne: {
+        filter: postJobFilter(post.id),
+        update: postJobUpdate(db.tenantId, post, now),
+        upsert: true
+      }
+    })),
+    { ordered: false }
+  )
+  return { enqueued: result.upsertedCount + result.modifiedCount }
+}
+
+// Drops the post's own job and any deferred deliveries still queued for it
+export async function cancelPostJob(db, postId) {
+  await db.collection('jobs').deleteMany({
+    tenantId: db.tenantId,
+    postId,
+    status: { $in: [JOB_STATUS.pending, JOB_STATUS.failed] }
+  })
+}
+
+// Open jobs by status; each count is an index range on status_dueAt
+export async function getQueueDepth(db) {
+  const jobs = db.collection('jobs')
+  const [pending, leased, failed] = await Promise.all(
+    [JOB_STATUS.pending, JOB_STATUS.leased, JOB_STATUS.failed].map(status => jobs.countDocuments({ status }))
+  )
+  return { pending, leased, failed }
+}
+
+export function backoffDelay(attempts, { backoffBaseMs, backoffMaxMs } = DEFAULTS) {
+  const exponential = Math.min(backoffMaxMs, backoffBaseMs * 2 ** Math.max(0, attempts - 1))
+  // Full jitter keeps retries from a burst of failures from landing together
+  return Math.round(exponential / 2 + Math.random() * exponential / 2)
+}
+
+// Claim up to batchSize due jobs. Each iteration atomically moves one job to
+// `leased` for this worker; expired leases from crashed workers are reclaimed.
+export async function claimDueJobs(db, workerId, { batchSize, leaseMs } = DEFAULTS) {
+  const jobs = db.collection('jobs')
+  const claimed = []
+
+  for (let i = 0; i < batchSize; i++) {
+    const now = new Date()
+    const job = await jobs.findOneAndUpdate(
+      {
+        $or: [
+          { status: JOB_STATUS.pending, dueAt: { $lte: now } },
+          { status: JOB_STATUS.leased, leaseUntil: { $lte: now } }
+        ]
+      },
+      {
+        $set: {
+          status: JOB_STATUS.leased,
+          leaseOwner: workerId,
+          leaseUntil: new Date(now.getTime() + leaseMs),
+          updatedAt: now
+        },
+        $inc: { attempts: 1 }
+      },
+      { sort: { dueAt: 1 }, returnDocument: 'after' }
+    )
+    if (!job) {
+      break
+    }
+    claimed.push(job)
+  }
+
+  return claimed
+}
+
+// Default job handler: flip the post from scheduled to published, then fan it
+// out to its platforms. The status guard makes the write a no-op if another
+// worker already published it. Platform failures are recorded on the post
+// rather than failing the job, so a retry never re-sends to platforms that
+// already accepted it.
+//
+// The flip and the fan-out are separate writes. If an earlier attempt flipped
+// the post and then died, the retry finds it published with platforms still
+// 'pending' and delivers to those alone.
+export async function publishScheduledPost(db, job) {
+  const tenantDb = forTenant(db, job.tenantId)
+  const posts = tenantDb.collection('posts')
+  const now = new Date()
+  const post = await posts.findOneAndUpdate(
+    { id: job.postId, status: 'scheduled' },
+    [{
+      $set: {
+        status: 'published',
+        publishedAt: now,
+        updatedAt: now,
+        // { <platform>: { status: 'pending' } } for each target platform
+        delivery: {
+          $arrayToObject: {
+            $map: { input: { $ifNull: ['$platforms', []] }, in: { k: '$$this', v: { status: 'pending' } } }
+          }
+        }
+      }
+    }],
+    { returnDocument: 'after', projection: { _id: 0, id: 1, content: 1, images: 1, platforms: 1, publishedAt: 1 } }
+  )
+  if (post) {
+    await recordPostPublished(tenantDb, post)
+    // Only reaches caches in this process; others catch up when their TTL expires
+    invalidate(job.tenantId, 'posts', 'analytics')
+    emitEvent(job.tenantId, 'post.status', { id: post.id, status: 'published', publishedAt: post.publishedAt })
+    // Jobs do not record who scheduled them, so the tenant gets its own rate
+    // limit and breakers rather than sharing the default account's
+    await publishPost(tenantDb, post, { account: job.tenantId })
+    return
+  }
+
+  const published = await posts.findOne(
+    { id: job.postId, status: 'published' },
+    { projection: { _id: 0, id: 1, content: 1, images: 1, delivery: 1 } }
+  )
+  const { delivery = {}, ...rest } = published || {}
+  const pending = Object.keys(delivery).filter(platform => delivery[platform]?.status === 'pending')
+  if (pending.length > 0) {
+    await publishPost(tenantDb, { ...rest, platforms: pending }, { account: job.tenantId })
+  }
+}
+
+// Handler for a delivery the publisher deferred: send the post to that one
+// platform again, unless the post is gone or the delivery has since settled
+export async function redeliverDeferred(db, job) {
+  const tenantDb = forTenant(db, job.tenantId)
+  const post = await tenantDb.collection('posts').findOne(
+    { id: job.postId, status: 'published' },
+    { projection: { _id: 0, id: 1, content: 1, images: 1, delivery: 1 } }
+  )
+  if (post?.delivery?.[job.platform]?.status === 'deferred') {
+    const { delivery, ...rest } = post
+    await redeliverPost(tenantDb, rest, job.platform, { account: job.account, deferrals: job.deferrals })
+  }
+}
+
+// Default dispatcher handler: run a job according to its type
+export function runJob(db, job) {
+  return job.type === JOB_TYPES.deliverPlatform ? redeliverDeferred(db, job) : publishScheduledPost(db, job)
+}
+
+async function completeJob(db, job, workerId) {
+  const now = new Date()
+  await db.collection('jobs').updateOne(
+    { _id: job._id, leaseOwner: workerId },
+    {
+      $set: {
+        status: JOB_STATUS.done,
+        completedAt: now,
+        lagMs: now.getTime() - new Date(job.dueAt).getTime(),
+        leaseUntil: null,
+        updatedAt: now
+      }
+    }
+  )
+}
+
+async function failJob(db, job, workerId, error, options) {
+  const now = new Date()
+  const exhausted = job.attempts >= options.maxAttempts
+  const update = exhausted
+    ? { status: JOB_STATUS.failed, leaseUntil: null }
+    : {
+        status: JOB_STATUS.pending,
+        dueAt: new Date(now.getTime() + backoffDelay(job.attempts, options)),
+        leaseOwner: null,
+        leaseUntil: null
+      }
+
+  await db.collection('jobs').updateOne(
+    { _id: job._id, leaseOwner: workerId },
+    { $set: { ...update, lastError: error.message, updatedAt: now } }
+  )
+
+  if (exhausted && job.tenantId) {
+    const result = await forTenant(db, job.tenantId).collection('posts').updateOne(
+      { id: job.postId, status: 'scheduled' },
+      { $set: { status: 'failed', updatedAt: now } }
+    )
+    if (result.modifiedCount > 0) {
+      emitEvent(job.tenantId, 'post.status', { id: job.postId, status: 'failed', publishedAt: null })
+    }
+  }
+}
+
+export async function runDispatchCycle(db, workerId, handler, options = DEFAULTS) {
+  const jobs = await claimDueJobs(db, workerId, options)
+
+  await Promise.all(jobs.map(async (job) => {
+    try {
+      await handler(db, job)
+      await completeJob(db, job, workerId)
+    } catch (error) {
+      console.error(`Job ${job._id} for post ${job.postId} failed:`, error.message)
+      await failJob(db, job, workerId, error, options)
+    }
+  }))
+
+  return jobs.length
+}
+
+export function createDispatcher(getDb, {
+  workerId = `${os.hostname()}:${process.pid}:${uuidv4().slice(0, 8)}`,
+  handler = runJob,
+  ...overrides
+} = {}) {
+  const options = { ...DEFAULTS, ...overrides }
+  let running = false
+  let timer = null
+  const stats = { cycles: 0, processed: 0 }
+
+  async function loop() {
+    if (!running) {
+      return
+    }
+    let processed = 0
+    try {
+      const db = await getDb()
+      await ensureJobIndexes(db)
+      processed = await runDispatchCycle(db, workerId, handler, options)
+      stats.cycles++
+      stats.processed += processed
+    } catch (error) {
+      console.error('Dispatcher error:', error)
+    }
+    // A full batch means there is likely more due work; poll again right away
+    timer = setTimeout(loop, processed >= options.batchSize ? 0 : options.pollIntervalMs)
+  }
+
+  return {
+    workerId,
+    start() {
+      if (!running) {
+        running = true
+        loop()
+      }
+    },
+    stop() {
+      running = false
+      clearTimeout(timer)
+    },
+    stats() {
+      return { workerId, running, ...stats }
+    }
+  }
+}
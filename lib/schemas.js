@@ -0,0 +1,95 @@
+import { z } from 'zod'
+
+// Request body schemas, built once at module load and enforced by the router
+// before a handler runs. Unknown fields are stripped unless a schema says
+// otherwise. Batch and NDJSON bodies are checked item by item instead (posts
+// against postInput in posts.js, events against engagementEvent in ingest.js),
+// so one bad line does not reject the rest.
+
+export const MAX_BATCH_SIZE = 1000
+
+export const POST_ACTIONS = ['publish', 'schedule']
+
+// Platform names become keys in the post's delivery map
+export const PLATFORM_NAME = /^[A-Za-z][A-Za-z0-9_-]*$/
+
+// "path: message" for one zod issue, as returned in 400 responses
+export function issueMessage({ path, message }) {
+  return path.length > 0 ? `${path.join('.')}: ${message}` : message
+}
+
+const dateLike = z.union([z.string(), z.number()])
+  .refine(value => !Number.isNaN(new Date(value).getTime()), 'Invalid date')
+
+const text = (max = 255) => z.string().max(max)
+
+export const postInput = z.object({
+  content: z.string().max(65536).refine(content => content.trim().length > 0, 'must not be empty'),
+  platforms: z.array(z.string().regex(PLATFORM_NAME, 'Invalid platform name')).max(20).optional(),
+  action: z.enum(POST_ACTIONS).optional(),
+  scheduledAt: dateLike.nullable().optional(),
+  images: z.array(text(2048)).max(50).optional()
+})
+
+export const postUpdate = postInput.partial()
+
+export const engagementEvent = z.object({
+  postId: z.string().min(1),
+  platform: z.string().min(1).regex(/^[^.$]+$/, 'Invalid platform'),
+  reach: z.number().finite().optional(),
+  likes: z.number().finite().optional(),
+  comments: z.number().finite().optional(),
+  shares: z.number().finite().optional(),
+  at: dateLike.optional()
+})
+
+// A single event or an array of them, always handed on as an array
+export const engagementEvents = z.preprocess(
+  body => Array.isArray(body) ? body : [body],
+  z.array(engagementEvent).min(1).max(MAX_BATCH_SIZE)
+)
+
+const connectedAccount = z.object({
+  connected: z.boolean(),
+  username: text(100).nullable().optional()
+})
+
+// Profile fields the dashboard edits. Every stored key is listed: the body is
+// $set on the profile as parsed, so anything else is stripped.
+export const profileInput = z.object({
+  id: text(100).optional(),
+  businessName: text(200).optional(),
+  businessType: text(50).optional(),
+  description: text(2000).optional(),
+  address: text(500).optional(),
+  city: text(100).optional(),
+  state: text(100).optional(),
+  zipCode: text(20).optional(),
+  phone: text(50).optional(),
+  email: text(320).optional(),
+  website: text(2048).optional(),
+  logo: text(2048).nullable().optional(),
+  connectedAccounts: z.record(z.string().regex(PLATFORM_NAME, 'Invalid platform name'), connectedAccount).optional()
+})
+
+const tags = z.union([text(1000), z.array(text(100)).max(20)])
+
+export const linkedImageInput = z.object({
+  filename: text().optional(),
+  url: z.string().url().max(2048).optional(),
+  thumbnail: z.string().url().max(2048).optional(),
+  category: text(100).optional(),
+  tags: tags.optional(),
+  size: text(20).optional()
+})
+
+export const uploadSessionInput = z.object({
+  filename: text().optional(),
+  category: text(100).optional(),
+  tags: tags.optional(),
+  contentType: text().optional(),
+  bytes: z.coerce.number({ invalid_type_error: 'must be the total upload size' })
+    .int('must be the total upload size')
+    .positive('must be the total upload size'),
+  sha256: text(64).optional()
+})
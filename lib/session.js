@@ -0,0 +1,44 @@
+import { createHash, timingSafeEqual } from 'crypto'
+import { getToken } from 'next-auth/jwt'
+
+// The tenant requests without a session act for, only when
+// ALLOW_ANONYMOUS_API=true. That opt-in is meant for tests and benchmarks
+// against a local server; otherwise such requests have no session at all.
+export const ANONYMOUS = 'anonymous'
+
+const ALLOW_ANONYMOUS = process.env.ALLOW_ANONYMOUS_API === 'true'
+
+// Identify the caller from the NextAuth JWT cookie: the signed-in account
+// (`user`, which owns OAuth tokens) and the business it acts for (`tenantId`,
+// which owns posts, images, analytics and the profile). Null when there is no
+// valid session and anonymous access is off.
+export async function getRequestSession(request) {
+  let token = null
+  try {
+    token = await getToken({ req: request, secret: process.env.NEXTAUTH_SECRET })
+  } catch {
+    token = null
+  }
+  if (token?.sub) {
+    return { user: token.sub, tenantId: token.tenantId || token.sub }
+  }
+  return ALLOW_ANONYMOUS ? { user: ANONYMOUS, tenantId: ANONYMOUS } : null
+}
+
+// Engagement webhooks come from platforms, not a browser session; they prove
+// themselves with the shared ENGAGEMENT_WEBHOOK_SECRET in X-Webhook-Secret.
+// Without a configured secret every webhook is refused.
+export function hasWebhookSecret(request) {
+  const secret = process.env.ENGAGEMENT_WEBHOOK_SECRET
+  const sent = request.headers.get('x-webhook-secret')
+  if (!secret || !sent) {
+    return false
+  }
+  // Equal-length digests, so the comparison time says nothing about the secret
+  const digest = value => createHash('sha256').update(value).digest()
+  return timingSafeEqual(digest(sent), digest(secret))
+}
+
+export async function getRequestUser(request) {
+  return (await getRequestSession(request))?.user ?? null
+}
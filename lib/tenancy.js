@@ -0,0 +1,205 @@
+// Tenant isolation. Every document that belongs to a business carries its
+// tenantId, and every compound index on that data leads with it, so one
+// tenant's queries are range scans inside its own slice of each index however
+// many tenants share the collection.
+//
+// The data layer enforces it: the handle from getDb() refuses the collections
+// below, forTenant(db, tenantId) adds the key to every filter, insert, upsert
+// and pipeline (refusing stages that reach other collections), and
+// allTenants(db) is the explicit way around it for work that is cross-tenant
+// by nature (the dispatcher, webhook attribution, the post change stream,
+// migrations). Queues and content-addressed storage (jobs,
+// derivative_jobs, image_objects) and per-account tokens are not tenant data.
+
+export const TENANT_COLLECTIONS = new Set(['posts', 'analytics_daily', 'images', 'upload_sessions', 'profiles'])
+
+const UNSCOPED = Symbol('unscoped')
+
+// Collection methods that take a filter as their first argument
+const FILTER_METHODS = new Set(['find', 'findOne', 'countDocuments', 'deleteOne', 'deleteMany', 'findOneAndDelete'])
+const UPDATE_METHODS = new Set(['updateOne', 'updateMany', 'findOneAndUpdate'])
+const REPLACE_METHODS = new Set(['replaceOne', 'findOneAndReplace'])
+// Readable without a tenant: they describe the collection, not its documents
+const PASSTHROUGH = new Set(['collectionName', 'namespace', 'dbName', 'indexes', 'listIndexes', 'indexExists'])
+// Aggregation stages that read or write another collection, which the
+// tenant filter on this one cannot reach
+const CROSS_COLLECTION_STAGES = new Set(['$lookup', '$graphLookup', '$unionWith', '$merge', '$out'])
+
+function tenancyError(message) {
+  const error = new Error(message)
+  error.tenancy = true
+  return error
+}
+
+function assertTenantId(tenantId) {
+  if (typeof tenantId !== 'string' || !tenantId) {
+    throw tenancyError('A tenantId is required to reach tenant data')
+  }
+}
+
+// Indexes on tenant data lead with tenantId; single-field unique indexes on
+// global identifiers (uuids) are the exception
+export function assertTenantIndex(collectionName, { key, name, unique }) {
+  const fields = Object.keys(key)
+  if (fields[0] === 'tenantId' || (fields.length === 1 && unique)) {
+    return
+  }
+  throw tenancyError(`Index ${name || fields.join('_')} on ${collectionName} must lead with tenantId`)
+}
+
+const touchesTenant = fields => typeof fields === 'object' && fields !== null &&
+  Object.keys(fields).some(field => field === 'tenantId' || field.startsWith('tenantId.'))
+
+// Updates may not move a document to another tenant. Pipeline updates may not
+// set or unset it either, and end by pinning it, since $replaceWith and
+// $project can drop it without naming it.
+function scopeUpdate(update, tenantId) {
+  if (!Array.isArray(update)) {
+    const renamed = Object.values(update?.$rename || {})
+    if (update && (Object.values(update).some(touchesTenant) || renamed.includes('tenantId'))) {
+      throw tenancyError('tenantId cannot be updated')
+    }
+    return update
+  }
+  for (const stage of update) {
+    const unset = stage.$unset === undefined ? [] : [].concat(stage.$unset)
+    if (touchesTenant(stage.$set) || touchesTenant(stage.$addFields) || unset.includes('tenantId')) {
+      throw tenancyError('tenantId cannot be updated')
+    }
+  }
+  return [...update, { $set: { tenantId } }]
+}
+
+function scopeWriteModel(model, tenantId) {
+  const [[op, args]] = Object.entries(model)
+  if (op === 'insertOne') {
+    return { insertOne: { ...args, document: { ...args.document, tenantId } } }
+  }
+  if (op === 'replaceOne') {
+    return {
+      replaceOne: { ...args, filter: { ...args.filter, tenantId }, replacement: { ...args.replacement, tenantId } }
+    }
+  }
+  if (args.update) {
+    return { [op]: { ...args, filter: { ...args.filter, tenantId }, update: scopeUpdate(args.update, tenantId) } }
+  }
+  return { [op]: { ...args, filter: { ...args.filter, tenantId } } }
+}
+
+function assertStages(pipeline) {
+  for (const stage of pipeline) {
+    for (const [name, spec] of Object.entries(stage)) {
+      if (CROSS_COLLECTION_STAGES.has(name)) {
+        throw tenancyError(`${name} reaches outside the tenant's collection: use allTenants(db)`)
+      }
+      if (name === '$facet') {
+        Object.values(spec).forEach(assertStages)
+      }
+    }
+  }
+}
+
+// A pipeline's leading $match is merged so $text stays in the first stage
+function scopePipeline(pipeline, tenantId) {
+  assertStages(pipeline)
+  const [first, ...rest] = pipeline
+  if (first?.$match) {
+    return [{ $match: { ...first.$match, tenantId } }, ...rest]
+  }
+  return [{ $match: { tenantId } }, ...pipeline]
+}
+
+function scopeCollection(collection, tenantId) {
+  return new Proxy(collection, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop)
+      if (typeof value !== 'function' || typeof prop === 'symbol' || PASSTHROUGH.has(prop)) {
+        return typeof value === 'function' ? value.bind(target) : value
+      }
+      if (UPDATE_METHODS.has(prop)) {
+        return (filter = {}, update, ...rest) =>
+          value.call(target, { ...filter, tenantId }, scopeUpdate(update, tenantId), ...rest)
+      }
+      if (FILTER_METHODS.has(prop)) {
+        return (filter = {}, ...rest) => value.call(target, { ...filter, tenantId }, ...rest)
+      }
+      if (REPLACE_METHODS.has(prop)) {
+        return (filter, replacement, ...rest) =>
+          value.call(target, { ...filter, tenantId }, { ...replacement, tenantId }, ...rest)
+      }
+      switch (prop) {
+        case 'insertOne':
+          return (doc, ...rest) => value.call(target, { ...doc, tenantId }, ...rest)
+        case 'insertMany':
+          return (docs, ...rest) => value.call(target, docs.map(doc => ({ ...doc, tenantId })), ...rest)
+        case 'bulkWrite':
+          return (models, ...rest) => value.call(target, models.map(model => scopeWriteModel(model, tenantId)), ...rest)
+        case 'aggregate':
+          return (pipeline = [], ...rest) => value.call(target, scopePipeline(pipeline, tenantId), ...rest)
+        case 'distinct':
+          return (key, filter = {}, ...rest) => value.call(target, key, { ...filter, tenantId }, ...rest)
+        case 'estimatedDocumentCount':
+          return options => target.countDocuments({ tenantId }, options)
+        case 'createIndexes':
+          return (specs, ...rest) => {
+            specs.forEach(spec => assertTenantIndex(target.collectionName, spec))
+            return value.call(target, specs, ...rest)
+          }
+        default:
+          return () => {
+            throw tenancyError(`${target.collectionName}.${prop}() cannot be scoped to a tenant`)
+          }
+      }
+    }
+  })
+}
+
+// The handle getDb() returns: tenant collections need forTenant or allTenants
+export function guardTenants(db) {
+  return new Proxy(db, {
+    get(target, prop) {
+      if (prop === UNSCOPED) {
+        return target
+      }
+      const value = Reflect.get(target, prop)
+      if (prop === 'collection') {
+        return (name, ...rest) => {
+          if (TENANT_COLLECTIONS.has(name)) {
+            throw tenancyError(`${name} holds tenant data: use forTenant(db, tenantId)`)
+          }
+          return value.call(target, name, ...rest)
+        }
+      }
+      return typeof value === 'function' ? value.bind(target) : value
+    }
+  })
+}
+
+// Everything done through this handle reads and writes `tenantId`'s data only
+export function forTenant(db, tenantId) {
+  assertTenantId(tenantId)
+  const base = db[UNSCOPED] || db
+  return new Proxy(base, {
+    get(target, prop) {
+      if (prop === 'tenantId') {
+        return tenantId
+      }
+      if (prop === UNSCOPED) {
+        return target
+      }
+      const value = Reflect.get(target, prop)
+      if (prop === 'collection') {
+        return (name, ...rest) => {
+          const collection = value.call(target, name, ...rest)
+          return TENANT_COLLECTIONS.has(name) ? scopeCollection(collection, tenantId) : collection
+        }
+      }
+      return typeof value === 'function' ? value.bind(target) : value
+    }
+  })
+}
+
+// Unrestricted access for deliberately cross-tenant work
+export function allTenants(db) {
+  return db[UNSCOPED] || db
+}
@@ -0,0 +1,192 @@
+import { httpError } from './errors.js'
+
+// Google OAuth access tokens for server-side API calls. The refresh token
+// captured at sign-in lives in `oauth_tokens`; access tokens are cached per
+// account in memory, refreshed in the background shortly before they expire,
+// and concurrent refreshes for one account share a single token request.
+
+const TOKEN_URL = process.env.GOOGLE_TOKEN_URL || 'https://oauth2.googleapis.com/token'
+
+const REFRESH_MARGIN_MS = parseInt(process.env.TOKEN_REFRESH_MARGIN_MS || '300000', 10)
+const MAX_ACCOUNTS = parseInt(process.env.TOKEN_CACHE_MAX_ACCOUNTS || '10000', 10)
+const REQUEST_TIMEOUT_MS = parseInt(process.env.TOKEN_REQUEST_TIMEOUT_MS || '10000', 10)
+
+// setTimeout fires immediately for delays above 2^31 - 1 ms
+const MAX_TIMER_MS = 2 ** 31 - 1
+
+const cache = new Map()
+const inflight = new Map()
+
+const stats = {
+  hits: 0,
+  misses: 0,
+  refreshes: 0,
+  refreshFailures: 0,
+  coalesced: 0,
+  backgroundRefreshes: 0
+}
+
+function forget(accountId) {
+  clearTimeout(cache.get(accountId)?.timer)
+  cache.delete(accountId)
+}
+
+// Cache a token and schedule its refresh. The timer only refreshes accounts
+// that were used since the token was cached; idle ones just drop out.
+function remember(db, accountId, { accessToken, expiresAt }) {
+  forget(accountId)
+
+  const entry = { accessToken, expiresAt, used: false, timer: null }
+  const delay = Math.min(MAX_TIMER_MS, Math.max(0, expiresAt - REFRESH_MARGIN_MS - Date.now()))
+  entry.timer = setTimeout(() => {
+    if (cache.get(accountId) !== entry) {
+      return
+    }
+    if (!entry.used) {
+      cache.delete(accountId)
+      return
+    }
+    stats.backgroundRefreshes++
+    refresh(db, accountId).catch((error) => {
+      console.error(`Background token refresh for ${accountId} failed:`, error.message)
+    })
+  }, delay)
+  entry.timer.unref?.()
+
+  cache.set(accountId, entry)
+  while (cache.size > MAX_ACCOUNTS) {
+    forget(cache.keys().next().value)
+  }
+  return entry
+}
+
+function singleFlight(accountId, run) {
+  const pending = inflight.get(accountId)
+  if (pending) {
+    stats.coalesced++
+    return pending
+  }
+  const promise = run().finally(() => inflight.delete(accountId))
+  inflight.set(accountId, promise)
+  return promise
+}
+
+async function requestToken(refreshToken) {
+  const response = await fetch(TOKEN_URL, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+    body: new URLSearchParams({
+      grant_type: 'refresh_token',
+      refresh_token: refreshToken,
+      client_id: process.env.GOOGLE_CLIENT_ID || '',
+      client_secret: process.env.GOOGLE_CLIENT_SECRET || ''
+    }),
+    signal: AbortSignal.timeout(REQUEST_TIMEOUT_MS)
+  })
+  const data = await response.json().catch(() => ({}))
+
+  if (!response.ok || !data.access_token) {
+    const error = data.error === 'invalid_grant'
+      ? httpError('Google access was revoked; sign in again', 401)
+      : httpError(`Token refresh failed: ${data.error || `HTTP ${response.status}`}`, 502)
+    error.revoked = data.error === 'invalid_grant'
+    throw error
+  }
+  return data
+}
+
+// Load the stored token, and exchange the refresh token only if the stored
+// access token is close to expiry (another process may have just refreshed).
+function refresh(db, accountId) {
+  return singleFlight(accountId, async () => {
+    const tokens = db.collection('oauth_tokens')
+    const stored = await tokens.findOne({ _id: accountId })
+
+    if (!stored?.refreshToken || stored.revokedAt) {
+      forget(accountId)
+      throw httpError('Google account is not connected', 401)
+    }
+    if (stored.accessToken && stored.expiresAt - Date.now() > REFRESH_MARGIN_MS) {
+      return remember(db, accountId, { accessToken: stored.accessToken, expiresAt: stored.expiresAt.getTime() })
+    }
+
+    let data
+    try {
+      data = await requestToken(stored.refreshToken)
+    } catch (error) {
+      stats.refreshFailures++
+      if (error.revoked) {
+        forget(accountId)
+        await tokens.updateOne({ _id: accountId }, { $set: { revokedAt: new Date() } })
+      }
+      throw error
+    }
+
+    stats.refreshes++
+    const expiresAt = Date.now() + (data.expires_in || 3600) * 1000
+    const update = { accessToken: data.access_token, expiresAt: new Date(expiresAt), refreshedAt: new Date() }
+    // Google only sometimes rotates the refresh token
+    if (data.refresh_token) {
+      update.refreshToken = data.refresh_token
+    }
+    await tokens.updateOne({ _id: accountId }, { $set: update })
+    return remember(db, accountId, { accessToken: data.access_token, expiresAt })
+  })
+}
+
+// Store the tokens NextAuth receives at sign-in. expiresAt is in milliseconds.
+export async function saveTokens(db, accountId, { accessToken, refreshToken, expiresAt }) {
+  const update = { accessToken, expiresAt: new Date(expiresAt), updatedAt: new Date() }
+  // Google omits the refresh token on repeat consents; keep the one we have
+  if (refreshToken) {
+    update.refreshToken = refreshToken
+  }
+  await db.collection('oauth_tokens').updateOne(
+    { _id: accountId },
+    { $set: update, $unset: { revokedAt: '' } },
+    { upsert: true }
+  )
+  remember(db, accountId, { accessToken, expiresAt })
+}
+
+// A usable access token for the account: { accessToken, expiresAt }.
+// Throws a 401 error if the account never connected Google or revoked access.
+export async function getAccessToken(db, accountId) {
+  const entry = cache.get(accountId)
+  const now = Date.now()
+
+  if (entry && entry.expiresAt - now > REFRESH_MARGIN_MS) {
+    stats.hits++
+    entry.used = true
+    return { accessToken: entry.accessToken, expiresAt: entry.expiresAt }
+  }
+
+  // Still valid but inside the margin (the timer lost a race): serve it and
+  // refresh behind the caller rather than on its critical path
+  if (entry && entry.expiresAt - now > REQUEST_TIMEOUT_MS) {
+    stats.hits++
+    refresh(db, accountId).catch(error => console.error(`Token refresh for ${accountId} failed:`, error.message))
+    return { accessToken: entry.accessToken, expiresAt: entry.expiresAt }
+  }
+
+  stats.misses++
+  const fresh = await refresh(db, accountId)
+  fresh.used = true
+  return { accessToken: fresh.accessToken, expiresAt: fresh.expiresAt }
+}
+
+export async function getTokenStatus(db, accountId) {
+  try {
+    const { expiresAt } = await getAccessToken(db, accountId)
+    return { connected: true, expiresAt: new Date(expiresAt).toISOString() }
+  } catch (error) {
+    if (error.status === 401) {
+      return { connected: false, reason: error.message }
+    }
+    throw error
+  }
+}
+
+export function getTokenStats() {
+  return { accounts: cache.size, refreshing: inflight.size, refreshMarginMs: REFRESH_MARGIN_MS, ...stats }
+}
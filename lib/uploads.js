@@ -0,0 +1,512 @@
+import { createHash } from 'crypto'
+import { createReadStream, createWriteStream } from 'fs'
+import { mkdir, rename, rm, stat, truncate, unlink } from 'fs/promises'
+import path from 'path'
+import { Readable, Transform } from 'stream'
+import { pipeline } from 'stream/promises'
+import formidable from 'formidable'
+import { v4 as uuidv4 } from 'uuid'
+import { httpError } from './errors.js'
+
+// Streaming, content-addressed image storage. Bytes go straight from the
+// request stream to a temp file while being hashed; the finished file is
+// renamed to objects/<sha256>, so identical uploads share one copy on disk.
+
+export const UPLOAD_DIR = path.resolve(process.env.UPLOAD_DIR || 'uploads')
+export const MAX_UPLOAD_BYTES = parseInt(process.env.MAX_UPLOAD_BYTES || String(200 * 1024 * 1024), 10)
+// How long a chunk write holds its upload session; a lock left by a crashed
+// request is reclaimed once it expires
+const UPLOAD_LEASE_MS = parseInt(process.env.UPLOAD_LEASE_MS || String(10 * 60 * 1000), 10)
+
+const TMP_DIR = path.join(UPLOAD_DIR, 'tmp')
+const OBJECTS_DIR = path.join(UPLOAD_DIR, 'objects')
+const SHA256_PATTERN = /^[a-f0-9]{64}$/
+
+let dirsReady = null
+
+function ensureDirs() {
+  if (!dirsReady) {
+    dirsReady = Promise.all([
+      mkdir(TMP_DIR, { recursive: true }),
+      mkdir(OBJECTS_DIR, { recursive: true })
+    ]).catch((error) => {
+      dirsReady = null
+      throw error
+    })
+  }
+  return dirsReady
+}
+
+export function isSha256(value) {
+  return typeof value === 'string' && SHA256_PATTERN.test(value)
+}
+
+export function objectDir(sha256) {
+  return path.join(OBJECTS_DIR, sha256.slice(0, 2), sha256)
+}
+
+// The original lives in its own directory so derived files can sit next to it
+export function objectPath(sha256) {
+  return path.join(objectDir(sha256), 'original')
+}
+
+export function objectUrl(sha256) {
+  return `/api/images/files/${sha256}`
+}
+
+// Resized copies produced by the derivative pipeline, stored next to the original
+export const VARIANT_WIDTHS = [200, 400, 800]
+export const VARIANT_FORMATS = { webp: 'image/webp', jpg: 'image/jpeg' }
+export const THUMBNAIL_VARIANT = 'w400.webp'
+export const DISPLAY_VARIANT = 'w800.webp'
+
+export const VARIANT_NAMES = VARIANT_WIDTHS.flatMap(width =>
+  Object.keys(VARIANT_FORMATS).map(format => `w${width}.${format}`)
+)
+
+export function parseVariant(name) {
+  const match = /^w(\d+)\.(webp|jpg)$/.exec(name || '')
+  if (!match || !VARIANT_NAMES.includes(name)) {
+    return null
+  }
+  return { width: Number(match[1]), format: match[2], contentType: VARIANT_FORMATS[match[2]] }
+}
+
+export function variantPath(sha256, name) {
+  return path.join(objectDir(sha256), name)
+}
+
+export function variantUrl(sha256, name) {
+  return `${objectUrl(sha256)}/${name}`
+}
+
+// Raster formats the derivative pipeline can decode. Anything else (SVG,
+// HTML labelled as an image) could run script if served from our origin.
+export const IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/avif']
+
+function mediaType(contentType) {
+  return typeof contentType === 'string' ? contentType.split(';')[0].trim().toLowerCase() : ''
+}
+
+export function isImageType(contentType) {
+  return IMAGE_TYPES.includes(mediaType(contentType))
+}
+
+// The declared type of an upload, normalized, or a 415 for non-raster content
+export function uploadContentType(contentType) {
+  if (!isImageType(contentType)) {
+    throw httpError(`Unsupported image type; expected one of: ${IMAGE_TYPES.join(', ')}`, 415)
+  }
+  return mediaType(contentType)
+}
+
+export function formatSize(bytes) {
+  return `${(bytes / 1024 / 1024).toFixed(1)}MB`
+}
+
+function hashingCounter(hash, maxBytes, counter) {
+  return new Transform({
+    transform(chunk, encoding, callback) {
+      counter.bytes += chunk.length
+      if (counter.bytes > maxBytes) {
+        callback(httpError(`Upload exceeds ${formatSize(maxBytes)}`, 413))
+        return
+      }
+      if (hash) {
+        hash.update(chunk)
+      }
+      callback(null, chunk)
+    }
+  })
+}
+
+// Pipe a web ReadableStream to a temp file, hashing it on the way through
+export async function streamToTemp(body, { maxBytes = MAX_UPLOAD_BYTES } = {}) {
+  if (!body) {
+    throw httpError('Request body is empty', 400)
+  }
+  await ensureDirs()
+
+  const tmpPath = path.join(TMP_DIR, uuidv4())
+  const hash = createHash('sha256')
+  const counter = { bytes: 0 }
+
+  try {
+    await pipeline(
+      Readable.fromWeb(body),
+      hashingCounter(hash, maxBytes, counter),
+      createWriteStream(tmpPath)
+    )
+  } catch (error) {
+    await unlink(tmpPath).catch(() => {})
+    throw error
+  }
+
+  return { tmpPath, sha256: hash.digest('hex'), bytes: counter.bytes }
+}
+
+export async function hashFile(filePath) {
+  const hash = createHash('sha256')
+  await pipeline(createReadStream(filePath), hash)
+  return hash.digest('hex')
+}
+
+export async function findObject(db, sha256) {
+  return db.collection('image_objects').findOne({ _id: sha256 })
+}
+
+// Move a hashed temp file into the object store, or drop it if the content
+// is already stored. Returns the object document and whether it was a dedup.
+export async function commitObject(db, { tmpPath, sha256, bytes, contentType }) {
+  const existing = await findObject(db, sha256)
+
+  if (existing) {
+    await unlink(tmpPath).catch(() => {})
+  } else {
+    await mkdir(objectDir(sha256), { recursive: true })
+    await rename(tmpPath, objectPath(sha256))
+  }
+
+  const result = await db.collection('image_objects').findOneAndUpdate(
+    { _id: sha256 },
+    {
+      $setOnInsert: { bytes, contentType: contentType || 'application/octet-stream', createdAt: new Date() },
+      $inc: { refs: 1 }
+    },
+    { upsert: true, returnDocument: 'after' }
+  )
+
+  return { object: result, deduplicated: Boolean(existing) }
+}
+
+// Drop `count` library references to a stored object. The last one deletes
+// the object record, its derivative job and its directory (original and
+// variants), so the same content uploaded later is stored and rendered anew.
+export async function releaseObject(db, sha256, count = 1) {
+  const object = await db.collection('image_objects').findOneAndUpdate(
+    { _id: sha256 },
+    { $inc: { refs: -count } },
+    { returnDocument: 'after' }
+  )
+  if (!object || object.refs > 0) {
+    return
+  }
+  // Guarded on refs so an upload that deduplicated against it meanwhile wins
+  const { deletedCount } = await db.collection('image_objects').deleteOne({ _id: sha256, refs: { $lte: 0 } })
+  if (deletedCount > 0) {
+    await db.collection('derivative_jobs').deleteOne({ _id: sha256 })
+    await rm(objectDir(sha256), { recursive: true, force: true })
+  }
+}
+
+export function parseTags(tags) {
+  const list = Array.isArray(tags) ? tags : String(tags || '').split(',')
+  return [...new Set(list.map(tag => String(tag).trim().toLowerCase()).filter(Boolean))].slice(0, 20)
+}
+
+// `db` is a tenant handle (forTenant), which stamps the record with its tenant
+export async function createImageRecord(db, { filename, category, tags, object }) {
+  const image = {
+    id: uuidv4(),
+    filename: filename || 'uploaded-image',
+    sha256: object._id,
+    // Images are shown through resized variants; the original is only linked
+    url: isImageType(object.contentType) ? variantUrl(object._id, DISPLAY_VARIANT) : objectUrl(object._id),
+    thumbnail: isImageType(object.contentType) ? variantUrl(object._id, THUMBNAIL_VARIANT) : objectUrl(object._id),
+    originalUrl: objectUrl(object._id),
+    contentType: object.contentType,
+    category: category || 'Uncategorized',
+    tags: parseTags(tags),
+    uploadedAt: new Date(),
+    bytes: object.bytes,
+    size: formatSize(object.bytes)
+  }
+  await db.collection('images').insertOne({ ...image })
+  return image
+}
+
+// Reuse stored bytes when the client already knows the content hash
+export async function dedupByHash(db, { sha256, ...meta }) {
+  if (!isSha256(sha256)) {
+    return null
+  }
+  const object = await db.collection('image_objects').findOneAndUpdate(
+    { _id: sha256 },
+    { $inc: { refs: 1 } },
+    { returnDocument: 'after' }
+  )
+  if (!object) {
+    return null
+  }
+  return createImageRecord(db, { ...meta, object })
+}
+
+// Raw body upload: the request body is the image itself
+export async function storeStream(db, body, { contentType, sha256, ...meta }) {
+  const type = uploadContentType(contentType)
+  const temp = await streamToTemp(body)
+
+  if (sha256 && sha256 !== temp.sha256) {
+    await unlink(temp.tmpPath).catch(() => {})
+    throw httpError('Content does not match X-Content-SHA256', 422)
+  }
+
+  const { object, deduplicated } = await commitObject(db, { ...temp, contentType: type })
+  const image = await createImageRecord(db, { ...meta, object })
+  return { image, deduplicated }
+}
+
+// multipart/form-data upload: formidable streams each file to disk and hashes
+// it as it goes, so nothing is buffered in memory.
+export async function storeMultipart(db, request) {
+  await ensureDirs()
+
+  const form = formidable({
+    uploadDir: TMP_DIR,
+    hashAlgorithm: 'sha256',
+    maxFileSize: MAX_UPLOAD_BYTES,
+    maxFiles: 10,
+    allowEmptyFiles: false
+  })
+
+  const nodeRequest = Readable.fromWeb(request.body)
+  nodeRequest.headers = Object.fromEntries(request.headers)
+
+  let fields, files
+  try {
+    [fields, files] = await form.parse(nodeRequest)
+  } catch (error) {
+    throw httpError(`Invalid multipart upload: ${error.message}`, error.httpCode || 400)
+  }
+
+  const category = [].concat(fields.category || [])[0]
+  const tags = [].concat(fields.tags || [])
+  const parts = Object.values(files).flat()
+  const uploaded = []
+  if (parts.length === 0) {
+    throw httpError('No file in the multipart upload', 400)
+  }
+
+  // Check every part before storing any, so a rejected form stores nothing
+  const rejected = parts.find(file => !isImageType(file.mimetype))
+  if (rejected) {
+    await Promise.all(parts.map(file => unlink(file.filepath).catch(() => {})))
+    uploadContentType(rejected.mimetype)
+  }
+
+  for (const file of parts) {
+    const { object, deduplicated } = await commitObject(db, {
+      tmpPath: file.filepath,
+      sha256: file.hash,
+      bytes: file.size,
+      contentType: uploadContentType(file.mimetype)
+    })
+    const image = await createImageRecord(db, { filename: file.originalFilename, category, tags, object })
+    uploaded.push({ image, deduplicated })
+  }
+
+  return uploaded
+}
+
+// Resumable uploads: a session tracks how many bytes have been received so a
+// client can continue an interrupted upload from the reported offset.
+
+export async function createUploadSession(db, { filename, category, tags, contentType, bytes, sha256 }) {
+  const total = parseInt(bytes, 10)
+  if (!Number.isFinite(total) || total <= 0) {
+    throw httpError('bytes must be the total upload size', 400)
+  }
+  if (total > MAX_UPLOAD_BYTES) {
+    throw httpError(`Upload exceeds ${formatSize(MAX_UPLOAD_BYTES)}`, 413)
+  }
+
+  // Stored content keeps the type it was checked with when first uploaded
+  const existing = await dedupByHash(db, { sha256, filename, category, tags })
+  if (existing) {
+    return { complete: true, deduplicated: true, image: existing }
+  }
+  const type = uploadContentType(contentType)
+
+  await ensureDirs()
+  const session = {
+    _id: uuidv4(),
+    filename,
+    category,
+    tags: parseTags(tags),
+    contentType: type,
+    sha256: isSha256(sha256) ? sha256 : null,
+    bytes: total,
+    offset: 0,
+    busyUntil: null,
+    complete: false,
+    createdAt: new Date(),
+    updatedAt: new Date()
+  }
+  await db.collection('upload_sessions').insertOne(session)
+  return uploadSessionView(session)
+}
+
+export function uploadSessionView(session) {
+  return {
+    uploadId: session._id,
+    offset: session.offset,
+    bytes: session.bytes,
+    complete: session.complete,
+    imageId: session.imageId || null
+  }
+}
+
+export async function getUploadSession(db, uploadId) {
+  const session = await db.collection('upload_sessions').findOne({ _id: uploadId })
+  if (!session) {
+    throw httpError('Upload not found', 404)
+  }
+  return session
+}
+
+export function parseContentRange(header) {
+  const match = /^bytes (\d+)-(\d+)\/(\d+)$/.exec(header || '')
+  if (!match) {
+    return null
+  }
+  const [start, end, total] = match.slice(1).map(Number)
+  return end >= start ? { start, end, total } : null
+}
+
+// Append one Content-Range chunk. The session is leased while the chunk is
+// written so two concurrent requests cannot interleave bytes; the lease is
+// released however the request ends, and expires if the process dies.
+export async function appendChunk(db, uploadId, body, contentRangeHeader) {
+  const range = parseContentRange(contentRangeHeader)
+  if (!range) {
+    throw httpError('Content-Range: bytes start-end/total is required', 400)
+  }
+
+  const sessions = db.collection('upload_sessions')
+  const now = new Date()
+  const lease = new Date(now.getTime() + UPLOAD_LEASE_MS)
+  const session = await sessions.findOneAndUpdate(
+    {
+      _id: uploadId,
+      offset: range.start,
+      complete: false,
+      $or: [{ busyUntil: null }, { busyUntil: { $lte: now } }]
+    },
+    { $set: { busyUntil: lease, updatedAt: now } },
+    { returnDocument: 'after' }
+  )
+
+  if (!session) {
+    const current = await getUploadSession(db, uploadId)
+    const error = httpError(`Expected chunk at offset ${current.offset}`, 409)
+    error.details = uploadSessionView(current)
+    throw error
+  }
+
+  const partPath = path.join(TMP_DIR, `${uploadId}.part`)
+  const expected = range.end - range.start + 1
+  const counter = { bytes: 0 }
+
+  try {
+    if (range.total !== session.bytes || range.end >= session.bytes) {
+      throw httpError('Content-Range does not match the upload size', 416)
+    }
+    // Drop anything a crashed writer appended past the recorded offset
+    await truncate(partPath, range.start).catch(() => {})
+    await pipeline(
+      Readable.fromWeb(body),
+      hashingCounter(null, expected, counter),
+      createWriteStream(partPath, { flags: 'a' })
+    )
+    if (counter.bytes !== expected) {
+      throw httpError(`Chunk had ${counter.bytes} bytes, Content-Range declared ${expected}`, 400)
+    }
+
+    const offset = range.start + counter.bytes
+    if (offset < session.bytes) {
+      await sessions.updateOne({ _id: uploadId }, { $set: { offset, updatedAt: new Date() } })
+      return { ...uploadSessionView(session), offset }
+    }
+    return await finishUpload(db, session, partPath)
+  } catch (error) {
+    // Roll the part file back so the client can retry from the same offset
+    await truncate(partPath, range.start).catch(() => {})
+    throw error
+  } finally {
+    // Only our own lease: an expired one may have been taken over meanwhile
+    await sessions.updateOne({ _id: uploadId, busyUntil: lease }, { $set: { busyUntil: null } }).catch(() => {})
+  }
+}
+
+async function finishUpload(db, session, partPath) {
+  const sessions = db.collection('upload_sessions')
+  const { size } = await stat(partPath)
+  const sha256 = await hashFile(partPath)
+
+  if (session.sha256 && session.sha256 !== sha256) {
+    await unlink(partPath).catch(() => {})
+    await sessions.deleteOne({ _id: session._id })
+    throw httpError('Uploaded content does not match the declared sha256', 422)
+  }
+
+  const { object, deduplicated } = await commitObject(db, {
+    tmpPath: partPath,
+    sha256,
+    bytes: size,
+    contentType: session.contentType
+  })
+  const image = await createImageRecord(db, {
+    filename: session.filename,
+    category: session.category,
+    tags: session.tags,
+    object
+  })
+
+  await sessions.updateOne(
+    { _id: session._id },
+    { $set: { offset: size, complete: true, imageId: image.id, updatedAt: new Date() } }
+  )
+
+  return { ...uploadSessionView(session), offset: size, complete: true, imageId: image.id, image, deduplicated }
+}
+
+// Stream a file from the object store. Everything under objects/ is named by
+// content hash, so responses can be cached by clients forever. Only raster
+// images are served inline; anything else is a download the browser will not
+// render or sniff.
+export function fileResponse(filePath, { contentType, bytes, etag }, request) {
+  const inline = isImageType(contentType)
+  const headers = {
+    'Content-Type': inline ? mediaType(contentType) : 'application/octet-stream',
+    'Cache-Control': 'public, max-age=31536000, immutable',
+    'X-Content-Type-Options': 'nosniff',
+    ETag: etag
+  }
+  if (!inline) {
+    headers['Content-Disposition'] = 'attachment'
+  }
+
+  if (request.headers.get('if-none-match') === etag) {
+    return new Response(null, { status: 304, headers })
+  }
+
+  return new Response(Readable.toWeb(createReadStream(filePath)), {
+    headers: { ...headers, 'Content-Length': String(bytes) }
+  })
+}
+
+export async function objectResponse(db, sha256, request) {
+  if (!isSha256(sha256)) {
+    throw httpError('File not found', 404)
+  }
+  const object = await findObject(db, sha256)
+  if (!object) {
+    throw httpError('File not found', 404)
+  }
+
+  return fileResponse(objectPath(sha256), {
+    contentType: object.contentType,
+    bytes: object.bytes,
+    etag: `"${sha256}"`
+  }, request)
+}
@@ -6,6 +6,8 @@ const nextConfig = {
   experimental: {
     // Remove if not using Server Components
     serverComponentsExternalPackages: ['mongodb'],
+    // Runs instrumentation.js at boot so the Mongo pool is warm before traffic
+    instrumentationHook: true,
   },
   webpack(config, { dev }) {
     if (dev) {
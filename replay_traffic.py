@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+SocialFlow Pro Traffic Replay
+Re-issues a request capture (written by the API with CAPTURE_FILE set) against
+any server, with the captured inter-arrival times or N times faster, and
+compares each endpoint's latency distribution with the captured run
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend_test import latency_summary, write_report
+
+LOCAL_BASE_URL = "http://localhost:3000/api"
+API_PREFIX = "/api"
+# Captures never record headers; webhook routes need the server's secret again
+WEBHOOK_ROUTES = {"analytics/events"}
+WEBHOOK_SECRET = os.environ.get("ENGAGEMENT_WEBHOOK_SECRET")
+SERVER_TOTAL = re.compile(r"(?:^|,)\s*total;dur=([\d.]+)")
+
+
+def load_capture(path, limit=None, routes=None):
+    """Captured records in arrival order, optionally only some routes"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if routes and record.get("route") not in routes:
+                continue
+            records.append(record)
+    records.sort(key=lambda record: record["at"])
+    return records[:limit] if limit else records
+
+
+def engagement_lines(total_bytes):
+    """NDJSON engagement events adding up to about `total_bytes`"""
+    lines = []
+    size = 0
+    while size < total_bytes:
+        line = json.dumps({"postId": str(uuid.uuid4()), "platform": "instagram", "likes": 1, "reach": 10})
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def multipart_body(total_bytes, content_type="image/jpeg"):
+    """A one-file multipart/form-data body of about `total_bytes`"""
+    boundary = uuid.uuid4().hex
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"replay.jpg\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    payload = os.urandom(max(1, total_bytes - len(head) - len(tail)))
+    return head + payload + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def synthesize_body(record):
+    """(body, content type) standing in for a captured request's body.
+
+    Captured bodies are anonymized in place, so they are sent as recorded;
+    large ones come back as their sample repeated. Bodies the server streams
+    without parsing were only measured, so equally large synthetic content
+    of the same type is generated.
+    """
+    content_type = record.get("contentType")
+    body_format = record.get("format")
+    if "body" in record or "sample" in record:
+        payload = record["body"] if "body" in record else [record["sample"]] * record["items"]
+        if body_format == "ndjson":
+            return "\n".join(json.dumps(item) for item in payload) + "\n", content_type
+        return json.dumps(payload), content_type
+    size = record.get("bodyBytes") or 0
+    if body_format == "text":
+        return "x" * size, content_type
+    if not size:
+        return None, content_type
+    if content_type == "application/x-ndjson":
+        return engagement_lines(size), content_type
+    if content_type == "multipart/form-data":
+        return multipart_body(size)
+    # Random bytes so content-addressed storage never deduplicates the upload
+    return os.urandom(size), content_type
+
+
+def server_total_ms(response):
+    """The server's own handler time from its Server-Timing header"""
+    match = SERVER_TOTAL.search(response.headers.get("Server-Timing", ""))
+    return float(match.group(1)) if match else None
+
+
+class TrafficReplay:
+    """Sends captured requests on their original schedule, scaled by `speed`.
+
+    One session with a connection pool the size of the worker pool carries
+    every request. Each request is due at its captured offset divided by
+    `speed` (0 sends back to back); how late it actually left is recorded as
+    schedule slip, which grows when the workers or the server cannot keep up.
+    """
+
+    def __init__(self, base_url, records, speed=1.0, workers=32, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.records = records
+        self.speed = speed
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.results = []
+
+    def url(self, path):
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX):]
+        return f"{self.base_url}{path}"
+
+    def send(self, record, due):
+        body, content_type = synthesize_body(record)
+        headers = {"Content-Type": content_type} if content_type else {}
+        if record.get("route") in WEBHOOK_ROUTES and WEBHOOK_SECRET:
+            headers["X-Webhook-Secret"] = WEBHOOK_SECRET
+        started = time.perf_counter()
+        result = {"endpoint": f"{record['method']} {record['route']}", "slipMs": (started - due) * 1000}
+        try:
+            response = self.session.request(record["method"], self.url(record["path"]), params=record.get("query"),
+                                            data=body, headers=headers, timeout=self.timeout)
+            response.content  # the body is part of the latency
+            result.update(status=response.status_code, clientMs=(time.perf_counter() - started) * 1000,
+                          serverMs=server_total_ms(response))
+        except requests.RequestException as error:
+            result.update(status=None, error=type(error).__name__)
+        with self.lock:
+            self.results.append(result)
+
+    def run(self):
+        """Replay every record; returns wall-clock seconds taken"""
+        if not self.records:
+            return 0.0
+        first = self.records[0]["at"]
+        started = time.perf_counter()
+        futures = []
+        for record in self.records:
+            due = started + ((record["at"] - first) / 1000 / self.speed if self.speed > 0 else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(self.pool.submit(self.send, record, due))
+        for future in futures:
+            future.result()
+        self.pool.shutdown()
+        return time.perf_counter() - started
+
+
+def status_mix(statuses):
+    return {str(status): count for status, count in sorted(Counter(statuses).items(), key=lambda item: str(item[0]))}
+
+
+def compare(records, results, threshold=None, min_delta_ms=5.0):
+    """Per-endpoint latency of the captured run next to the replay.
+
+    The captured side is the server's handler time; the replay reports the
+    same server-side number (Server-Timing total) plus what the client saw,
+    which adds network and queueing. An endpoint regresses when its replayed
+    server p95 exceeds the captured p95 by more than `threshold` (a fraction)
+    and by at least `min_delta_ms`.
+    """
+    original = defaultdict(list)
+    for record in records:
+        original[f"{record['method']} {record['route']}"].append(record)
+    replayed = defaultdict(list)
+    for result in results:
+        replayed[result["endpoint"]].append(result)
+
+    endpoints = {}
+    for endpoint in sorted(set(original) | set(replayed)):
+        before = original.get(endpoint, [])
+        after = replayed.get(endpoint, [])
+        captured = latency_summary([record["durationMs"] for record in before])
+        server = latency_summary([r["serverMs"] for r in after if r.get("serverMs") is not None])
+        entry = {
+            "original": {"count": len(before), "latencyMs": captured,
+                         "statuses": status_mix(record["status"] for record in before)},
+            "replay": {
+                "count": len(after),
+                "serverMs": server,
+                "clientMs": latency_summary([r["clientMs"] for r in after if "clientMs" in r]),
+                "statuses": status_mix(r["status"] for r in after),
+                "errors": sum(1 for r in after if r["status"] is None)
+            },
+            "p95Ratio": round(server["p95"] / captured["p95"], 3) if server["p95"] and captured["p95"] else None,
+            "regressed": False
+        }
+        if threshold is not None and server["p95"] is not None and captured["p95"] is not None:
+            delta = server["p95"] - captured["p95"]
+            entry["regressed"] = delta > captured["p95"] * threshold and delta >= min_delta_ms
+        endpoints[endpoint] = entry
+    return endpoints
+
+
+def fmt_ms(value):
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def print_comparison(endpoints):
+    print(f"\n{'endpoint':<32} {'n':>6} {'orig p50':>9} {'orig p95':>9} {'srv p50':>9} {'srv p95':>9} "
+          f"{'client p95':>11} {'ratio':>6}")
+    for endpoint, entry in endpoints.items():
+        original, replay = entry["original"]["latencyMs"], entry["replay"]
+        flag = "  ❌" if entry["regressed"] else ""
+        print(f"{endpoint:<32} {replay['count']:>6} {fmt_ms(original['p50']):>9} {fmt_ms(original['p95']):>9} "
+              f"{fmt_ms(replay['serverMs']['p50']):>9} {fmt_ms(replay['serverMs']['p95']):>9} "
+              f"{fmt_ms(replay['clientMs']['p95']):>11} {fmt_ms(entry['p95Ratio']):>6}{flag}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured API traffic and compare endpoint latencies")
+    parser.add_argument("capture", help="NDJSON capture written by the API (CAPTURE_FILE)")
+    parser.add_argument("--base-url", default=os.environ.get("API_BASE_URL", LOCAL_BASE_URL),
+                        help="API base URL to replay against (default: API_BASE_URL or local server)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="time compression: 2 replays twice as fast, 0 sends back to back")
+    parser.add_argument("--workers", type=int, default=32, help="concurrent requests and pooled connections")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N captured requests")
+    parser.add_argument("--routes", default="", help="comma-separated route patterns to replay (default: all)")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="fail when an endpoint's server p95 exceeds the captured one by this fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="ignore p95 increases smaller than this many milliseconds")
+    parser.add_argument("--output", default="replay_results.json", help="JSON file for the comparison")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Replay a capture, report per-endpoint latencies and exit non-zero on regressions"""
+    args = parse_args()
+    if args.speed < 0:
+        sys.exit("--speed must be 0 or more")
+    routes = {route.strip() for route in args.routes.split(",") if route.strip()}
+    records = load_capture(args.capture, limit=args.limit, routes=routes)
+    if not records:
+        sys.exit(f"No requests to replay in {args.capture}")
+
+    captured_seconds = (records[-1]["at"] - records[0]["at"]) / 1000
+    print(f"\n🔁 Replaying {len(records)} requests ({captured_seconds:.1f}s captured) against {args.base_url} "
+          f"at {args.speed or 'max'}x with {args.workers} workers")
+    replay = TrafficReplay(args.base_url, records, speed=args.speed, workers=args.workers, timeout=args.timeout)
+    elapsed = replay.run()
+
+    endpoints = compare(records, replay.results, threshold=args.threshold, min_delta_ms=args.min_delta_ms)
+    print_comparison(endpoints)
+    errors = sum(entry["replay"]["errors"] for entry in endpoints.values())
+    report = {
+        "capture": args.capture,
+        "baseUrl": args.base_url,
+        "speed": args.speed,
+        "workers": args.workers,
+        "requests": len(records),
+        "errors": errors,
+        "capturedSeconds": round(captured_seconds, 3),
+        "replaySeconds": round(elapsed, 3),
+        "capturedRate": round(len(records) / captured_seconds, 2) if captured_seconds else None,
+        "replayRate": round(len(records) / elapsed, 2) if elapsed else None,
+        "scheduleSlipMs": latency_summary([result["slipMs"] for result in replay.results]),
+        "endpoints": endpoints
+    }
+    print(f"\nReplayed in {elapsed:.1f}s, schedule slip p95 {report['scheduleSlipMs']['p95']}ms, {errors} errors")
+    write_report(report, args.output)
+
+    regressed = [endpoint for endpoint, entry in endpoints.items() if entry["regressed"]]
+    if regressed:
+        sys.exit(f"\n❌ Server p95 regressed more than {args.threshold * 100:.0f}% in: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+// Dispatch microbenchmark for lib/router.js. Builds a table of 60+ routes
+// shaped like the API's (static paths, :params, two routes on one path) and
+// times route matching against the if/startsWith chain the catch-all handler
+// used before, plus full dispatch including body rejection.
+//
+//   node scripts/bench-router.mjs [iterations]
+import { performance } from 'perf_hooks'
+import { z } from 'zod'
+import { createRouter } from '../lib/router.js'
+
+const ITERATIONS = parseInt(process.argv[2] || '200000', 10)
+const RESOURCES = 15
+
+const ok = () => ({ success: true })
+const isNdjson = request => (request.headers.get('content-type') || '').includes('ndjson')
+const postInput = z.object({ content: z.string().min(1), platforms: z.array(z.string()).optional() })
+
+const routes = [
+  { method: 'GET', path: '', handler: ok },
+  { method: 'GET', path: 'health', handler: ok },
+  { method: 'GET', path: 'posts', handler: ok },
+  { method: 'GET', path: 'images/files/:sha256', handler: ok },
+  { method: 'GET', path: 'images/files/:sha256/:variant', handler: ok },
+  { method: 'POST', path: 'posts', body: postInput, handler: ok },
+  { method: 'POST', path: 'analytics/events', accepts: isNdjson, handler: ok },
+  { method: 'POST', path: 'analytics/events', handler: ok }
+]
+for (let i = 0; i < RESOURCES; i++) {
+  routes.push(
+    { method: 'GET', path: `resource${i}`, handler: ok },
+    { method: 'GET', path: `resource${i}/:id`, handler: ok },
+    { method: 'PUT', path: `resource${i}/:id`, body: postInput, handler: ok },
+    { method: 'DELETE', path: `resource${i}/:id`, handler: ok }
+  )
+}
+
+// The same table as a linear chain of comparisons, one per route
+function chainMatch(method, segments) {
+  const endpoint = segments.join('/')
+  for (const route of routes) {
+    if (route.method !== method) {
+      continue
+    }
+    if (!route.path.includes(':')) {
+      if (endpoint === route.path) {
+        return route
+      }
+    } else {
+      const prefix = route.path.slice(0, route.path.indexOf(':'))
+      if (endpoint.startsWith(prefix) && endpoint.split('/').length === route.path.split('/').length) {
+        return route
+      }
+    }
+  }
+  return null
+}
+
+const router = createRouter(routes)
+const request = new Request('http://localhost/api/x')
+
+const lookups = [
+  ['GET', ['health']],
+  ['GET', ['posts']],
+  ['GET', ['images', 'files', 'a'.repeat(64), 'w400.webp']],
+  ['GET', [`resource${RESOURCES - 1}`]],
+  ['GET', [`resource${RESOURCES - 1}`, '42']],
+  ['DELETE', [`resource${RESOURCES - 1}`, '42']],
+  ['GET', ['no', 'such', 'route']]
+]
+
+function time(label, iterations, fn) {
+  for (let i = 0; i < Math.min(iterations, 10000); i++) {
+    fn(i)
+  }
+  const started = performance.now()
+  for (let i = 0; i < iterations; i++) {
+    fn(i)
+  }
+  const elapsed = performance.now() - started
+  console.log(`${label.padEnd(34)} ${(elapsed * 1e6 / iterations).toFixed(0).padStart(8)} ns/op`)
+}
+
+async function timeAsync(label, iterations, fn) {
+  for (let i = 0; i < Math.min(iterations, 1000); i++) {
+    await fn(i)
+  }
+  const started = performance.now()
+  for (let i = 0; i < iterations; i++) {
+    await fn(i)
+  }
+  const elapsed = performance.now() - started
+  console.log(`${label.padEnd(34)} ${(elapsed * 1e3 / iterations).toFixed(1).padStart(8)} µs/op`)
+}
+
+console.log(`${routes.length} routes, ${ITERATIONS} iterations\n`)
+
+for (const [method, segments] of lookups) {
+  const path = `${method} /${segments.join('/')}`.slice(0, 30)
+  time(`match   ${path}`, ITERATIONS, () => router.match(method, segments, request))
+  time(`chain   ${path}`, ITERATIONS, () => chainMatch(method, segments))
+}
+
+console.log()
+const dispatchIterations = Math.max(1, Math.floor(ITERATIONS / 20))
+const body = JSON.stringify({ content: 'Hello', platforms: ['instagram'] })
+
+await timeAsync('dispatch GET /health', dispatchIterations, () =>
+  router.dispatch('GET', request, ['health']))
+await timeAsync('dispatch POST /posts (valid)', dispatchIterations, () =>
+  router.dispatch('POST', new Request('http://localhost/api/posts', { method: 'POST', body }), ['posts']))
+await timeAsync('dispatch POST /posts (invalid)', dispatchIterations, () =>
+  router.dispatch('POST', new Request('http://localhost/api/posts', { method: 'POST', body: '{"invalid":"data"}' }), ['posts']))
+await timeAsync('dispatch POST /posts (too large)', dispatchIterations, () =>
+  router.dispatch('POST', new Request('http://localhost/api/posts', {
+    method: 'POST', body: 'x', headers: { 'content-length': String(64 * 1024 * 1024) }
+  }), ['posts']))
@@ -0,0 +1,20 @@
+// Standalone image derivative worker. Keeps one resize job per core in flight
+// by default (DERIVATIVE_CONCURRENCY); run one per machine.
+//
+//   node --env-file=.env scripts/derivatives.mjs
+import { getDb } from '../lib/mongodb.js'
+import { createDerivativeWorker } from '../lib/derivatives.js'
+
+const worker = createDerivativeWorker(getDb)
+
+function shutdown() {
+  worker.stop()
+  console.log('Derivative worker stopped:', worker.stats())
+  process.exit(0)
+}
+
+process.on('SIGINT', shutdown)
+process.on('SIGTERM', shutdown)
+
+console.log(`Derivative worker ${worker.workerId} started`)
+worker.start()
@@ -0,0 +1,20 @@
+// Standalone scheduled-post dispatcher. Run as many copies as needed; job
+// leases in MongoDB keep them from publishing the same post twice.
+//
+//   node --env-file=.env scripts/dispatcher.mjs
+import { getDb } from '../lib/mongodb.js'
+import { createDispatcher } from '../lib/scheduler.js'
+
+const dispatcher = createDispatcher(getDb)
+
+function shutdown() {
+  dispatcher.stop()
+  console.log('Dispatcher stopped:', dispatcher.stats())
+  process.exit(0)
+}
+
+process.on('SIGINT', shutdown)
+process.on('SIGTERM', shutdown)
+
+console.log(`Dispatcher ${dispatcher.workerId} started`)
+dispatcher.start()
@@ -0,0 +1,82 @@
+// One-off migration to the tenant-scoped data model. Documents written before
+// tenancy get a tenantId: images and upload sessions keep their owner, and
+// everything else is assigned to the tenant given on the command line, which
+// is required so legacy data never lands somewhere by default. The
+// pre-tenancy indexes are dropped and the tenant-leading ones built. Safe to
+// run more than once.
+//
+//   node --env-file=.env scripts/migrate-tenants.mjs <tenantId>
+import { getClient, getDb } from '../lib/mongodb.js'
+import { ensureAnalyticsIndexes } from '../lib/analytics.js'
+import { ensureImageIndexes } from '../lib/images.js'
+import { ensurePostIndexes } from '../lib/posts.js'
+import { ensureProfileIndexes } from '../lib/profiles.js'
+import { allTenants, forTenant } from '../lib/tenancy.js'
+
+const tenantId = process.argv[2]
+if (!tenantId) {
+  console.error('Usage: node scripts/migrate-tenants.mjs <tenantId>')
+  console.error('The tenant that untagged posts, jobs, images and analytics are assigned to is required.')
+  process.exit(1)
+}
+
+const OLD_INDEXES = {
+  posts: ['status_scheduledAt', 'scheduledAt'],
+  images: ['owner_category_uploadedAt', 'owner_uploadedAt', 'owner_text'],
+  analytics_daily: ['day']
+}
+
+const untagged = { tenantId: { $exists: false } }
+
+async function dropIndex(db, collection, name) {
+  try {
+    await db.collection(collection).dropIndex(name)
+    console.log(`Dropped ${collection}.${name}`)
+  } catch (error) {
+    // 27: IndexNotFound, 26: NamespaceNotFound
+    if (![26, 27].includes(error.code)) {
+      throw error
+    }
+  }
+}
+
+const db = allTenants(await getDb())
+const counts = {}
+
+// Images and upload sessions already belong to the account that made them
+for (const collection of ['images', 'upload_sessions']) {
+  const result = await db.collection(collection).updateMany(
+    { ...untagged, ownerId: { $exists: true } },
+    [{ $set: { tenantId: '$ownerId' } }, { $unset: 'ownerId' }]
+  )
+  counts[collection] = result.modifiedCount
+}
+
+for (const collection of ['posts', 'jobs', 'images', 'upload_sessions']) {
+  const result = await db.collection(collection).updateMany(untagged, { $set: { tenantId } })
+  counts[collection] = (counts[collection] || 0) + result.modifiedCount
+}
+
+// Rollups were keyed by `<day>:<platform>` ids; top-post lists had no platform
+await db.collection('analytics_daily').updateMany(
+  { ...untagged, top: { $exists: true }, platform: { $exists: false } },
+  { $set: { platform: '_top' } }
+)
+counts.analytics_daily = (await db.collection('analytics_daily').updateMany(untagged, { $set: { tenantId } })).modifiedCount
+
+for (const [collection, names] of Object.entries(OLD_INDEXES)) {
+  for (const name of names) {
+    await dropIndex(db, collection, name)
+  }
+}
+
+const tenantDb = forTenant(db, tenantId)
+await Promise.all([
+  ensurePostIndexes(tenantDb),
+  ensureImageIndexes(tenantDb),
+  ensureAnalyticsIndexes(tenantDb),
+  ensureProfileIndexes(tenantDb)
+])
+
+console.log(`Documents assigned a tenant (untagged data to ${tenantId}):`, counts)
+await (await getClient()).close()